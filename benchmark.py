@@ -0,0 +1,839 @@
+#!/usr/bin/env python3
+
+"""Benchmarks for the trainer internals that do not need the game running.
+
+Usage: python benchmark.py <name> [options]
+Each benchmark prints its results as JSON so runs can be compared over time"""
+
+from pathlib import Path
+import argparse, json, os, sys, tempfile, time
+
+
+def rss() -> int:
+    """Returns the resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (FileNotFoundError, AttributeError, ValueError):
+        import resource # no current rss outside of linux, fall back to the peak
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class FakeFrame:
+    __slots__ = ("time_ns", "pos_addr", "vel_addr", "pos", "vel")
+
+    def __init__(self) -> None:
+        self.time_ns = 0
+        self.pos_addr = 0
+        self.vel_addr = 0
+        self.pos = (0.0, 0.0, 0.0)
+        self.vel = (0.0, 0.0, 0.0)
+
+
+def benchRecorder(args) -> dict:
+    """Sustained sample rate and memory use of the telemetry recorder, the file is read back to check it is valid"""
+    from recorder import TelemetryRecorder, loadRecording
+
+    frame = FakeFrame()
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = TelemetryRecorder(str(Path(tmp) / "run.npy"))
+        period = 1_000_000_000 // args.rate if args.rate else 0
+        start_rss = rss()
+        peak_rss = start_rss
+        start = deadline = time.perf_counter_ns()
+        end = start + int(args.seconds * 1_000_000_000)
+        now = start
+        while now < end:
+            frame.time_ns = now
+            frame.pos = (now * 1e-9, 0.0, 0.0)
+            recorder.tick(frame)
+            if recorder.count % 4096 == 0:
+                peak_rss = max(peak_rss, rss())
+            if period:
+                deadline += period
+                remaining = deadline - time.perf_counter_ns()
+                if remaining > 0:
+                    time.sleep(remaining / 1_000_000_000)
+            now = time.perf_counter_ns()
+        count = recorder.close()
+        size = os.path.getsize(recorder.path)
+        recording = loadRecording(recorder.path)
+        if len(recording) != count or (count and recording["time_ns"][-1] != frame.time_ns):
+            raise RuntimeError(f"The recording read back {len(recording)} samples instead of {count}")
+        del recording # the mapping must be closed before the directory is removed on windows
+
+    elapsed = (now - start) / 1_000_000_000
+    return {
+        "target_rate_hz": args.rate,
+        "samples": count,
+        "sustained_rate_hz": count / elapsed,
+        "file_bytes": size,
+        "rss_start_bytes": start_rss,
+        "rss_peak_bytes": peak_rss,
+        "rss_growth_bytes": peak_rss - start_rss
+    }
+
+
+def benchGhost(args) -> dict:
+    """Ghost lookup latency against the length of the reference trajectory"""
+    import numpy as np
+    from ghost import GhostRun
+
+    results = {}
+    for length in (1_000, 10_000, 100_000, 1_000_000):
+        times = np.arange(length) / 240
+        positions = np.stack((np.cos(times) * 50, np.sin(times) * 50, times * 2), axis=1)
+        build_start = time.perf_counter_ns()
+        ghost = GhostRun(times, positions)
+        build_ms = (time.perf_counter_ns() - build_start) / 1_000_000
+
+        samples = np.linspace(0, length - 1, min(length, args.lookups)).astype(np.int64)
+        noise = np.random.default_rng(0).normal(0.0, 0.05, (len(samples), 3))
+        tracking = np.empty(len(samples))
+        for i, index in enumerate(samples):
+            start = time.perf_counter_ns()
+            ghost.locate(positions[index] + noise[i])
+            tracking[i] = time.perf_counter_ns() - start
+
+        cold = np.empty(min(len(samples), 1000))
+        for i in range(len(cold)):
+            ghost.reset()
+            start = time.perf_counter_ns()
+            ghost.locate(positions[samples[-1 - i]] + noise[i])
+            cold[i] = time.perf_counter_ns() - start
+
+        results[str(length)] = {
+            "build_ms": build_ms,
+            "tracking_mean_us": tracking.mean() / 1000,
+            "tracking_p99_us": np.percentile(tracking, 99) / 1000,
+            "reacquire_mean_us": cold.mean() / 1000,
+            "reacquire_p99_us": np.percentile(cold, 99) / 1000
+        }
+    return {"lookups": args.lookups, "trajectory_lengths": results}
+
+
+def benchPointerScan(args) -> dict:
+    """Index build and backwards search time of the pointer scanner on a synthetic snapshot"""
+    import numpy as np
+    import pointerscan
+
+    rng = np.random.default_rng(0)
+    module_base, heap_base = 0x140000000, 0x20000000
+    module = np.zeros(16 * 1024 * 1024, dtype=np.uint8)
+    heap = rng.integers(0, 256, args.snapshot_mb * 1024 * 1024, dtype=np.uint8)
+    words = heap.view(np.uint64)
+    # a realistic share of the heap is pointers into itself
+    noise = rng.integers(0, len(words), len(words) // 16)
+    words[noise] = np.uint64(heap_base) + rng.integers(0, len(words), len(noise)).astype(np.uint64) * np.uint64(8)
+
+    # plant a chain shaped like POS_PTR
+    offsets = (0x0, 0x90, 0x218, 0x0, 0x20, 0x1A0, 0x200)
+    objects = heap_base + (rng.choice(len(words) // 512, len(offsets), replace=False) * 4096).astype(np.int64)
+    module.view(np.uint64)[0x8000 // 8] = objects[0]
+    for i in range(1, len(offsets)):
+        words[(objects[i - 1] + offsets[i - 1] - heap_base) // 8] = objects[i]
+    target = int(objects[-1]) + offsets[-1]
+
+    start = time.perf_counter()
+    index = pointerscan.PointerIndex.fromRegions([(module_base, module), (heap_base, heap)])
+    index_s = time.perf_counter() - start
+    start = time.perf_counter()
+    paths = pointerscan.scanPointerPaths(index, target, module_base, len(module), len(offsets), 0x400)
+    scan_s = time.perf_counter() - start
+
+    return {
+        "snapshot_bytes": len(module) + len(heap),
+        "indexed_pointers": len(index.pointees),
+        "index_seconds": index_s,
+        "index_gb_per_s": (len(module) + len(heap)) / index_s / 1e9,
+        "scan_seconds": scan_s,
+        "paths_found": len(paths),
+        "planted_path_found": (0x8000, offsets) in paths
+    }
+
+
+def benchValueScan(args) -> dict:
+    """Throughput of each value scan over two synthetic snapshots of --snapshot-mb, one changed slightly from the other"""
+    import numpy as np
+    from valuescan import Snapshot, ValueScanner
+
+    region_size = 64 * 1024 * 1024
+    regions = max(args.snapshot_mb * 1024 * 1024 // region_size, 1)
+    starts = [0x10000000 + i * region_size * 2 for i in range(regions)] # gaps between regions like a real process
+    planted = starts[-1] + 0x1234 * 4
+
+    def synthetic(changed: bool):
+        for i, start in enumerate(starts):
+            rng = np.random.default_rng(i) # the same contents both times, apart from the changes below
+            words = rng.integers(0, 1000, region_size // 4, dtype=np.int32)
+            if changed:
+                picks = np.random.default_rng(1000 + i).integers(0, len(words), len(words) // 100)
+                words[picks] += 1
+            if start == starts[-1]:
+                words[0x1234] = 123456789 + changed
+            yield start, words.view(np.uint8)
+
+    scanner = ValueScanner(None, "int32")
+    results = {}
+    try:
+        before = Snapshot.fromRegions(os.path.join(scanner.tmp.name, "before.bin"), synthetic(False))
+        after = Snapshot.fromRegions(os.path.join(scanner.tmp.name, "after.bin"), synthetic(True))
+
+        def timed(name: str, scan) -> np.ndarray:
+            checked = len(scanner.candidates) if scanner.candidates is not None else None
+            found = scan()
+            results[name] = {
+                "gb_per_s": scanner.scanned_bytes / scanner.scan_seconds / 1e9,
+                "seconds": scanner.scan_seconds,
+                "candidates": len(found)
+            }
+            if checked != None:
+                results[name]["candidates_per_s"] = checked / scanner.scan_seconds
+            return found
+
+        timed("exact", lambda: scanner.scanAll("exact", before, None, 123456789, None))
+        timed("range", lambda: scanner.scanAll("range", before, None, 100, 199))
+        scanner.candidates = timed("changed", lambda: scanner.scanAll("changed", after, before, None, None))
+        increased = timed("increased_candidates", lambda: scanner.scanCandidates("increased", after, before, None, None))
+        scanner.candidates = increased
+        found = timed("exact_candidates", lambda: scanner.scanCandidates("exact", after, before, 123456790, None))
+        results["planted_found"] = bool(planted in found)
+        results["snapshot_bytes"] = after.nbytes
+        scanner.candidates = None
+        before.close()
+        after.close()
+    finally:
+        scanner.close()
+    return results
+
+
+def benchStore(args) -> dict:
+    """Save, delete and load costs of the position store compared to rewriting a whole json file"""
+    from store import PositionStore
+
+    count = args.positions
+    positions = {f"Position {i}": (i * 0.001, -i * 0.002, i * 0.003) for i in range(count)}
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = Path(tmp) / "pos.json"
+        start = time.perf_counter()
+        legacy.write_text(json.dumps(positions, indent=4))
+        json_save_s = time.perf_counter() - start
+        start = time.perf_counter()
+        json.loads(legacy.read_text())
+        json_load_s = time.perf_counter() - start
+
+        store = PositionStore(str(Path(tmp) / "positions.db"), str(legacy))
+        start = time.perf_counter()
+        imported = len(store.collection())
+        import_s = time.perf_counter() - start
+        store.close()
+
+        store = PositionStore(str(Path(tmp) / "positions.db"))
+        start = time.perf_counter()
+        loaded = len(store.collection())
+        load_s = time.perf_counter() - start
+
+        saves = min(count, 1000)
+        collection = store.collection()
+        start = time.perf_counter()
+        for i in range(saves):
+            collection[f"Hotkey {i}"] = (1.0, 2.0, 3.0)
+        save_us = (time.perf_counter() - start) / saves * 1e6
+        start = time.perf_counter()
+        for i in range(saves):
+            del collection[f"Hotkey {i}"]
+        delete_us = (time.perf_counter() - start) / saves * 1e6
+        store.close()
+
+    return {
+        "positions": count,
+        "json_full_save_ms": json_save_s * 1000,
+        "json_full_load_ms": json_load_s * 1000,
+        "store_import_ms": import_s * 1000,
+        "store_imported": imported,
+        "store_first_load_ms": load_s * 1000,
+        "store_loaded": loaded,
+        "store_save_us": save_us,
+        "store_delete_us": delete_us
+    }
+
+
+def benchSpatial(args) -> dict:
+    """Per-tick proximity and nearest point query cost against the number of indexed positions"""
+    import random
+    from spatial import ProximityTracker, SpatialIndex
+
+    rng = random.Random(0)
+    results = {}
+    for size in (100, 1_000, 10_000, 100_000):
+        # positions spread over a level about the size of the climb in DEFAULT_POSITIONS
+        points = {f"Position {i}": (rng.uniform(-300, 300), rng.uniform(-300, 300), rng.uniform(0, 2000))
+                  for i in range(size)}
+        start = time.perf_counter()
+        index = SpatialIndex(points=points)
+        build_ms = (time.perf_counter() - start) * 1000
+        tracker = ProximityTracker(index, 3.0)
+        queries = [(rng.uniform(-300, 300), rng.uniform(-300, 300), rng.uniform(0, 2000)) for i in range(args.lookups)]
+
+        start = time.perf_counter()
+        for pos in queries:
+            tracker.update(pos)
+        proximity_us = (time.perf_counter() - start) / len(queries) * 1e6
+        start = time.perf_counter()
+        for pos in queries:
+            index.nearest(pos)
+        nearest_us = (time.perf_counter() - start) / len(queries) * 1e6
+        results[str(size)] = {"build_ms": build_ms, "proximity_tick_us": proximity_us, "nearest_us": nearest_us}
+    return {"lookups": args.lookups, "index_sizes": results}
+
+
+def benchSpeedGraph(args) -> dict:
+    """Telemetry-side cost per speed sample and ui-side cost per displayed frame at different sample rates"""
+    import math
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    from speed_graph import SpeedGraph, SpeedHistory
+
+    app = QApplication.instance() or QApplication([])
+    results = {}
+    for rate in (60, 240, 1000, 10_000):
+        history = SpeedHistory(target=30.0)
+        period = 1_000_000_000 // rate
+        samples = int(args.seconds * rate)
+        start = time.perf_counter()
+        for i in range(samples):
+            history.append(i * period, 30.0 + 20.0 * math.sin(i * period * 1e-9))
+        append_us = (time.perf_counter() - start) / samples * 1e6
+
+        graph = SpeedGraph()
+        graph.resize(640, 120)
+        graph.target = 30.0
+        graph.setHistory(history)
+        frames = 100
+        start = time.perf_counter()
+        for i in range(frames):
+            graph.grab() # paints the widget offscreen
+        frame_ms = (time.perf_counter() - start) / frames * 1000
+        results[str(rate)] = {"samples": samples, "append_us": append_us, "frame_ms": frame_ms}
+    return {"seconds": args.seconds, "graph_width": 640, "rates_hz": results}
+
+
+def benchDaemon(args) -> dict:
+    """Request throughput and latency of the headless daemon with many concurrent clients, against the simulator"""
+    import asyncio, statistics, subprocess
+    from simulator import spawnSimulator
+
+    root = os.path.dirname(os.path.realpath(__file__))
+    simulator, pid, base_address = spawnSimulator()
+    tmp = tempfile.TemporaryDirectory()
+    address = os.path.join(tmp.name, "trainer.sock")
+    daemon = subprocess.Popen([sys.executable, os.path.join(root, "trainer.py"), "--headless", "--address", address,
+                               "--pid", str(pid), "--base-address", str(base_address)])
+
+    async def call(reader, writer, method, params=None):
+        writer.write(json.dumps({"jsonrpc": "2.0", "id": 0, "method": method, "params": params or []}).encode() + b"\n")
+        while True:
+            message = json.loads(await reader.readline())
+            if "id" in message:
+                return message
+
+    async def requester(latencies: list, counts: list, end: float):
+        reader, writer = await asyncio.open_unix_connection(address)
+        request = b'{"jsonrpc":"2.0","id":1,"method":"readPosition"}\n'
+        sent = []
+        while time.perf_counter() < end:
+            for i in range(args.pipeline): # keeps pipeline requests in flight
+                sent.append(time.perf_counter_ns())
+                writer.write(request)
+            for i in range(args.pipeline):
+                await reader.readline()
+                latencies.append(time.perf_counter_ns() - sent[i])
+            counts[0] += args.pipeline
+            sent.clear()
+        writer.close()
+
+    async def batcher(counts: list, end: float):
+        reader, writer = await asyncio.open_unix_connection(address)
+        batch = json.dumps([{"jsonrpc": "2.0", "id": i, "method": "readState"} for i in range(args.pipeline)])
+        while time.perf_counter() < end:
+            writer.write(batch.encode() + b"\n")
+            await reader.readline()
+            counts[0] += args.pipeline
+        writer.close()
+
+    async def subscriber(received: list, end: float):
+        reader, writer = await asyncio.open_unix_connection(address)
+        await call(reader, writer, "subscribe")
+        seqs = []
+        while time.perf_counter() < end:
+            try:
+                line = await asyncio.wait_for(reader.readline(), end - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            message = json.loads(line)
+            if message.get("method") == "telemetry":
+                seqs.append(message["params"]["seq"])
+        received.append(seqs)
+        writer.close()
+
+    async def run():
+        for i in range(200): # wait for the daemon to attach to the simulator
+            try:
+                reader, writer = await asyncio.open_unix_connection(address)
+                if (await call(reader, writer, "status"))["result"]["connected"]:
+                    break
+                writer.close()
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+            await asyncio.sleep(0.05)
+        await call(reader, writer, "setTickRate", [240])
+
+        # one subscriber that never reads, the others should not notice it
+        stalled_reader, stalled_writer = await asyncio.open_unix_connection(address)
+        await call(stalled_reader, stalled_writer, "subscribe")
+
+        latencies, request_counts, batch_counts, received = [], [0], [0], []
+        end = time.perf_counter() + args.seconds
+        start = time.perf_counter()
+        await asyncio.gather(*[requester(latencies, request_counts, end) for i in range(args.clients)],
+                             batcher(batch_counts, end),
+                             *[subscriber(received, end) for i in range(args.subscribers)])
+        elapsed = time.perf_counter() - start
+        status = (await call(reader, writer, "status"))["result"]
+        stalled_writer.close()
+        writer.close()
+
+        latencies.sort()
+        frames = [len(seqs) for seqs in received]
+        gaps = [seqs[-1] - seqs[0] + 1 - len(seqs) for seqs in received if seqs]
+        return {
+            "clients": args.clients,
+            "pipeline": args.pipeline,
+            "requests_per_s": request_counts[0] / elapsed,
+            "batched_calls_per_s": batch_counts[0] / elapsed,
+            "latency_p50_us": latencies[len(latencies) // 2] / 1000,
+            "latency_p99_us": latencies[int(len(latencies) * 0.99)] / 1000,
+            "subscribers": args.subscribers,
+            "frames_per_s": statistics.mean(frames) / elapsed if frames else 0.0,
+            "frames_skipped": sum(gaps),
+            "frames_dropped_total": status["dropped_total"],
+            "tick_rate": status["tick_rate"],
+            "missed_ticks": status["missed_ticks"],
+            "mean_jitter_us": status["mean_jitter_ns"] / 1000
+        }
+
+    try:
+        return asyncio.run(run())
+    finally:
+        daemon.terminate()
+        daemon.wait()
+        simulator.stdin.close()
+        simulator.wait()
+        tmp.cleanup()
+
+
+def timeCalls(func, count: int) -> dict:
+    """Calls func count times and returns its rate and latency percentiles"""
+    import numpy as np
+    latencies = np.empty(count, dtype=np.int64)
+    for i in range(count):
+        start = time.perf_counter_ns()
+        func()
+        latencies[i] = time.perf_counter_ns() - start
+    return {
+        "per_s": count / (latencies.sum() / 1e9),
+        "p50_us": float(np.percentile(latencies, 50)) / 1000,
+        "p99_us": float(np.percentile(latencies, 99)) / 1000
+    }
+
+
+def benchMemory(args) -> dict:
+    """Pointer walks, reads, teleports and the sampler against the simulated game, in-process and cross-process"""
+    import threading
+    from manager import CuriosityManager, FlyHack, SpeedWatch
+    from memory import LocalBackend
+    from simulator import SimulatedGame, spawnSimulator
+    from speed_graph import SpeedHistory
+
+    results = {}
+    for backend in ("local", "process"):
+        if backend == "local":
+            game = SimulatedGame()
+            stop = threading.Event()
+            physics = threading.Thread(target=game.run, args=(60, stop), daemon=True)
+            physics.start()
+            manager = CuriosityManager(None, os.getpid(), game.base_address, LocalBackend())
+        else:
+            simulator, pid, base_address = spawnSimulator()
+            manager = CuriosityManager(None, pid, base_address)
+
+        try:
+            def walk():
+                manager.pointers.invalidate()
+                manager.getPTRAddr(manager.POS_PTR)
+
+            scheduler = manager.scheduler
+            scheduler.readFrame()
+            flyhack = FlyHack(manager.game)
+            speedwatch = SpeedWatch(SpeedHistory())
+            result = {
+                "pointer_walk": timeCalls(walk, args.lookups),
+                "getPTRAddr": timeCalls(lambda: manager.getPTRAddr(manager.POS_PTR), args.lookups),
+                "readPosition": timeCalls(manager.readPosition, args.lookups),
+                "readState": timeCalls(manager.readState, args.lookups),
+                "writePosition": timeCalls(lambda: manager.writePosition((1.0, 2.0, 3.0)), args.lookups),
+                "writePosition_resolved": timeCalls(lambda: manager.writePosition(
+                    (1.0, 2.0, 3.0), scheduler.frame.pos_addr, scheduler.frame.vel_addr), args.lookups),
+                "FlyHack.tick": timeCalls(lambda: flyhack.tick(scheduler.frame), args.lookups),
+                "SpeedWatch.tick": timeCalls(lambda: speedwatch.tick(scheduler.frame), args.lookups)
+            }
+
+            # the sampler with both features running, as the trainer would have it
+            scheduler.setRate(max(scheduler.RATES))
+            scheduler.resetStats()
+            manager.toggleFlyHack(True)
+            manager.toggleSpeedMonitor(True, SpeedHistory())
+            time.sleep(args.seconds)
+            fly_writes_per_s = manager.flyhack.writes_per_s
+            manager.toggleFlyHack(False)
+            manager.toggleSpeedMonitor(False)
+            result["sampler"] = {
+                "rate_hz": scheduler.rate,
+                "ticks": scheduler.ticks,
+                "missed": scheduler.missed,
+                "errors": scheduler.errors,
+                "callback_errors": scheduler.callback_errors,
+                "mean_jitter_us": scheduler.mean_jitter_ns / 1000,
+                "max_jitter_us": scheduler.max_jitter_ns / 1000,
+                "fly_writes_per_s": fly_writes_per_s
+            }
+            result["pointer_reads_saved"] = manager.pointers.reads_saved
+            results[backend] = result
+        finally:
+            manager.kill()
+            if backend == "local":
+                stop.set()
+                physics.join()
+            else:
+                simulator.stdin.close()
+                simulator.wait()
+    return {"calls": args.lookups, "sampler_seconds": args.seconds, "backends": results}
+
+
+STARTUP_CHILD = """
+import sys, time
+root = sys.argv[1]
+sys.path.insert(0, root)
+marks = {}
+import main_window, data
+marks["imported"] = time.perf_counter_ns()
+data.POSITION_STORE.path = sys.argv[2] # the database is only opened once the backends start
+from PySide6.QtCore import QObject, QEvent
+from PySide6.QtWidgets import QApplication
+
+class PaintWatch(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and "first_paint" not in marks:
+            marks["first_paint"] = time.perf_counter_ns()
+            backends = ("manager", "supervisor", "mem_edit", "recorder", "ghost", "pointerscan", "global_hotkeys")
+            marks["heavy_before_paint"] = [name for name in backends if name in sys.modules]
+            # some PySide6 builds load numpy themselves, so it only counts when one of the trainer's modules has it
+            own = [module for module in list(sys.modules.values())
+                   if (getattr(module, "__file__", None) or "").startswith(root)]
+            numpy = sys.modules.get("numpy")
+            if numpy != None and any(numpy in vars(module).values() for module in own):
+                marks["heavy_before_paint"].append("numpy")
+        return False
+
+start_backends = main_window.MainWindow.startBackends
+def timedStartBackends(self):
+    start_backends(self)
+    marks["backends"] = time.perf_counter_ns()
+    QApplication.instance().quit()
+main_window.MainWindow.startBackends = timedStartBackends
+
+run = QApplication.exec
+watch = PaintWatch()
+def watchedExec():
+    QApplication.instance().installEventFilter(watch)
+    return run()
+QApplication.exec = staticmethod(watchedExec)
+
+import runpy
+trainer = root + "/trainer.py"
+sys.argv = [trainer] # the trainer parses its own arguments, the ones above are only for this script
+try:
+    runpy.run_path(trainer, run_name="__main__")
+except SystemExit:
+    pass
+print(repr(marks))
+"""
+
+
+def benchStartup(args) -> dict:
+    """Time to first paint of the trainer window and the modules that cost the most to import"""
+    import ast, statistics, subprocess
+    root = os.path.dirname(os.path.realpath(__file__))
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen") # no window needs to be seen to time it
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.launches):
+            db_path = os.path.join(tmp, f"positions{i}.db")
+            start = time.perf_counter_ns() # monotonic across processes, so the child's marks can be compared to it
+            out = subprocess.run([sys.executable, "-c", STARTUP_CHILD, root, db_path], env=env, check=True,
+                                 capture_output=True, text=True).stdout
+            marks = ast.literal_eval(out.strip().splitlines()[-1])
+            runs.append({
+                "imports_ms": (marks["imported"] - start) / 1e6,
+                "first_paint_ms": (marks["first_paint"] - start) / 1e6,
+                "backends_ready_ms": (marks["backends"] - start) / 1e6,
+                "heavy_before_paint": marks["heavy_before_paint"]
+            })
+
+    # -X importtime prints "import time: self [us] | cumulative | imported package" for every module
+    log = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main_window"], cwd=root, env=env,
+                         check=True, capture_output=True, text=True).stderr
+    # modules are listed after everything they import, nested two spaces per level
+    imports = []
+    pending = []
+    for line in log.splitlines()[1:]:
+        fields = line.split("|")
+        if len(fields) != 3:
+            continue
+        depth = (len(fields[2]) - len(fields[2].lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((fields[2].strip(), int(fields[1]) / 1000))
+        elif depth == 0:
+            if fields[2].strip() == "main_window":
+                imports = pending
+            pending = []
+    imports.sort(key=lambda item: item[1], reverse=True)
+
+    summary = {}
+    for key in ("imports_ms", "first_paint_ms", "backends_ready_ms"):
+        summary[key] = statistics.median(run[key] for run in runs)
+    return {
+        "launches": args.launches,
+        "median": summary,
+        "budget_ms": args.budget_ms,
+        "within_budget": summary["first_paint_ms"] <= args.budget_ms,
+        "heavy_before_paint": runs[-1]["heavy_before_paint"],
+        "slowest_imports_ms": dict(imports[:10]),
+        "runs": runs
+    }
+
+
+def benchSaveState(args) -> dict:
+    """Save-state capture and restore latency against the simulated game, and file size and io with --states of them"""
+    from manager import CuriosityManager
+    from savestate import SaveStates
+    from simulator import spawnSimulator
+
+    simulator, pid, base_address = spawnSimulator()
+    manager = CuriosityManager(None, pid, base_address)
+    results = {}
+    try:
+        states = {}
+        for i in range(args.states):
+            states[f"State {i}"] = manager.captureState(f"State {i}")
+            time.sleep(0.005) # the player moves a little between saves
+        names = list(states)
+        results["capture"] = timeCalls(lambda: manager.captureState("Timed"), args.lookups)
+        results["restore"] = timeCalls(lambda: manager.restoreState(states[names[-1]]), args.lookups)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            saved = SaveStates(os.path.join(tmp, "savestates.bin"), manager.state_layout)
+            for state in states.values():
+                saved.add(state)
+            started = time.perf_counter()
+            saved.save()
+            results["file_save_ms"] = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            loaded = SaveStates(saved.path, manager.state_layout)
+            results["file_load_ms"] = (time.perf_counter() - started) * 1000
+            results["file_bytes"] = os.path.getsize(saved.path)
+            results["full_bytes"] = sum(len(region) for state in states.values() for region in state.regions)
+            results["round_trip_ok"] = all(loaded.states[name].regions == states[name].regions for name in names)
+    finally:
+        manager.kill()
+        simulator.stdin.close()
+        simulator.wait()
+    results["states"] = args.states
+    return results
+
+
+def benchMetrics(args) -> dict:
+    """What the metrics layer adds to the hot paths, disabled and enabled, against the in-process simulated game"""
+    from manager import CuriosityManager
+    from memory import LocalBackend
+    from metrics import METRICS
+    from simulator import SimulatedGame
+
+    game = SimulatedGame()
+    results = {}
+    for enabled in (False, True):
+        METRICS.enabled = enabled
+        METRICS.reset()
+        manager = CuriosityManager(None, os.getpid(), game.base_address, LocalBackend())
+        scheduler = manager.scheduler
+        scheduler.readFrame()
+        results["enabled" if enabled else "disabled"] = {
+            "readState": timeCalls(manager.readState, args.lookups),
+            "scheduler.tick": timeCalls(scheduler.tick, args.lookups),
+            "teleport": timeCalls(lambda: manager.teleport((1.0, 2.0, 3.0)), args.lookups),
+            "count": timeCalls(lambda: METRICS.count("benchmark"), args.lookups),
+            "span": timeCalls(lambda: METRICS.span("benchmark", time.perf_counter_ns()), args.lookups)
+        }
+    METRICS.enabled = False
+
+    path = os.path.join(tempfile.gettempdir(), "benchmark_trace.json")
+    started = time.perf_counter()
+    METRICS.exportTrace(path)
+    results["trace_export_s"] = time.perf_counter() - started
+    results["trace_bytes"] = os.path.getsize(path)
+    os.remove(path)
+    return results
+
+
+def benchPlayback(args) -> dict:
+    """Timing error of playing a --seconds run recorded at --rate back into the simulated game, at several speeds"""
+    import numpy as np
+    from manager import CuriosityManager
+    from recorder import SAMPLE_DTYPE
+    from simulator import spawnSimulator
+
+    count = int(args.seconds * args.rate)
+    recording = np.zeros(count, dtype=SAMPLE_DTYPE)
+    recording["time_ns"] = np.arange(count) * (1_000_000_000 // args.rate)
+    angles = np.arange(count) / args.rate
+    recording["pos"] = np.stack([np.cos(angles) * 20, np.sin(angles) * 20, np.full(count, 5.0)], axis=1)
+    recording["vel"] = np.stack([-np.sin(angles) * 2000, np.cos(angles) * 2000, np.zeros(count)], axis=1)
+
+    simulator, pid, base_address = spawnSimulator()
+    manager = CuriosityManager(None, pid, base_address)
+    results = {}
+    try:
+        for speed in (1.0, 2.0):
+            report = manager.playbackPlayer(recording, speed).play()
+            keys = ("written", "dropped", "error_p50_ns", "error_p99_ns", "error_max_ns", "error_mean_ns")
+            results[f"{speed}x"] = {key: report[key] for key in keys}
+    finally:
+        manager.kill()
+        simulator.stdin.close()
+        simulator.wait()
+    results["samples"] = count
+    results["rate"] = args.rate
+    results["cpus"] = os.cpu_count()
+    if results["cpus"] == 1:
+        results["note"] = "the simulator shares the only CPU with playback, expect ms errors and dropped samples"
+    return results
+
+
+def benchHotkeys(args) -> dict:
+    """Press to action latency of the hotkey pipeline with and without a teleport, and how many repeats it drops"""
+    from hotkeys import DEBOUNCE_NS, HotkeyPipeline
+    from manager import CuriosityManager
+    from simulator import spawnSimulator
+
+    simulator, pid, base_address = spawnSimulator()
+    manager = CuriosityManager(None, pid, base_address)
+    pipeline = HotkeyPipeline(lambda: True)
+    pipeline.addAction("noop", lambda pressed_ns: None, "a")
+    pipeline.addAction("teleport", lambda pressed_ns: manager.teleport((1.0, 2.0, 3.0), pressed_ns), "b")
+    pipeline.start()
+    interval = DEBOUNCE_NS / 1_000_000_000 * 1.1
+    presses = max(int(args.seconds / 2 / interval), 1) # half of --seconds for each action
+    results = {}
+    try:
+        for name in ("noop", "teleport"):
+            for i in range(presses):
+                pipeline.press(name)
+                time.sleep(interval)
+            pipeline.press(name)
+            pipeline.press(name) # a bounce, dropped
+            time.sleep(0.2)
+            latency = pipeline.latency[name]
+            results[name] = {"presses": presses + 2, "acted": latency.count, "p50_us": latency.percentile(50) / 1000,
+                             "p99_us": latency.percentile(99) / 1000}
+    finally:
+        pipeline.stop()
+        manager.kill()
+        simulator.stdin.close()
+        simulator.wait()
+    return results
+
+
+def benchSweep(args) -> dict:
+    """Points per second of a teleport sweep around Statue Climb on the simulator's toy terrain, with and without
+    ending points early once the player is still, for half of --seconds each"""
+    import numpy as np
+    import threading
+    from data import DEFAULT_POSITIONS
+    from manager import CuriosityManager
+    from simulator import spawnSimulator
+    from sweep import SweepRunner, gridPoints
+
+    points = gridPoints(DEFAULT_POSITIONS["Statue Climb"], 1.0, (9, 9, 3))
+    points = points[np.random.default_rng(0).permutation(len(points))] # a mix of outcomes however far it gets
+    simulator, pid, base_address = spawnSimulator(terrain=True)
+    manager = CuriosityManager(None, pid, base_address)
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for rest_ticks in (3, 0):
+                runner = SweepRunner(manager, points, os.path.join(tmp, f"sweep_{rest_ticks}.npz"), 60, 60,
+                                     _rest_ticks=rest_ticks)
+                timer = threading.Timer(args.seconds / 2, runner.stop)
+                timer.start()
+                started = time.perf_counter()
+                sweep = runner.run()
+                seconds = time.perf_counter() - started
+                timer.cancel()
+                results[f"rest_ticks_{rest_ticks}"] = {"points": sweep.done, "points_per_s": sweep.done / seconds,
+                                                       "mean_ticks": float(sweep.ticks[sweep.outcome != 0].mean()),
+                                                       **sweep.counts()}
+    finally:
+        manager.kill()
+        simulator.stdin.close()
+        simulator.wait()
+    return results
+
+
+BENCHMARKS = {
+    "recorder": benchRecorder,
+    "ghost": benchGhost,
+    "pointerscan": benchPointerScan,
+    "valuescan": benchValueScan,
+    "store": benchStore,
+    "spatial": benchSpatial,
+    "startup": benchStartup,
+    "speedgraph": benchSpeedGraph,
+    "daemon": benchDaemon,
+    "memory": benchMemory,
+    "metrics": benchMetrics,
+    "savestate": benchSaveState,
+    "playback": benchPlayback,
+    "hotkeys": benchHotkeys,
+    "sweep": benchSweep
+}
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("name", choices=list(BENCHMARKS.keys()))
+    parser.add_argument("--seconds", type=float, default=10.0, help="how long to run timed benchmarks for")
+    parser.add_argument("--rate", type=int, default=240, help="target sample rate in Hz, 0 runs unthrottled")
+    parser.add_argument("--positions", type=int, default=100_000, help="how many saved positions to use")
+    parser.add_argument("--snapshot-mb", type=int, default=512, help="size of synthetic memory snapshots")
+    parser.add_argument("--lookups", type=int, default=10_000, help="how many lookups to time per data size")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients for the daemon benchmark")
+    parser.add_argument("--pipeline", type=int, default=16, help="requests each daemon client keeps in flight")
+    parser.add_argument("--subscribers", type=int, default=8, help="telemetry subscribers for the daemon benchmark")
+    parser.add_argument("--launches", type=int, default=5, help="how many times to launch the trainer")
+    parser.add_argument("--budget-ms", type=float, default=1000.0, help="time to first paint to aim for")
+    parser.add_argument("--states", type=int, default=50, help="save-states to keep for the savestate benchmark")
+    args = parser.parse_args()
+    print(json.dumps({"benchmark": args.name, **BENCHMARKS[args.name](args)}, indent=4))
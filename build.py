@@ -17,6 +17,8 @@ if platform.system() == "Linux":
     platform_name = "linux"
 
 exe_path = Path(sys.argv[0]).parent.absolute() / 'dist' / str(base_name + exe_ext)
+if not (exe_path.is_file() or exe_path.is_dir()):
+    exe_path = exe_path.with_name(base_name) # onedir builds are a folder with the exe inside
 if not (exe_path.is_file() or exe_path.is_dir()):
     raise Exception("Executable not found: %s" % exe_path)
 
@@ -29,4 +31,4 @@ if release_path.exists() and release_path.is_dir():
 release_path.mkdir(parents=True, exist_ok=True)
 shutil.copyfile("README.md", release_path / "README.txt")
 
-shutil.move(exe_path, release_path / str(base_name + exe_ext))
+shutil.move(exe_path, release_path / exe_path.name)
@@ -0,0 +1,441 @@
+"""Runs the trainer without a window behind a JSON-RPC 2.0 server on a Unix socket (or a named pipe on Windows)
+
+Requests are newline-delimited JSON. A connection can pipeline any number of requests without waiting for the
+responses, which come back in the order the requests were sent, and a JSON array is handled as a batch. Calling
+"subscribe" streams a "telemetry" notification for every scheduler tick to that connection"""
+
+from concurrent.futures import ThreadPoolExecutor
+from data import SAVED_POSITIONS, SAVESTATES_PATH
+from metrics import METRICS
+import asyncio, functools, inspect, json, math, os, sys, threading
+
+SEND_BUFFER_LIMIT = 64 * 1024 # telemetry is dropped for a connection with more than this waiting to be sent
+RETRY_INTERVAL = 1.0 # seconds between looking for the game while it is not running
+MAX_LINE = 1024 * 1024 # longest request or batch a client can send
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+GAME_ERROR = -32000
+
+# these wait for the playback or scheduler thread to finish, so they run on the manager thread instead of the loop
+BLOCKING_METHODS = ("setFlyHack", "playRecording", "stopPlayback")
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        Exception.__init__(self, message)
+        self.code = code
+
+
+class Subscriber:
+    def __init__(self, _writer: asyncio.StreamWriter) -> None:
+        self.writer = _writer
+        self.sent = 0
+        self.dropped = 0
+
+
+class TrainerDaemon:
+    """Serves the CuriosityManager operations to local clients
+
+    The telemetry callback runs on the scheduler thread and only hands the newest frame over to the event loop, so
+    a busy loop coalesces frames instead of queueing them. Each frame is encoded once and written to every
+    subscriber whose send buffer has room, slower clients miss frames (counted in "dropped") instead of holding up
+    the others or the sampler. Manager calls that wait on other threads (attaching, detaching, scheduler
+    registration and the BLOCKING_METHODS) run in order on one manager thread, so the loop keeps serving"""
+
+    def __init__(self, _connect, _address: str) -> None:
+        self.connect_manager = _connect # returns a new CuriosityManager, raises if the game is not running
+        self.address = _address
+        self.manager = None
+        self.save_states = None
+        self.subscribers = {}
+        self.frames = 0 # every frame the scheduler handed over, so clients can see how many they missed
+        self.pending_frame = None
+        self.frame_lock = threading.Lock()
+        self.requests = 0
+        self.loop = None
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="daemon-manager")
+        self.methods = {
+            "ping": self.ping,
+            "status": self.status,
+            "readPosition": self.readPosition,
+            "readState": self.readState,
+            "readSpeed": self.readSpeed,
+            "writePosition": self.writePosition,
+            "listPositions": self.listPositions,
+            "loadPosition": self.loadPosition,
+            "savePosition": self.savePosition,
+            "listStates": self.listStates,
+            "saveState": self.saveState,
+            "loadState": self.loadState,
+            "deleteState": self.deleteState,
+            "setFlyHack": self.setFlyHack,
+            "setTickRate": self.setTickRate,
+            "playRecording": self.playRecording,
+            "seekPlayback": self.seekPlayback,
+            "stopPlayback": self.stopPlayback,
+            "playbackStatus": self.playbackStatus,
+            "teleportLatency": self.teleportLatency,
+            "metrics": self.metrics,
+            "subscribe": self.subscribe,
+            "unsubscribe": self.unsubscribe
+        }
+        self.signatures = {name: inspect.signature(method) for name, method in self.methods.items()}
+        self.methods = {name: METRICS.timed(f"rpc.{name}", method) for name, method in self.methods.items()}
+
+    async def serve(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        METRICS.nameThread("daemon")
+        if sys.platform == "win32":
+            servers = await self.loop.start_serving_pipe(self.protocolFactory, self.address) # proactor loops only
+            closers = [server.close for server in servers]
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address) # left behind by a daemon that did not exit cleanly
+            server = await asyncio.start_unix_server(self.handleClient, self.address, limit=MAX_LINE)
+            closers = [server.close]
+        try:
+            while True:
+                if self.manager == None:
+                    await self.attach()
+                elif not self.isConnected():
+                    await self.detach() # subscribers stay subscribed and get frames again once the game is back
+                await asyncio.sleep(RETRY_INTERVAL)
+        finally:
+            for close in closers:
+                close()
+            await self.detach()
+            self.executor.shutdown()
+            if sys.platform != "win32" and os.path.exists(self.address):
+                os.remove(self.address)
+
+    def protocolFactory(self) -> asyncio.StreamReaderProtocol:
+        return asyncio.StreamReaderProtocol(asyncio.StreamReader(MAX_LINE), self.handleClient)
+
+    def onManagerThread(self, func, *args, **kwargs) -> asyncio.Future:
+        """Queues func behind every earlier manager call and returns a future of its result"""
+        return self.loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def attach(self) -> None:
+        try:
+            self.manager = await self.onManagerThread(self.connect_manager)
+        except Exception:
+            self.manager = None
+            return
+        if self.subscribers:
+            self.onManagerThread(self.manager.scheduler.register, "daemon", self.onFrame)
+
+    async def detach(self) -> None:
+        if self.manager == None:
+            return
+        manager, self.manager = self.manager, None
+        try:
+            await self.onManagerThread(manager.kill)
+        except Exception:
+            pass # the process is already gone
+
+    def isConnected(self) -> bool:
+        try:
+            return self.manager.isStillConnected()
+        except Exception:
+            return False
+
+    async def handleClient(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handleLine(line, writer)
+                if response != None:
+                    writer.write(response)
+                    await writer.drain() # responses are never dropped, so a client that stops reading waits here
+        except (ConnectionError, ValueError):
+            pass # disconnected, or sent a line longer than MAX_LINE
+        finally:
+            self.removeSubscriber(writer)
+            writer.close()
+
+    async def handleLine(self, line: bytes, writer: asyncio.StreamWriter) -> bytes:
+        """Returns the encoded response to one line, or None if it only had notifications"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return encode(errorResponse(None, PARSE_ERROR, "Parse error"))
+        if isinstance(message, list):
+            if len(message) == 0:
+                return encode(errorResponse(None, INVALID_REQUEST, "Empty batch"))
+            responses = [await self.handleRequest(request, writer) for request in message]
+            responses = [response for response in responses if response != None]
+            return encode(responses) if responses else None
+        response = await self.handleRequest(message, writer)
+        return encode(response) if response != None else None
+
+    async def handleRequest(self, request, writer: asyncio.StreamWriter) -> dict:
+        if not isinstance(request, dict):
+            return errorResponse(None, INVALID_REQUEST, "Invalid request")
+        if request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+            return errorResponse(request.get("id"), INVALID_REQUEST, "Invalid request")
+        self.requests += 1
+        request_id = request.get("id")
+        try:
+            method = self.methods.get(request["method"])
+            if method == None:
+                raise RPCError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            params = request.get("params", [])
+            if not isinstance(params, (dict, list)):
+                raise RPCError(INVALID_PARAMS, "Params must be an array or an object")
+            # checked before the call, so a TypeError from inside a method is reported as the bug it is
+            signature = self.signatures[request["method"]]
+            try:
+                if isinstance(params, dict):
+                    bound = signature.bind(writer, **params)
+                else:
+                    bound = signature.bind(writer, *params)
+            except TypeError as e:
+                raise RPCError(INVALID_PARAMS, str(e))
+            if request["method"] in BLOCKING_METHODS:
+                result = await self.onManagerThread(method, *bound.args, **bound.kwargs)
+            else:
+                result = method(*bound.args, **bound.kwargs)
+        except RPCError as e:
+            return errorResponse(request_id, e.code, str(e))
+        except Exception as e:
+            return errorResponse(request_id, GAME_ERROR, f"{type(e).__name__}: {e}")
+        if "id" not in request:
+            return None # a notification
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def requireManager(self):
+        if self.manager == None:
+            raise RPCError(GAME_ERROR, "Not connected to the game")
+        return self.manager
+
+    ### METHODS, every one takes the writer of the connection that called it first
+
+    def ping(self, writer) -> str:
+        return "pong"
+
+    def status(self, writer) -> dict:
+        scheduler = self.manager.scheduler if self.manager != None else None
+        flyhack = self.manager.flyhack if self.manager != None else None
+        subscriber = self.subscribers.get(writer)
+        return {
+            "connected": self.manager != None,
+            "requests": self.requests,
+            "subscribers": len(self.subscribers),
+            "sent": subscriber.sent if subscriber != None else 0,
+            "dropped": subscriber.dropped if subscriber != None else 0,
+            "dropped_total": sum(other.dropped for other in self.subscribers.values()),
+            "tick_rate": scheduler.rate if scheduler != None else None,
+            "ticks": scheduler.ticks if scheduler != None else 0,
+            "missed_ticks": scheduler.missed if scheduler != None else 0,
+            "callback_errors": scheduler.callback_errors if scheduler != None else 0,
+            "mean_jitter_ns": scheduler.mean_jitter_ns if scheduler != None else 0.0,
+            "fly_writes_per_s": flyhack.writes_per_s if flyhack != None else 0.0,
+            "teleport_p50_ns": self.manager.teleport_latency.percentile(50) if self.manager != None else None,
+            "teleport_p99_ns": self.manager.teleport_latency.percentile(99) if self.manager != None else None
+        }
+
+    def readPosition(self, writer) -> list:
+        return list(self.requireManager().readPosition())
+
+    def readState(self, writer) -> dict:
+        pos, vel = self.requireManager().readState()
+        return {"pos": list(pos), "vel": list(vel)}
+
+    def readSpeed(self, writer) -> float:
+        pos, vel = self.requireManager().readState()
+        return math.sqrt(pow(vel[0], 2) + pow(vel[1], 2)) / 10 # same as SpeedWatch
+
+    def writePosition(self, writer, x: float, y: float, z: float, aligned: bool = False) -> None:
+        self.requireManager().teleport((float(x), float(y), float(z)), aligned=bool(aligned))
+
+    def listPositions(self, writer) -> dict:
+        return {name: list(pos) for name, pos in SAVED_POSITIONS.items()}
+
+    def loadPosition(self, writer, name: str, aligned: bool = False) -> list:
+        if name not in SAVED_POSITIONS:
+            raise RPCError(INVALID_PARAMS, f"No saved position named {name}")
+        pos = SAVED_POSITIONS[name]
+        self.requireManager().teleport(pos, aligned=bool(aligned))
+        return list(pos)
+
+    def savePosition(self, writer, name: str, pos: list = None) -> list:
+        pos = tuple(float(value) for value in pos) if pos != None else self.requireManager().readPosition()
+        if len(pos) != 3:
+            raise RPCError(INVALID_PARAMS, "A position needs x, y and z")
+        SAVED_POSITIONS[name] = pos
+        return list(pos)
+
+    def saveStates(self):
+        if self.save_states == None:
+            from savestate import SaveStates
+            try:
+                self.save_states = SaveStates(SAVESTATES_PATH, self.requireManager().state_layout)
+            except ValueError as e:
+                raise RPCError(GAME_ERROR, str(e))
+        return self.save_states
+
+    def listStates(self, writer) -> list:
+        return list(self.saveStates().states)
+
+    def saveState(self, writer, name: str) -> str:
+        states = self.saveStates()
+        states.add(self.requireManager().captureState(str(name)))
+        states.save()
+        return str(name)
+
+    def loadState(self, writer, name: str, fields: list = None) -> str:
+        """Restores a save-state, fields is a list of field names to restore fewer than it was saved with"""
+        states = self.saveStates()
+        if name not in states.states:
+            raise RPCError(INVALID_PARAMS, f"No save-state named {name}")
+        manager = self.requireManager()
+        try:
+            mask = manager.state_layout.mask(fields) if fields != None else None
+        except ValueError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+        manager.restoreState(states.states[name], mask)
+        return name
+
+    def deleteState(self, writer, name: str) -> bool:
+        states = self.saveStates()
+        if name not in states.states:
+            return False
+        states.remove(name)
+        states.save()
+        return True
+
+    def setFlyHack(self, writer, on: bool, mode: str = "thrust") -> bool:
+        try:
+            self.requireManager().toggleFlyHack(bool(on), mode)
+        except ValueError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+        return bool(on)
+
+    def setTickRate(self, writer, rate: int) -> int:
+        try:
+            self.requireManager().setTickRate(int(rate))
+        except ValueError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+        return int(rate)
+
+    def playRecording(self, writer, path: str, speed: float = 1.0, start: float = 0.0) -> dict:
+        """Starts playing a recorded run back from start seconds into it, replacing any playback that is running"""
+        from recorder import loadRecording
+        manager = self.requireManager()
+        try:
+            player = manager.playbackPlayer(loadRecording(path), speed)
+            player.seek(float(start))
+        except (OSError, ValueError, KeyError) as e:
+            raise RPCError(INVALID_PARAMS, f"Could not play {path}: {e}")
+        manager.togglePlayback(True, player)
+        return player.report()
+
+    def seekPlayback(self, writer, seconds: float, speed: float = None) -> dict:
+        """Moves the running playback to seconds into the run, and changes its speed if given"""
+        player = self.playbackPlayer()
+        try:
+            if speed != None:
+                player.setSpeed(speed)
+            player.seek(float(seconds))
+        except ValueError as e:
+            raise RPCError(INVALID_PARAMS, str(e))
+        return player.report()
+
+    def stopPlayback(self, writer) -> dict:
+        player = self.playbackPlayer()
+        self.manager.togglePlayback(False)
+        return player.report()
+
+    def playbackStatus(self, writer) -> dict:
+        """The report of the running or last playback, with timing errors in ns"""
+        player = self.playbackPlayer()
+        return {**player.report(), "playing": player.on}
+
+    def playbackPlayer(self):
+        manager = self.requireManager()
+        if manager.playback == None:
+            raise RPCError(GAME_ERROR, "Nothing is playing back")
+        return manager.playback.player
+
+    def teleportLatency(self, writer) -> dict:
+        """The whole teleport latency histogram, the same as exporting it from the window"""
+        return self.requireManager().teleport_latency.snapshot()
+
+    def metrics(self, writer) -> dict:
+        """Everything METRICS recorded, only teleport latency unless the daemon was started with --metrics"""
+        return METRICS.snapshot()
+
+    def subscribe(self, writer) -> bool:
+        if writer not in self.subscribers:
+            self.subscribers[writer] = Subscriber(writer)
+            if len(self.subscribers) == 1 and self.manager != None:
+                self.onManagerThread(self.manager.scheduler.register, "daemon", self.onFrame)
+        return True
+
+    def unsubscribe(self, writer) -> bool:
+        return self.removeSubscriber(writer)
+
+    def removeSubscriber(self, writer) -> bool:
+        if self.subscribers.pop(writer, None) == None:
+            return False
+        if len(self.subscribers) == 0 and self.manager != None:
+            self.onManagerThread(self.manager.scheduler.unregister, "daemon") # stopping the scheduler waits for it
+        return True
+
+    ### TELEMETRY
+
+    def onFrame(self, frame) -> None:
+        """Scheduler callback, only swaps in the newest frame and wakes the loop if it is not already waking"""
+        with self.frame_lock:
+            waiting = self.pending_frame != None
+            self.frames += 1
+            self.pending_frame = (self.frames, frame.time_ns, frame.pos, frame.vel)
+        if not waiting:
+            self.loop.call_soon_threadsafe(self.publish)
+
+    def publish(self) -> None:
+        with self.frame_lock:
+            frame, self.pending_frame = self.pending_frame, None
+        if frame == None:
+            return
+        line = encode({"jsonrpc": "2.0", "method": "telemetry",
+                       "params": {"seq": frame[0], "time_ns": frame[1], "pos": frame[2], "vel": frame[3]}})
+        for subscriber in list(self.subscribers.values()):
+            transport = subscriber.writer.transport
+            if transport.is_closing() or transport.get_write_buffer_size() > SEND_BUFFER_LIMIT:
+                subscriber.dropped += 1
+                continue
+            subscriber.writer.write(line)
+            subscriber.sent += 1
+
+
+def encode(message) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def errorResponse(request_id, code: int, message: str) -> dict:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def runDaemon(address: str, pid: int = None, base_address: int = None) -> int:
+    """Serves until interrupted, pid and base_address attach to something other than the game like the simulator"""
+    from manager import CuriosityManager
+    from supervisor import findGamePid
+
+    def connect():
+        game_pid = pid if pid != None else findGamePid()
+        if game_pid == None:
+            raise ProcessLookupError("The game is not running")
+        return CuriosityManager(None, game_pid, base_address)
+
+    daemon = TrainerDaemon(connect, address)
+    try:
+        asyncio.run(daemon.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
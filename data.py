@@ -1,4 +1,5 @@
-import sys, os, json
+from store import PositionStore
+import sys, os
 
 VERSION = "0.3.2"
 
@@ -22,15 +23,22 @@ DEFAULT_POSITIONS = {
     'Lasers': (-45.762, -25.119, 1901.672)
 }
 
-POSITION_FILE_PATH = os.path.join(ROOT_PATH, "pos.json")
-if os.path.exists(POSITION_FILE_PATH):
-    with open(POSITION_FILE_PATH, 'r') as f:
-        try:
-            SAVED_POSITIONS = json.load(f)
-        except json.JSONDecodeError:
-            SAVED_POSITIONS = {}
-else:
-    SAVED_POSITIONS = {}
+POSITION_FILE_PATH = os.path.join(ROOT_PATH, "pos.json") # only read to import positions saved by older versions
+POSITION_DB_PATH = os.path.join(ROOT_PATH, "positions.db")
+RECORDINGS_PATH = os.path.join(ROOT_PATH, "recordings")
+SIGNATURE_CACHE_PATH = os.path.join(ROOT_PATH, "signatures.json")
+SPLITS_PATH = os.path.join(ROOT_PATH, "splits.bin")
+SAVESTATES_PATH = os.path.join(ROOT_PATH, "savestates.bin")
+DAEMON_ADDRESS = r"\\.\pipe\curiosity-trainer" if sys.platform == "win32" else os.path.join(ROOT_PATH, "trainer.sock")
+TICK_RATES = (60, 120, 240)
+PLAYBACK_SPEEDS = (0.25, 0.5, 1.0, 2.0)
+DEFAULT_HOTKEYS = {"save": "b", "load": "t", "flyhack": "h", "nearest": "n"}
+
+# nothing is read from the database until the positions are first used
+POSITION_STORE = PositionStore(POSITION_DB_PATH, POSITION_FILE_PATH)
+SAVED_POSITIONS = POSITION_STORE.collection()
+
 
-with open(os.path.join(ROOT_PATH, "assets", "theme.txt"), 'r') as f:
-    THEME = f.read()
+def loadTheme() -> str:
+    with open(os.path.join(ROOT_PATH, "assets", "theme.txt"), 'r') as f:
+        return f.read()
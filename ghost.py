@@ -0,0 +1,117 @@
+import numpy as np
+
+NEIGHBOUR_CELLS = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)])
+
+
+class GhostRun:
+    """A reference run precomputed for fast nearest-point lookups
+
+    The trajectory is bucketed into a uniform grid, stored as one array of sample indices sorted by cell with a
+    sorted array of cell keys, so finding the samples around a point is a couple of binary searches. While the
+    player is tracking the run, lookups only search a small window of segments around the previous match and the
+    grid is only used to reacquire the line after a teleport or a big shortcut"""
+
+    def __init__(self, times: np.ndarray, positions: np.ndarray, cell_size: float = 5.0, window: int = 64) -> None:
+        self.times = np.ascontiguousarray(times, dtype=np.float64)
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+        if len(self.times) < 2:
+            raise ValueError("A ghost run needs at least two samples")
+        self.cell_size = cell_size
+        self.window = window
+        self.previous = None
+
+        # segment i goes from sample i to sample i + 1
+        self.starts = self.positions[:-1]
+        self.deltas = self.positions[1:] - self.positions[:-1]
+        self.lengths_sq = np.einsum("ij,ij->i", self.deltas, self.deltas)
+        self.lengths_sq[self.lengths_sq == 0] = 1e-12 # stationary samples
+
+        cells = np.floor(self.positions / cell_size).astype(np.int64)
+        self.origin = cells.min(axis=0)
+        self.dims = cells.max(axis=0) - self.origin + 1
+        keys = self.cellKeys(cells)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    @classmethod
+    def fromRecording(cls, recording: np.ndarray, **kwargs) -> "GhostRun":
+        """Builds a ghost from a run saved by the TelemetryRecorder"""
+        times = (recording["time_ns"] - recording["time_ns"][0]) / 1_000_000_000
+        return cls(times, recording["pos"], **kwargs)
+
+    def cellKeys(self, cells: np.ndarray) -> np.ndarray:
+        cells = cells - self.origin
+        return (cells[..., 0] * self.dims[1] + cells[..., 1]) * self.dims[2] + cells[..., 2]
+
+    def nearbySamples(self, pos: tuple) -> np.ndarray:
+        """Returns the indices of every sample in the 27 grid cells around pos"""
+        cell = np.floor(np.asarray(pos) / self.cell_size).astype(np.int64)
+        cells = cell + NEIGHBOUR_CELLS
+        inside = np.all((cells >= self.origin) & (cells < self.origin + self.dims), axis=1)
+        if not inside.any():
+            return np.empty(0, dtype=np.int64)
+        keys = self.cellKeys(cells[inside])
+        lo = np.searchsorted(self.sorted_keys, keys, side="left")
+        hi = np.searchsorted(self.sorted_keys, keys, side="right")
+        return np.concatenate([self.order[a:b] for a, b in zip(lo, hi)])
+
+    def closestOnSegments(self, segments: np.ndarray, pos: np.ndarray) -> tuple:
+        """Projects pos onto the given segments and returns (segment, fraction, squared distance) of the closest"""
+        rel = pos - self.starts[segments]
+        t = np.clip(np.einsum("ij,ij->i", rel, self.deltas[segments]) / self.lengths_sq[segments], 0.0, 1.0)
+        diff = rel - self.deltas[segments] * t[:, None]
+        dist_sq = np.einsum("ij,ij->i", diff, diff)
+        best = int(np.argmin(dist_sq))
+        return int(segments[best]), float(t[best]), float(dist_sq[best])
+
+    def locate(self, pos: tuple) -> tuple:
+        """Returns (segment, fraction, distance) of the point on the run closest to pos"""
+        pos = np.asarray(pos, dtype=np.float64)
+        segment_count = len(self.starts)
+        result = None
+        if self.previous is not None:
+            lo = max(self.previous - self.window, 0)
+            hi = min(self.previous + self.window, segment_count)
+            result = self.closestOnSegments(np.arange(lo, hi), pos)
+
+        if result is None or result[2] > self.cell_size ** 2:
+            # lost the line, so reacquire it from the grid
+            samples = self.nearbySamples(pos)
+            if len(samples) > 0:
+                segments = np.unique(np.concatenate((samples - 1, samples)))
+                segments = segments[(segments >= 0) & (segments < segment_count)]
+                result = self.closestOnSegments(segments, pos)
+            elif result is None:
+                result = self.closestOnSegments(np.arange(segment_count), pos) # far away from the whole run
+
+        self.previous = result[0]
+        return result[0], result[1], float(np.sqrt(result[2]))
+
+    def timeAt(self, segment: int, fraction: float) -> float:
+        """Returns the reference time in seconds at a point along a segment"""
+        return self.times[segment] + (self.times[segment + 1] - self.times[segment]) * fraction
+
+    def reset(self) -> None:
+        self.previous = None
+
+
+class GhostCompare:
+    """Compares the live run against a ghost, the clock starts as soon as the player leaves the start of the run"""
+
+    def __init__(self, _ghost: GhostRun) -> None:
+        self.ghost = _ghost
+        self.start_ns = None
+        self.start_offset = 0.0
+        self.delta = 0.0
+
+    def update(self, time_ns: int, pos: tuple) -> float:
+        """Returns how many seconds the player is behind the ghost (negative when ahead)"""
+        segment, fraction, distance = self.ghost.locate(pos)
+        ref_time = self.ghost.timeAt(segment, fraction)
+        if self.start_ns is None:
+            if ref_time <= 0.0:
+                return 0.0
+            self.start_ns = time_ns
+            self.start_offset = ref_time
+        self.delta = (time_ns - self.start_ns) / 1_000_000_000 + self.start_offset - ref_time
+        return self.delta
@@ -0,0 +1,116 @@
+from PySide6.QtCore import Qt, QThread, Signal
+from metrics import METRICS, LatencyHistogram
+from mem_edit import MemEditError
+import queue, sys, time
+
+DEBOUNCE_NS = 150_000_000 # presses of one binding closer together than this are a bounce or a repeat, not a new press
+STALE_NS = 500_000_000 # presses still queued this long after they happened are dropped instead of acted on late
+
+
+class HotkeyPipeline(QThread):
+    """Turns global hotkey presses into game actions on a worker thread
+
+    The global_hotkeys polling thread only timestamps a press and queues it, so it never waits on the game or the
+    ui. The worker takes presses in order, drops repeats of a binding within DEBOUNCE_NS and presses that waited too
+    long, checks that the game is ready and runs the action. Actions do their game work on the worker and hand
+    anything that touches widgets to the ui thread with onUi. The time from each press to the end of its action is
+    kept in a LatencyHistogram per binding"""
+    ui_emitter = Signal(object) # something to run on the ui thread
+
+    def __init__(self, _ready, parent=None) -> None:
+        QThread.__init__(self, parent)
+        self.ready = _ready # returns whether actions can run, read on the worker so it must not touch widgets
+        self.actions = {} # name -> callback taking the press time in perf_counter_ns
+        self.bindings = {} # name -> key, as global_hotkeys spells it
+        self.latency = {} # name -> LatencyHistogram
+        self.last_pressed = {} # name -> time of the last press that was acted on
+        self.events = queue.SimpleQueue()
+        self.backend = None # the global_hotkeys module once checking has started
+        self.ui_emitter.connect(self.runOnUi, Qt.ConnectionType.QueuedConnection)
+
+    def addAction(self, name: str, callback, key: str) -> None:
+        self.actions[name] = callback
+        self.bindings[name] = key
+        self.latency[name] = LatencyHistogram(f"hotkey.{name}")
+        METRICS.share(self.latency[name])
+
+    def startChecking(self, backend) -> None:
+        """Registers every binding with global_hotkeys and starts it and the worker"""
+        self.backend = backend
+        for name, key in self.bindings.items():
+            self.register(name, key)
+        backend.start_checking_hotkeys()
+        self.start()
+
+    def register(self, name: str, key: str) -> None:
+        self.backend.register_hotkey(key, lambda: self.press(name), None)
+
+    def remap(self, name: str, key: str) -> None:
+        """Binds an action to another key, raises ValueError if the key is empty, taken or unknown"""
+        key = key.strip().lower()
+        if len(key) == 0:
+            raise ValueError("The key must not be empty")
+        for other, other_key in self.bindings.items():
+            if other != name and other_key == key:
+                raise ValueError(f"{key} is already bound to {other}")
+        old_key = self.bindings[name]
+        if key == old_key:
+            return
+        if self.backend != None:
+            self.backend.remove_hotkey(old_key)
+            try:
+                self.register(name, key)
+            except Exception as e:
+                self.register(name, old_key)
+                raise ValueError(f"{key} is not a key global_hotkeys knows: {e}")
+        self.bindings[name] = key
+
+    def press(self, name: str) -> None:
+        """Queues a press, called on the global_hotkeys thread"""
+        self.events.put((name, time.perf_counter_ns()))
+
+    def stop(self) -> None:
+        if self.backend != None:
+            self.backend.stop_checking_hotkeys()
+        if self.isRunning():
+            self.events.put(None)
+            self.wait()
+
+    def run(self) -> None:
+        METRICS.nameThread("hotkeys")
+        while True:
+            event = self.events.get()
+            if event == None:
+                return
+            self.dispatch(*event)
+
+    def dispatch(self, name: str, pressed_ns: int) -> bool:
+        """Runs the action of one press unless it is a repeat, stale or the game is not ready, returns if it ran"""
+        if time.perf_counter_ns() - pressed_ns > STALE_NS:
+            METRICS.count("hotkey.stale")
+            return False
+        last = self.last_pressed.get(name)
+        if last != None and pressed_ns - last < DEBOUNCE_NS:
+            METRICS.count(f"hotkey.{name}.debounced")
+            return False
+        self.last_pressed[name] = pressed_ns
+        if not self.ready():
+            return False
+        try:
+            self.actions[name](pressed_ns)
+        except (OSError, MemEditError):
+            METRICS.count("hotkey.errors") # the game closed mid-action, the supervisor will detach
+            return False
+        except Exception:
+            METRICS.count("hotkey.failures")
+            sys.excepthook(*sys.exc_info()) # a bug in the action, reported without stopping the worker
+            return False
+        self.latency[name].record(time.perf_counter_ns() - pressed_ns)
+        return True
+
+    def onUi(self, func) -> None:
+        """Runs func on the ui thread, after every event already queued there"""
+        self.ui_emitter.emit(func)
+
+    def runOnUi(self, func) -> None:
+        func()
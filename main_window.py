@@ -1,11 +1,20 @@
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QDoubleValidator
-from PySide6.QtWidgets import (QMainWindow, QWidget, QLabel, QLineEdit, QListWidget, QPushButton, QGroupBox,
-                               QHBoxLayout, QVBoxLayout, QMessageBox)
-from data import DEFAULT_POSITIONS, POSITION_FILE_PATH, SAVED_POSITIONS, VERSION
-from manager import CuriosityManager
-from global_hotkeys import register_hotkey, start_checking_hotkeys, stop_checking_hotkeys
-import json
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QDoubleValidator, QKeySequence, QShortcut
+from PySide6.QtWidgets import (QMainWindow, QWidget, QLabel, QLineEdit, QListView, QPushButton, QGroupBox,
+                               QHBoxLayout, QVBoxLayout, QMessageBox, QComboBox, QFileDialog, QDockWidget,
+                               QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox)
+from data import (DEFAULT_HOTKEYS, DEFAULT_POSITIONS, PLAYBACK_SPEEDS, POSITION_STORE, RECORDINGS_PATH, SAVED_POSITIONS,
+                  SAVESTATES_PATH, SPLITS_PATH, TICK_RATES, VERSION)
+from metrics import METRICS, formatNs
+from splits import SegmentTimer, SplitRecords, formatTime
+from position_list import PositionListModel
+from spatial import SpatialIndex
+from speed_graph import SpeedGraph, SpeedHistory
+import os, sys, time
+
+SPEED_DISPLAY_FPS = 30 # the speed readout repaints at most this often however fast it is sampled
+
+# the memory, numpy and hotkey backends are imported once the window is showing so it can paint as soon as possible
 
 
 class MainWindow(QMainWindow):
@@ -14,49 +23,174 @@ class MainWindow(QMainWindow):
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
         self.show()
-        self.setMinimumSize(686, 402)
+        self.setMinimumSize(686, 502)
 
         self.manager = None
+        self.reconnect_latency_ms = None
+        self.supervisor = None
+        self.hotkeys = None
+        self.spatial_index = None # built the first time a feature needs it
+        self.speed_history = SpeedHistory(target=float(self.ui.findWidget("TargetField", QLineEdit).text()))
+        self.shown_speed_count = 0
+        self.speed_timer = QTimer(self)
+        self.speed_timer.setInterval(1000 // SPEED_DISPLAY_FPS)
+        self.speed_timer.timeout.connect(self.refreshSpeed)
+        self.ui.findWidget("SpeedGraph", SpeedGraph).setHistory(self.speed_history)
+        self.split_records = None # read the first time splits are used
+        self.save_states = None # read the first time a save-state is used
+        self.split_route = None
+        self.split_timer = None
+        self.split_clock = QTimer(self)
+        self.split_clock.setInterval(1000 // SPEED_DISPLAY_FPS)
+        self.split_clock.timeout.connect(self.refreshSplitClock)
+        self.shown_ghost_count = 0
+        self.ghost_timer = QTimer(self)
+        self.ghost_timer.setInterval(1000 // SPEED_DISPLAY_FPS)
+        self.ghost_timer.timeout.connect(self.refreshGhostDelta)
+        self.fly_stats_timer = QTimer(self)
+        self.fly_stats_timer.setInterval(1000)
+        self.fly_stats_timer.timeout.connect(self.refreshFlyStats)
+        self.shown_teleport_count = 0
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setInterval(500)
+        self.latency_timer.timeout.connect(self.refreshTeleportLatency)
+        self.latency_timer.timeout.connect(self.refreshHotkeys)
+        self.latency_timer.start()
+        self.debug_timer = QTimer(self)
+        self.debug_timer.setInterval(1000)
+        self.debug_timer.timeout.connect(self.refreshDebugPanel)
+        self.debug_counts = {} # metric counts at the last refresh, for the rates
+        self.debug_refreshed_ns = time.perf_counter_ns()
+        QShortcut(QKeySequence("F12"), self).activated.connect(self.toggleDebugPanel)
+        self.scan_worker = None
+        self.playback = None # the TrajectoryPlayer that is playing
+        QShortcut(QKeySequence("F9"), self).activated.connect(self.toggleScanner)
+        QShortcut(QKeySequence("F8"), self).activated.connect(self.toggleHotkeysPanel)
+        # copies of what the hotkey actions need from the ui, kept up to date by it so the worker never reads widgets
+        self.hotkey_target = None
+        self.align_teleports = False
+        self.fly_mode = "thrust"
+        self.ui.findWidget("DebugDock", QDockWidget).visibilityChanged.connect(self.debugPanelShown)
+
+        self.positions = SAVED_POSITIONS
+        self.position_model = PositionListModel({}, self)
+        self.ui.findWidget("PositionList", QListView).setModel(self.position_model)
+        self.started = False
+
+
+    def paintEvent(self, event) -> None:
+        super(MainWindow, self).paintEvent(event)
+        if not self.started:
+            self.started = True
+            QTimer.singleShot(0, self.startBackends) # after this frame is on screen
+
+
+    def startBackends(self) -> None:
+        """Loads the saved positions and starts the supervisor and hotkeys after the window is first painted"""
+
+        if len(self.positions) == 0:
+            self.positions.update(DEFAULT_POSITIONS)
+        self.position_model = PositionListModel(self.positions, self)
+        pos_list: QListView = self.ui.findWidget("PositionList", QListView)
+        pos_list.setModel(self.position_model)
+        pos_list.selectionModel().currentChanged.connect(self.positionSelected)
+        self.selectRow(0)
+
+        from supervisor import ConnectionSupervisor
+        self.supervisor = ConnectionSupervisor()
+        self.supervisor.found.connect(self.attach)
+        self.supervisor.lost.connect(self.detach)
+        self.supervisor.start()
+
+        from hotkeys import HotkeyPipeline
+        self.hotkeys = HotkeyPipeline(self.hotkeysReady, self)
+        bindings = POSITION_STORE.hotkeys(DEFAULT_HOTKEYS)
+        self.hotkeys.addAction("save", self.savePosHotkey, bindings["save"])
+        self.hotkeys.addAction("load", self.loadPosHotkey, bindings["load"])
+        # self.hotkeys.addAction("doublejump", self.doubleJumpHotkey, "j") // hotkey isn't too necessary
+        self.hotkeys.addAction("flyhack", self.flyHackHotkey, bindings["flyhack"])
+        self.hotkeys.addAction("nearest", self.nearestPosHotkey, bindings["nearest"])
+        self.refreshHotkeys(force=True)
 
-        self.positions = SAVED_POSITIONS if SAVED_POSITIONS else DEFAULT_POSITIONS
-        pos_list: QListWidget = self.ui.findWidget("PositionList", QListWidget)
-        pos_list.addItems(list(self.positions.keys()))
-        pos_list.setCurrentRow(0)
-
-        register_hotkey("b", self.savePosHotkey, None)
-        register_hotkey("t", self.loadPosHotkey, None)
-        # register_hotkey("j", self.doubleJumpHotkey, None) // hotkey isn't too necessary
-        register_hotkey("h", self.flyHackHotkey, None)
-        start_checking_hotkeys()
+        try:
+            import global_hotkeys
+        except ImportError:
+            if sys.platform != "linux": raise
+            return # global hotkeys are windows only
+        self.hotkeys.startChecking(global_hotkeys)
 
 
     def closeEvent(self, event):
-        """Save the position list before closing"""
+        """Stops everything that is running before closing, positions are already saved as they change"""
 
-        stop_checking_hotkeys()
+        if self.hotkeys != None:
+            self.hotkeys.stop()
+        if self.supervisor != None:
+            self.supervisor.stop()
         if self.manager != None:
             self.manager.kill()
-        with open(POSITION_FILE_PATH, 'w') as f:
-            f.write(json.dumps(self.positions, indent=4))
+        POSITION_STORE.close()
         return super().closeEvent(event)
 
 
     def connect(self, show_error=True) -> bool:
         """Checks if the app can access the game memory"""
 
-        try:
-            if self.manager == None:
-                self.manager = CuriosityManager(self)
-            if not self.manager.isStillConnected():
-                self.manager.kill()
-                self.manager = None
-                raise ConnectionError
-        except:
+        if self.manager == None and self.supervisor != None and self.supervisor.pid != None:
+            self.attach(self.supervisor.pid, time.perf_counter_ns()) # the game was found but attaching failed
+        if self.manager == None:
             if show_error:
                 self.ui.showError("The game must be running first!")
             return False
-        else:
-            return True
+        return True
+
+
+    def attach(self, pid: int, found_ns: int) -> None:
+        """Connects to the game as soon as the supervisor finds it"""
+
+        from manager import CuriosityManager
+        try:
+            self.manager = CuriosityManager(self, pid)
+        except Exception:
+            self.manager = None # probably still starting up, connect will try again
+            return
+        self.reconnect_latency_ms = (time.perf_counter_ns() - found_ns) / 1_000_000
+        self.statusBar().showMessage(f"Connected to the game in {self.reconnect_latency_ms:.1f} ms", 5000)
+
+
+    def detach(self, pid: int) -> None:
+        """Cleans up after the game exits, the supervisor reattaches when it comes back"""
+
+        if self.manager != None:
+            try:
+                self.manager.kill()
+            except Exception:
+                pass # the process is already gone
+            self.manager = None
+        self.resetFeatureButtons()
+        self.statusBar().showMessage("The game was closed, waiting for it to start again")
+
+
+    def resetFeatureButtons(self) -> None:
+        buttons = {
+            "FlyButton": "Enable Fly Hack",
+            "SpeedButton": "Monitor Speed",
+            "RecordButton": "Record Run",
+            "GhostButton": "Load Ghost",
+            "PlayButton": "Play Run",
+            "ProximityButton": "Proximity Alerts",
+            "SplitButton": "Auto Splits"
+        }
+        for name, text in buttons.items():
+            button: QPushButton = self.ui.findWidget(name, QPushButton)
+            button.setChecked(False)
+            button.setText(text)
+        self.getSpeed(0.0)
+        self.getGhostDelta(0.0)
+        self.split_clock.stop()
+        self.fly_stats_timer.stop()
+        self.ui.findWidget("FlyRateLabel", QLabel).setText("0 writes/s")
+        self.ui.showScan([], "", first=True) # the scanner went with the manager
 
 
     def updatePos(self) -> None:
@@ -82,29 +216,70 @@ class MainWindow(QMainWindow):
             self.ui.showError("Name must not be empty!")
             return
 
-        pos_list: QListWidget = self.ui.findWidget("PositionList", QListWidget)
-        existing_items = pos_list.findItems(name, Qt.MatchFlag.MatchExactly)
-        if len(existing_items) == 0:
-            pos_list.addItem(name)
-            pos_list.setCurrentRow(pos_list.count() - 1)
-        else:
-            pos_list.setCurrentRow(pos_list.row(existing_items[0]))
-
         x = float(self.ui.findWidget("XPosField", QLineEdit).text())
         y = float(self.ui.findWidget("YPosField", QLineEdit).text())
         z = float(self.ui.findWidget("ZPosField", QLineEdit).text())
         self.positions[name] = (x, y, z)
+        if self.spatial_index != None:
+            self.spatial_index.add(name, (x, y, z))
 
+        row = self.position_model.addName(name)
+        if row == None: # hidden by the filter, so clear it to show the new position
+            self.ui.findWidget("FilterField", QLineEdit).clear()
+            row = self.position_model.rowOf(name)
+        self.selectRow(row)
 
-    def savePosHotkey(self) -> None:
-        """Updates the current position then saves it when the hotkey is released"""
 
-        if not self.connect(show_error=False):
-            return
-        if not self.manager.isFocused():
+    def selectRow(self, row: int) -> None:
+        pos_list: QListView = self.ui.findWidget("PositionList", QListView)
+        if row < self.position_model.rowCount():
+            pos_list.setCurrentIndex(self.position_model.index(row))
+            pos_list.scrollTo(self.position_model.index(row))
+
+
+    def selectedPosition(self) -> str:
+        """Returns the name of the selected position, or None if nothing is selected"""
+
+        pos_list: QListView = self.ui.findWidget("PositionList", QListView)
+        index = pos_list.currentIndex()
+        return self.position_model.nameAt(index.row()) if index.isValid() else None
+
+
+    def filterPositions(self, text: str) -> None:
+        """Only lists the positions whose name contains the filter text"""
+
+        selected = self.selectedPosition()
+        self.position_model.setFilter(text)
+        row = self.position_model.rowOf(selected) if selected != None else None
+        self.selectRow(row if row != None else 0)
+
+
+    def positionSelected(self, current, previous) -> None:
+        self.hotkey_target = self.position_model.nameAt(current.row()) if current.isValid() else None
+
+
+    def hotkeysReady(self) -> bool:
+        """Hotkey actions only run while attached to the game and it is focused, checked on the hotkey worker. The ui
+        thread can still detach while an action runs, so actions take the manager once and only read and write
+        through it, feature toggles are sent to the ui thread"""
+
+        return self.manager != None and self.supervisor.focused
+
+
+    def savePosHotkey(self, pressed_ns: int) -> None:
+        """Reads the current position on the hotkey worker, then saves it as Hotkey on the ui thread"""
+
+        manager = self.manager
+        if manager == None:
             return
+        pos = manager.readPosition()
+        self.hotkeys.onUi(lambda: self.saveHotkeyPos(pos))
+
 
-        self.updatePos()
+    def saveHotkeyPos(self, pos: tuple) -> None:
+        self.ui.findWidget("XPosField", QLineEdit).setText(f"{pos[0]:.3f}")
+        self.ui.findWidget("YPosField", QLineEdit).setText(f"{pos[1]:.3f}")
+        self.ui.findWidget("ZPosField", QLineEdit).setText(f"{pos[2]:.3f}")
         self.ui.findWidget("NameField", QLineEdit).setText("Hotkey")
         self.savePos()
 
@@ -115,34 +290,236 @@ class MainWindow(QMainWindow):
         if not self.connect():
             return
 
-        pos_list: QListWidget = self.ui.findWidget("PositionList", QListWidget)
-        if pos_list.count() == 0:
+        name = self.selectedPosition()
+        if name == None:
+            return
+
+        self.teleport(name, time.perf_counter_ns())
+
+
+    def loadPosHotkey(self, pressed_ns: int) -> None:
+        """Teleports to the selected position, on the hotkey worker"""
+
+        manager = self.manager
+        name = self.hotkey_target
+        if manager != None and name != None and name in self.positions:
+            self.teleport(name, pressed_ns, manager)
+
+
+    def teleport(self, name: str, pressed_ns: int, manager=None) -> None:
+        manager = manager if manager != None else self.manager
+        manager.teleport(self.positions[name], pressed_ns, self.align_teleports)
+
+
+    def setAlignTeleports(self, on: bool) -> None:
+        self.align_teleports = on
+
+
+    def refreshTeleportLatency(self) -> None:
+        latency = self.manager.teleport_latency if self.manager != None else None
+        count = latency.count if latency != None else 0
+        if count == self.shown_teleport_count:
+            return
+        self.shown_teleport_count = count
+        text = f"p50 {formatNs(latency.percentile(50))}, p99 {formatNs(latency.percentile(99))}" if count else "-"
+        self.ui.findWidget("TeleportLatencyLabel", QLabel).setText(f"Teleport latency: {text}")
+
+
+    def exportTeleportLatency(self) -> None:
+        """Saves the teleport latency histogram as JSON"""
+
+        if not self.connect():
+            return
+
+        default_path = os.path.join(RECORDINGS_PATH, "teleport_latency.json")
+        path = QFileDialog.getSaveFileName(self, "Export Teleport Latency", default_path, "JSON (*.json)")[0]
+        if not path:
             return
+        try:
+            self.manager.teleport_latency.exportJson(path)
+        except OSError as e:
+            self.ui.showError(f"Could not export the latency: {e}")
+
 
-        self.manager.writePosition(self.positions[pos_list.item(pos_list.currentRow()).text()])
+    def spatialIndex(self) -> SpatialIndex:
+        with POSITION_STORE.lock: # the hotkey worker can build it too, and positions must not change meanwhile
+            if self.spatial_index == None:
+                self.spatial_index = SpatialIndex(points=self.positions)
+        return self.spatial_index
 
 
-    def loadPosHotkey(self) -> None:
-        """Teleports to the selected position when the hotkey is pressed with the game focused"""
+    def nearestPosHotkey(self, pressed_ns: int) -> None:
+        """Teleports to the saved position closest to the player on the hotkey worker, then selects it"""
 
-        if not self.connect(show_error=False):
+        manager = self.manager
+        if manager == None:
             return
-        if not self.manager.isFocused():
+        name, distance = self.spatialIndex().nearest(manager.readPosition())
+        if name == None:
+            return
+        self.teleport(name, pressed_ns, manager)
+        self.hotkeys.onUi(lambda: self.selectPosition(name))
+
+
+    def selectPosition(self, name: str) -> None:
+        row = self.position_model.rowOf(name)
+        if row != None:
+            self.selectRow(row)
+
+
+    def toggleProximity(self) -> None:
+        """Shows a message whenever the player gets close to a saved position"""
+
+        proximity_button: QPushButton = self.ui.findWidget("ProximityButton", QPushButton)
+        if not self.connect():
+            proximity_button.setChecked(False)
             return
 
-        self.loadPos()
+        self.manager.toggleProximity(proximity_button.isChecked(), self.spatialIndex())
+
+
+    def enteredPosition(self, name: str) -> None:
+        self.statusBar().showMessage(f"Reached {name}", 3000)
+
+
+    def toggleSplits(self) -> None:
+        """Times the positions shown in the list as a route, filter the list to pick which ones"""
+
+        split_button: QPushButton = self.ui.findWidget("SplitButton", QPushButton)
+        if not self.connect():
+            split_button.setChecked(False)
+            return
+
+        if not split_button.isChecked():
+            split_button.setText("Auto Splits")
+            self.manager.toggleSplits(False)
+            self.split_clock.stop()
+            if self.split_timer.state == "running":
+                self.endRun(self.split_timer.splits)
+            return
+
+        names = list(self.position_model.visible)
+        if len(names) < 2:
+            self.ui.showError("Filter the position list down to a route of at least two positions!")
+            split_button.setChecked(False)
+            return
+        if self.split_records == None:
+            try:
+                self.split_records = SplitRecords(SPLITS_PATH)
+            except (OSError, ValueError, EOFError) as e:
+                self.ui.showError(f"Could not read the saved splits: {e}")
+                split_button.setChecked(False)
+                return
+        self.split_route = self.split_records.route(names)
+        self.split_timer = SegmentTimer(names, [self.positions[name] for name in names])
+        self.ui.showSplits(self.split_route)
+        split_button.setText("Stop Splits")
+        self.manager.toggleSplits(True, self.split_timer)
+
+
+    def splitEvent(self, event: str, index: int, splits: tuple) -> None:
+        """Shows the start, splits and finish of a run as the segment timer reports them"""
+
+        if event == "start":
+            self.ui.showSplits(self.split_route)
+            self.split_clock.start()
+        elif event == "split" or event == "finish":
+            self.ui.showSplit(self.split_route, index - 1, splits)
+            if event == "finish":
+                self.split_clock.stop()
+                self.ui.findWidget("SplitClock", QLabel).setText(formatTime(splits[-1]))
+                self.endRun(splits)
+        elif event == "reset":
+            self.split_clock.stop()
+            self.endRun(splits)
+
+
+    def endRun(self, splits: tuple) -> None:
+        """Saves the golds and personal best of a run that finished, was reset or was stopped"""
+
+        splits = list(splits)
+        if len(splits) == 0:
+            return
+        golds = self.split_route.addSplits(splits)
+        try:
+            self.split_records.save()
+        except OSError as e:
+            self.statusBar().showMessage(f"Could not save splits: {e}", 5000)
+        if len(splits) == len(self.split_route.pb) and self.split_route.pb == splits:
+            self.statusBar().showMessage("New personal best!", 5000)
+        elif golds:
+            self.statusBar().showMessage(f"{len(golds)} gold segment(s)", 5000)
+        self.ui.showSplitTotals(self.split_route)
+
+
+    def saveStates(self):
+        """Returns the save-states, reading them the first time, or None if they could not be read"""
+
+        if self.save_states == None:
+            from savestate import SaveStates
+            try:
+                self.save_states = SaveStates(SAVESTATES_PATH, self.manager.state_layout)
+            except (OSError, ValueError) as e:
+                self.ui.showError(f"Could not read the save-states: {e}")
+                return None
+            self.ui.showStates(list(self.save_states.states))
+        return self.save_states
+
+
+    def saveState(self) -> None:
+        """Saves the player's position, velocity and the rest of the restorable fields under the typed name"""
+
+        if not self.connect() or self.saveStates() == None:
+            return
+
+        state_box: QComboBox = self.ui.findWidget("StateBox", QComboBox)
+        name = state_box.currentText().strip() or f"State {len(self.save_states.states) + 1}"
+        self.save_states.add(self.manager.captureState(name))
+        try:
+            self.save_states.save()
+        except OSError as e:
+            self.statusBar().showMessage(f"Could not save the save-states: {e}", 5000)
+        self.ui.showStates(list(self.save_states.states), name)
+
+
+    def loadState(self) -> None:
+        if not self.connect() or self.saveStates() == None:
+            return
+
+        name = self.ui.findWidget("StateBox", QComboBox).currentText()
+        if name in self.save_states.states:
+            self.manager.restoreState(self.save_states.states[name])
+
+
+    def deleteState(self) -> None:
+        if not self.connect() or self.saveStates() == None:
+            return
+
+        self.save_states.remove(self.ui.findWidget("StateBox", QComboBox).currentText())
+        try:
+            self.save_states.save()
+        except OSError as e:
+            self.statusBar().showMessage(f"Could not save the save-states: {e}", 5000)
+        self.ui.showStates(list(self.save_states.states))
+
+
+    def refreshSplitClock(self) -> None:
+        timer = self.split_timer
+        if timer != None and timer.start_ns != None and timer.state == "running":
+            self.ui.findWidget("SplitClock", QLabel).setText(formatTime(time.perf_counter_ns() - timer.start_ns))
 
 
     def deletePos(self) -> None:
         """Deletes a position from the list"""
 
-        pos_list: QListWidget = self.ui.findWidget("PositionList", QListWidget)
-        current_item = pos_list.currentItem()
-        if current_item == None:
+        name = self.selectedPosition()
+        if name == None:
             return
 
-        pos_list.takeItem(pos_list.currentRow())
-        del self.positions[current_item.text()]
+        self.position_model.removeName(name)
+        del self.positions[name]
+        if self.spatial_index != None:
+            self.spatial_index.remove(name)
 
 
     # def toggleDoubleJump(self) -> None:
@@ -179,51 +556,375 @@ class MainWindow(QMainWindow):
         if not self.connect():
             return
 
+        state = self.ui.findWidget("FlyButton", QPushButton).isChecked()
+        self.manager.toggleFlyHack(state, self.fly_mode)
+        self.showFlyHack(state)
+
+
+    def showFlyHack(self, state: bool) -> None:
         fly_button: QPushButton = self.ui.findWidget("FlyButton", QPushButton)
-        state = fly_button.isChecked()
+        fly_button.setChecked(state)
         if state:
             fly_button.setText("Disable Fly Hack")
+            self.fly_stats_timer.start()
         else:
             fly_button.setText("Enable Fly Hack")
-        self.manager.toggleFlyHack(state)
+            self.fly_stats_timer.stop()
+        self.refreshFlyStats()
 
 
-    def flyHackHotkey(self) -> None:
-        """Activates fly hack when the hotkey is pressed"""
+    def setFlyMode(self) -> None:
+        self.fly_mode = self.ui.findWidget("FlyModeBox", QComboBox).currentText().lower()
+        if self.manager != None and self.manager.flyhack != None:
+            self.toggleFlyHack()
 
-        if not self.connect(show_error=False):
-            return
-        if not self.manager.isFocused():
-            return
 
-        fly_button: QPushButton = self.ui.findWidget("FlyButton", QPushButton)
-        fly_button.setChecked(not fly_button.isChecked())
-        self.toggleFlyHack()
+    def refreshFlyStats(self) -> None:
+        flyhack = self.manager.flyhack if self.manager != None else None
+        rate = flyhack.writes_per_s if flyhack != None else 0.0
+        self.ui.findWidget("FlyRateLabel", QLabel).setText(f"{rate:.0f} writes/s")
+
+
+    def flyHackHotkey(self, pressed_ns: int) -> None:
+        """Toggles fly hack on the ui thread, like every other feature toggle, so they never race each other"""
+
+        self.hotkeys.onUi(self.toggleFlyHackHotkey)
+
+
+    def toggleFlyHackHotkey(self) -> None:
+        if self.manager == None:
+            return # detached while the press was queued
+        state = self.manager.flyhack == None
+        self.manager.toggleFlyHack(state, self.fly_mode)
+        self.showFlyHack(state)
 
 
     def toggleSpeedMonitor(self) -> None:
         """Outputs the current player speed"""
 
+        speed_button: QPushButton = self.ui.findWidget("SpeedButton", QPushButton)
         if not self.connect():
+            speed_button.setChecked(False)
             speed_button.setText("Monitor Speed")
             self.getSpeed(0.0)
             return
 
-        speed_button: QPushButton = self.ui.findWidget("SpeedButton", QPushButton)
         state = speed_button.isChecked()
         if state:
             speed_button.setText("Stop")
+            self.speed_history.reset()
+            self.speed_timer.start()
         else:
             speed_button.setText("Monitor Speed")
             self.getSpeed(0.0)
-        self.manager.toggleSpeedMonitor(state)
+        self.manager.toggleSpeedMonitor(state, self.speed_history)
 
 
     def getSpeed(self, speed: float) -> None:
+        self.speed_timer.stop()
         speed_field: QLineEdit = self.ui.findWidget("SpeedField", QLineEdit)
         speed_field.setText(f"{speed:.3f}")
 
 
+    def refreshSpeed(self) -> None:
+        """Shows the samples collected since the last frame, does nothing if there are none"""
+
+        history = self.speed_history
+        if history.count == self.shown_speed_count:
+            return
+        self.shown_speed_count = history.count
+        self.ui.findWidget("SpeedField", QLineEdit).setText(f"{history.latest:.3f}")
+        self.ui.findWidget("PeakField", QLineEdit).setText(f"{history.peak:.3f}")
+        self.ui.findWidget("AverageField", QLineEdit).setText(f"{history.average:.3f}")
+        self.ui.findWidget("AboveField", QLineEdit).setText(f"{history.above_ns / 1_000_000_000:.2f} s")
+        self.ui.findWidget("SpeedGraph", SpeedGraph).update()
+
+
+    def setTargetSpeed(self) -> None:
+        target_field: QLineEdit = self.ui.findWidget("TargetField", QLineEdit)
+        try:
+            target = float(target_field.text())
+        except ValueError:
+            return
+        self.speed_history.setTarget(target)
+        self.ui.findWidget("SpeedGraph", SpeedGraph).target = target
+        self.shown_speed_count = -1 # show the reset time above the target
+        self.refreshSpeed()
+
+
+    def toggleRecording(self) -> None:
+        """Records the player position and velocity every telemetry tick to a .npy file"""
+
+        record_button: QPushButton = self.ui.findWidget("RecordButton", QPushButton)
+        if not self.connect():
+            record_button.setChecked(False)
+            return
+
+        if record_button.isChecked():
+            path = os.path.join(RECORDINGS_PATH, time.strftime("run_%Y%m%d_%H%M%S.npy"))
+            self.manager.setTickRate(int(self.ui.findWidget("RateBox", QComboBox).currentText()))
+            self.manager.toggleRecorder(True, path)
+            record_button.setText("Stop Recording")
+        else:
+            self.manager.toggleRecorder(False)
+            record_button.setText("Record Run")
+
+
+    def toggleGhost(self) -> None:
+        """Loads a recorded run and shows how far ahead or behind it the player is"""
+
+        ghost_button: QPushButton = self.ui.findWidget("GhostButton", QPushButton)
+        if not self.connect():
+            ghost_button.setChecked(False)
+            return
+
+        if not ghost_button.isChecked():
+            ghost_button.setText("Load Ghost")
+            self.manager.toggleGhost(False)
+            self.getGhostDelta(0.0)
+            return
+
+        from ghost import GhostRun
+        from recorder import loadRecording
+        path = QFileDialog.getOpenFileName(self, "Load Ghost", RECORDINGS_PATH, "Recorded Runs (*.npy)")[0]
+        try:
+            ghost = GhostRun.fromRecording(loadRecording(path))
+        except (OSError, ValueError, KeyError):
+            if path:
+                self.ui.showError("That file is not a recorded run!")
+            ghost_button.setChecked(False)
+            return
+
+        ghost_button.setText("Stop Ghost")
+        self.manager.toggleGhost(True, ghost)
+        self.shown_ghost_count = 0
+        self.ghost_timer.start()
+
+
+    def togglePlayback(self) -> None:
+        """Plays a recorded run back into the game at the speed and from the time picked next to the button"""
+
+        play_button: QPushButton = self.ui.findWidget("PlayButton", QPushButton)
+        if not self.connect():
+            play_button.setChecked(False)
+            return
+
+        if not play_button.isChecked():
+            self.manager.togglePlayback(False) # playbackDone resets the button
+            return
+
+        from recorder import loadRecording
+        path = QFileDialog.getOpenFileName(self, "Play Run", RECORDINGS_PATH, "Recorded Runs (*.npy)")[0]
+        try:
+            player = self.manager.playbackPlayer(loadRecording(path), self.playbackSpeed())
+            player.seek(float(self.ui.findWidget("PlayStartField", QLineEdit).text() or 0))
+        except (OSError, ValueError, KeyError):
+            if path:
+                self.ui.showError("That file is not a recorded run!")
+            play_button.setChecked(False)
+            return
+
+        play_button.setText("Stop Playback")
+        self.playback = player
+        self.manager.togglePlayback(True, player).done_emitter.connect(self.playbackDone)
+
+
+    def playbackSpeed(self) -> float:
+        return PLAYBACK_SPEEDS[self.ui.findWidget("PlaySpeedBox", QComboBox).currentIndex()]
+
+
+    def setPlaybackSpeed(self) -> None:
+        if self.playback != None:
+            self.playback.setSpeed(self.playbackSpeed())
+
+
+    def playbackDone(self, report: dict) -> None:
+        self.playback = None
+        play_button: QPushButton = self.ui.findWidget("PlayButton", QPushButton)
+        play_button.setChecked(False)
+        play_button.setText("Play Run")
+        if report["position"] < report["duration"]:
+            self.ui.findWidget("PlayStartField", QLineEdit).setText(f"{report['position']:.2f}") # to carry on from
+        if "error" in report:
+            self.statusBar().showMessage(f"Playback stopped: {report['error']}", 5000)
+            return
+        self.statusBar().showMessage(f"Played {report['written']} samples ({report['dropped']} dropped), late by "
+                                     f"{formatNs(report['error_p50_ns'])} p50 / {formatNs(report['error_p99_ns'])} p99",
+                                     10000)
+
+
+    def getGhostDelta(self, delta: float) -> None:
+        self.ghost_timer.stop()
+        ghost_field: QLineEdit = self.ui.findWidget("GhostField", QLineEdit)
+        ghost_field.setText(f"{delta:+.3f} s")
+
+
+    def refreshGhostDelta(self) -> None:
+        """Shows the latest delta against the ghost, does nothing if it has not changed since the last frame"""
+
+        watch = self.manager.ghostwatch if self.manager != None else None
+        if watch == None or watch.count == self.shown_ghost_count:
+            return
+        self.shown_ghost_count = watch.count
+        self.ui.findWidget("GhostField", QLineEdit).setText(f"{watch.delta:+.3f} s")
+
+
+    def setTickRate(self) -> None:
+        """Changes how often the telemetry features sample the game"""
+
+        if self.manager != None:
+            self.manager.setTickRate(int(self.ui.findWidget("RateBox", QComboBox).currentText()))
+
+
+    def toggleScanner(self) -> None:
+        dock: QDockWidget = self.ui.findWidget("ScannerDock", QDockWidget)
+        dock.setVisible(not dock.isVisible())
+
+
+    def scanValues(self, first: bool) -> None:
+        """Starts a first or next value scan with what is picked in the scanner, on a worker thread"""
+
+        if not self.connect() or self.scan_worker != None:
+            return
+
+        value_type = self.ui.findWidget("ScanTypeBox", QComboBox).currentText().lower()
+        kind = self.ui.findWidget("ScanKindBox", QComboBox).currentText().lower()
+        parse = float if value_type != "int32" else lambda text: int(text, 0)
+        try:
+            value = parse(self.ui.findWidget("ScanValueField", QLineEdit).text()) if kind in ("exact", "range") else None
+            high = parse(self.ui.findWidget("ScanHighField", QLineEdit).text()) if kind == "range" else None
+        except ValueError:
+            self.ui.showError("Enter the value to scan for first!")
+            return
+
+        scanner = self.manager.valueScanner(value_type)
+        if first:
+            scan = lambda: scanner.firstScan(kind, value, high)
+        else:
+            scan = lambda: scanner.nextScan(kind, value, high)
+        from manager import ScanWorker
+        self.scan_worker = ScanWorker(scan)
+        self.scan_worker.done_emitter.connect(self.scanDone)
+        self.scan_worker.start()
+        self.ui.findWidget("ScanStatus", QLabel).setText("Scanning...")
+
+
+    def scanDone(self, count: int, error: Exception) -> None:
+        self.scan_worker.wait()
+        self.scan_worker = None
+        scanner = self.manager.scanner if self.manager != None else None
+        if error != None or scanner == None:
+            self.ui.showScan([], "The scan failed" + (f": {error}" if error != None else ""), first=True)
+            return
+        rate = scanner.scanned_bytes / scanner.scan_seconds / 1e9 if scanner.scan_seconds else 0.0
+        status = f"{count:,} candidates, compared in {scanner.scan_seconds * 1000:.1f} ms ({rate:.1f} GB/s)"
+        self.ui.showScan(scanner.results(), status, first=False)
+
+
+    def resetScan(self) -> None:
+        if self.manager != None and self.manager.scanner != None and self.scan_worker == None:
+            self.manager.scanner.reset()
+        self.ui.showScan([], "", first=True)
+
+
+    def toggleHotkeysPanel(self) -> None:
+        dock: QDockWidget = self.ui.findWidget("HotkeysDock", QDockWidget)
+        dock.setVisible(not dock.isVisible())
+        self.refreshHotkeys()
+
+
+    def refreshHotkeys(self, force: bool = False) -> None:
+        """Lists every binding with its key and latency from the press to the end of its action"""
+
+        if self.hotkeys == None or not (force or self.ui.findWidget("HotkeysDock", QDockWidget).isVisible()):
+            return
+        rows = []
+        for name, key in self.hotkeys.bindings.items():
+            latency = self.hotkeys.latency[name]
+            rows.append((name, key, latency.count, latency.percentile(50), latency.percentile(99)))
+        self.ui.showHotkeys(rows)
+
+
+    def remapHotkey(self, item: QTableWidgetItem) -> None:
+        """Binds the action of an edited row to the key typed in, and saves it with the positions"""
+
+        if self.hotkeys == None or item.column() != 1:
+            return
+        name = self.ui.findWidget("HotkeysTable", QTableWidget).item(item.row(), 0).text()
+        try:
+            self.hotkeys.remap(name, item.text())
+        except ValueError as e:
+            self.ui.showError(str(e))
+        else:
+            POSITION_STORE.saveHotkey(name, self.hotkeys.bindings[name])
+        self.refreshHotkeys(force=True)
+
+
+    def toggleDebugPanel(self) -> None:
+        dock: QDockWidget = self.ui.findWidget("DebugDock", QDockWidget)
+        dock.setVisible(not dock.isVisible())
+
+
+    def debugPanelShown(self, visible: bool) -> None:
+        if visible:
+            self.refreshDebugPanel()
+            self.debug_timer.start()
+        else:
+            self.debug_timer.stop()
+
+
+    def refreshDebugPanel(self) -> None:
+        """Lists every metric with its rate since the last refresh, and the backlog of each metered signal"""
+
+        snapshot = METRICS.snapshot()
+        now = time.perf_counter_ns()
+        seconds = max(now - self.debug_refreshed_ns, 1) / 1_000_000_000
+        self.debug_refreshed_ns = now
+
+        rows = []
+        counts = {}
+        for name, histogram in snapshot["histograms"].items():
+            counts[name] = histogram["count"]
+            rows.append([name, histogram["count"], histogram["p50"], histogram["p99"], histogram["max"]])
+        for name, value in snapshot["counters"].items():
+            counts[name] = value
+            rows.append([name, value, None, None, None])
+            if name.endswith(".emitted"):
+                handled = snapshot["counters"].get(name[:-len("emitted")] + "handled", 0)
+                rows.append([name[:-len("emitted")] + "backlog", value - handled, None, None, None])
+        for row in rows:
+            row.insert(2, (row[1] - self.debug_counts.get(row[0], row[1])) / seconds)
+        self.debug_counts = counts
+
+        if METRICS.enabled:
+            status = f"{len(snapshot['threads'])} threads over {snapshot['elapsed_ns'] / 1_000_000_000:.0f} s"
+        else:
+            status = "Only teleport latency is recorded, start the trainer with --metrics for the rest"
+        self.ui.showMetrics(rows, status)
+
+
+    def resetMetrics(self) -> None:
+        METRICS.reset()
+        self.debug_counts = {}
+        self.refreshDebugPanel()
+
+
+    def exportMetrics(self, trace: bool = False) -> None:
+        """Saves the metrics as JSON, or the recorded spans as a Chrome trace"""
+
+        name, kind = ("trace.json", "Chrome Trace (*.json)") if trace else ("metrics.json", "JSON (*.json)")
+        path = QFileDialog.getSaveFileName(self, "Export Metrics", os.path.join(RECORDINGS_PATH, name), kind)[0]
+        if not path:
+            return
+        try:
+            if trace:
+                METRICS.exportTrace(path)
+            else:
+                METRICS.exportJson(path)
+        except OSError as e:
+            self.ui.showError(f"Could not export the metrics: {e}")
+
+
 ### UI CODE <-------------------------------------------------------------------------------------
 class Ui_MainWindow(object):
     def setupUi(self, window: QMainWindow) -> None:
@@ -234,10 +935,14 @@ class Ui_MainWindow(object):
         main_layout = QVBoxLayout(central_widget)
 
         main_layout.addWidget(self.createPositionGroup(), 5)
-        main_layout.addWidget(self.createMiscGroup(), 2)
+        main_layout.addWidget(self.createMiscGroup(), 3)
 
         central_widget.setLayout(main_layout)
         window.setCentralWidget(central_widget)
+        window.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.createSplitsDock())
+        window.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.createDebugDock())
+        window.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.createScannerDock())
+        window.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.createHotkeysDock())
 
 
     def createPositionGroup(self) -> QWidget:
@@ -247,8 +952,14 @@ class Ui_MainWindow(object):
 
         # left side
         left_layout = QVBoxLayout()
-        pos_list = QListWidget(group)
+        filter_edit = QLineEdit(group)
+        filter_edit.setObjectName("FilterField")
+        filter_edit.setPlaceholderText("Search Positions")
+        filter_edit.textChanged.connect(self.window.filterPositions)
+        left_layout.addWidget(filter_edit)
+        pos_list = QListView(group)
         pos_list.setObjectName("PositionList")
+        pos_list.setUniformItemSizes(True) # lets the view lay out rows without asking for every one of them
         left_layout.addWidget(pos_list)
         left_hl_layout = QHBoxLayout()
         del_button = QPushButton("Delete Position", group)
@@ -290,6 +1001,19 @@ class Ui_MainWindow(object):
         save_button.clicked.connect(self.window.savePos)
         edit_layout.addWidget(save_button, 1)
         right_layout.addLayout(edit_layout)
+        latency_layout = QHBoxLayout()
+        align_box = QCheckBox("Align To Tick", group)
+        align_box.setObjectName("AlignTeleportBox")
+        align_box.setToolTip("Teleport straight after the next telemetry read while a live feature is running")
+        align_box.toggled.connect(self.window.setAlignTeleports)
+        latency_layout.addWidget(align_box)
+        latency_label = QLabel("Teleport latency: -", group)
+        latency_label.setObjectName("TeleportLatencyLabel")
+        latency_layout.addWidget(latency_label, 1)
+        export_button = QPushButton("Export", group)
+        export_button.clicked.connect(self.window.exportTeleportLatency)
+        latency_layout.addWidget(export_button)
+        right_layout.addLayout(latency_layout)
         group_layout.addLayout(right_layout)
 
         group.setLayout(group_layout)
@@ -312,14 +1036,50 @@ class Ui_MainWindow(object):
         fly_button.setCheckable(True)
         fly_button.clicked.connect(self.window.toggleFlyHack)
         buttons_layout.addWidget(fly_button)
+        fly_mode_box = QComboBox(group)
+        fly_mode_box.setObjectName("FlyModeBox")
+        fly_mode_box.addItems(["Thrust", "Hover"])
+        fly_mode_box.currentIndexChanged.connect(self.window.setFlyMode)
+        buttons_layout.addWidget(fly_mode_box)
+        fly_rate_label = QLabel("0 writes/s", group)
+        fly_rate_label.setObjectName("FlyRateLabel")
+        buttons_layout.addWidget(fly_rate_label)
+        proximity_button = QPushButton("Proximity Alerts", group)
+        proximity_button.setObjectName("ProximityButton")
+        proximity_button.setCheckable(True)
+        proximity_button.clicked.connect(self.window.toggleProximity)
+        buttons_layout.addWidget(proximity_button)
+        split_button = QPushButton("Auto Splits", group)
+        split_button.setObjectName("SplitButton")
+        split_button.setCheckable(True)
+        split_button.clicked.connect(self.window.toggleSplits)
+        buttons_layout.addWidget(split_button)
         group_layout.addLayout(buttons_layout)
 
+        states_layout = QHBoxLayout()
+        state_box = QComboBox(group)
+        state_box.setObjectName("StateBox")
+        state_box.setEditable(True)
+        state_box.lineEdit().setPlaceholderText("Save-State Name")
+        states_layout.addWidget(state_box, 2)
+        for text, slot in (("Save State", self.window.saveState), ("Load State", self.window.loadState),
+                           ("Delete State", self.window.deleteState)):
+            state_button = QPushButton(text, group)
+            state_button.clicked.connect(slot)
+            states_layout.addWidget(state_button, 1)
+        group_layout.addLayout(states_layout)
+
         speed_layout = QHBoxLayout()
         speed_field_layout = QHBoxLayout()
         speed_field_layout.addWidget(QLabel("Current Speed"))
         speed_view = QLineEdit("0.0", group)
         speed_view.setObjectName("SpeedField")
         speed_field_layout.addWidget(speed_view)
+        speed_field_layout.addWidget(QLabel("Ghost Delta"))
+        ghost_view = QLineEdit("+0.000 s", group)
+        ghost_view.setObjectName("GhostField")
+        ghost_view.setReadOnly(True)
+        speed_field_layout.addWidget(ghost_view)
         speed_layout.addLayout(speed_field_layout, 1)
         speed_button = QPushButton("Monitor Speed", group)
         speed_button.setObjectName("SpeedButton")
@@ -328,10 +1088,289 @@ class Ui_MainWindow(object):
         speed_layout.addWidget(speed_button, 1)
         group_layout.addLayout(speed_layout)
 
+        stats_layout = QHBoxLayout()
+        stat_fields = (("Peak", "PeakField", "0.000"), ("Average", "AverageField", "0.000"),
+                       ("Time Above Target", "AboveField", "0.00 s"))
+        for label, name, text in stat_fields:
+            stats_layout.addWidget(QLabel(label))
+            stat_view = QLineEdit(text, group)
+            stat_view.setObjectName(name)
+            stat_view.setReadOnly(True)
+            stats_layout.addWidget(stat_view)
+        stats_layout.addWidget(QLabel("Target"))
+        target_view = QLineEdit("30.0", group)
+        target_view.setObjectName("TargetField")
+        target_view.setValidator(QDoubleValidator(0.0, 100000.0, 3, group))
+        target_view.editingFinished.connect(self.window.setTargetSpeed)
+        stats_layout.addWidget(target_view)
+        group_layout.addLayout(stats_layout)
+        speed_graph = SpeedGraph(group)
+        speed_graph.setObjectName("SpeedGraph")
+        speed_graph.target = float(target_view.text())
+        group_layout.addWidget(speed_graph)
+
+        record_layout = QHBoxLayout()
+        rate_layout = QHBoxLayout()
+        rate_layout.addWidget(QLabel("Tick Rate (Hz)"))
+        rate_box = QComboBox(group)
+        rate_box.setObjectName("RateBox")
+        rate_box.addItems([str(rate) for rate in TICK_RATES])
+        rate_box.currentIndexChanged.connect(self.window.setTickRate)
+        rate_layout.addWidget(rate_box)
+        record_layout.addLayout(rate_layout, 1)
+        record_button = QPushButton("Record Run", group)
+        record_button.setObjectName("RecordButton")
+        record_button.setCheckable(True)
+        record_button.clicked.connect(self.window.toggleRecording)
+        record_layout.addWidget(record_button, 1)
+        ghost_button = QPushButton("Load Ghost", group)
+        ghost_button.setObjectName("GhostButton")
+        ghost_button.setCheckable(True)
+        ghost_button.clicked.connect(self.window.toggleGhost)
+        record_layout.addWidget(ghost_button, 1)
+        group_layout.addLayout(record_layout)
+
+        play_layout = QHBoxLayout()
+        play_layout.addWidget(QLabel("Start (s)"))
+        play_start_view = QLineEdit("0.00", group)
+        play_start_view.setObjectName("PlayStartField")
+        play_start_view.setValidator(QDoubleValidator(0.0, 100000.0, 2, group))
+        play_layout.addWidget(play_start_view, 1)
+        play_speed_box = QComboBox(group)
+        play_speed_box.setObjectName("PlaySpeedBox")
+        play_speed_box.addItems([f"{speed:g}x" for speed in PLAYBACK_SPEEDS])
+        play_speed_box.setCurrentIndex(PLAYBACK_SPEEDS.index(1.0))
+        play_speed_box.currentIndexChanged.connect(self.window.setPlaybackSpeed)
+        play_layout.addWidget(play_speed_box, 1)
+        play_button = QPushButton("Play Run", group)
+        play_button.setObjectName("PlayButton")
+        play_button.setCheckable(True)
+        play_button.clicked.connect(self.window.togglePlayback)
+        play_layout.addWidget(play_button, 1)
+        group_layout.addLayout(play_layout)
+
         group.setLayout(group_layout)
         return group
 
 
+    def showStates(self, names: list, selected: str = None) -> None:
+        state_box: QComboBox = self.findWidget("StateBox", QComboBox)
+        state_box.clear()
+        state_box.addItems(names)
+        if selected != None:
+            state_box.setCurrentText(selected)
+
+
+    def createSplitsDock(self) -> QWidget:
+        dock = QDockWidget("Splits", self.window)
+        dock.setObjectName("SplitsDock")
+        contents = QWidget(dock)
+        layout = QVBoxLayout(contents)
+        table = QTableWidget(0, 4, contents)
+        table.setObjectName("SplitTable")
+        table.setHorizontalHeaderLabels(["Split", "Time", "Delta", "Best Segment"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(table)
+        clock = QLabel("0.000", contents)
+        clock.setObjectName("SplitClock")
+        clock.setAlignment(Qt.AlignmentFlag.AlignRight)
+        clock.setStyleSheet("font-size: 24px;")
+        layout.addWidget(clock)
+        totals = QLabel(contents)
+        totals.setObjectName("SplitTotals")
+        layout.addWidget(totals)
+        contents.setLayout(layout)
+        dock.setWidget(contents)
+        dock.hide() # shown when splits are turned on
+        return dock
+
+
+    def showSplits(self, route) -> None:
+        """Lists the splits of a route with its personal best times, ready for a new run"""
+        self.findWidget("SplitsDock", QDockWidget).show()
+        table: QTableWidget = self.findWidget("SplitTable", QTableWidget)
+        table.setRowCount(len(route.pb))
+        for row, name in enumerate(route.names[1:]):
+            cells = (name, formatTime(route.pb[row]), "", formatTime(route.best[row]))
+            for column, text in enumerate(cells):
+                table.setItem(row, column, QTableWidgetItem(text))
+        self.findWidget("SplitClock", QLabel).setText("0.000")
+        self.showSplitTotals(route)
+
+
+    def showSplit(self, route, row: int, splits: list) -> None:
+        table: QTableWidget = self.findWidget("SplitTable", QTableWidget)
+        split = splits[row]
+        table.item(row, 1).setText(formatTime(split))
+        if route.pb[row] != None:
+            table.item(row, 2).setText(formatTime(split - route.pb[row], signed=True))
+        segment = split - (splits[row - 1] if row > 0 else 0)
+        if route.best[row] == None or segment < route.best[row]:
+            table.item(row, 3).setText(formatTime(segment) + " *") # a gold, saved when the run ends
+        table.scrollToItem(table.item(row, 0))
+
+
+    def showSplitTotals(self, route) -> None:
+        totals: QLabel = self.findWidget("SplitTotals", QLabel)
+        totals.setText(f"PB {formatTime(route.pb[-1])}    Sum of Best {formatTime(route.sum_of_best)}")
+
+
+    def createDebugDock(self) -> QWidget:
+        dock = QDockWidget("Debug (F12)", self.window)
+        dock.setObjectName("DebugDock")
+        contents = QWidget(dock)
+        layout = QVBoxLayout(contents)
+        status = QLabel(contents)
+        status.setObjectName("MetricsStatus")
+        layout.addWidget(status)
+        table = QTableWidget(0, 6, contents)
+        table.setObjectName("MetricsTable")
+        table.setHorizontalHeaderLabels(["Metric", "Count", "Per Second", "p50", "p99", "Max"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(table)
+        buttons_layout = QHBoxLayout()
+        reset_button = QPushButton("Reset", contents)
+        reset_button.clicked.connect(self.window.resetMetrics)
+        buttons_layout.addWidget(reset_button)
+        json_button = QPushButton("Export JSON", contents)
+        json_button.clicked.connect(lambda: self.window.exportMetrics(trace=False))
+        buttons_layout.addWidget(json_button)
+        trace_button = QPushButton("Export Trace", contents)
+        trace_button.clicked.connect(lambda: self.window.exportMetrics(trace=True))
+        buttons_layout.addWidget(trace_button)
+        layout.addLayout(buttons_layout)
+        contents.setLayout(layout)
+        dock.setWidget(contents)
+        dock.hide() # toggled with F12
+        return dock
+
+
+    def showMetrics(self, rows: list, status: str) -> None:
+        """Fills the debug table from rows of (name, count, per second, p50, p99, max), durations in ns"""
+        self.findWidget("MetricsStatus", QLabel).setText(status)
+        table: QTableWidget = self.findWidget("MetricsTable", QTableWidget)
+        table.setRowCount(len(rows))
+        for row, (name, count, rate, p50, p99, high) in enumerate(rows):
+            cells = (name, str(count), f"{rate:.1f}", formatNs(p50), formatNs(p99), formatNs(high))
+            for column, text in enumerate(cells):
+                table.setItem(row, column, QTableWidgetItem(text))
+
+
+    def createHotkeysDock(self) -> QWidget:
+        dock = QDockWidget("Hotkeys (F8)", self.window)
+        dock.setObjectName("HotkeysDock")
+        contents = QWidget(dock)
+        layout = QVBoxLayout(contents)
+        layout.addWidget(QLabel("Double click a key to change it, keys are spelled as in global_hotkeys", contents))
+        table = QTableWidget(0, 5, contents)
+        table.setObjectName("HotkeysTable")
+        table.setHorizontalHeaderLabels(["Action", "Key", "Presses", "p50", "p99"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.EditTrigger.DoubleClicked)
+        table.itemChanged.connect(self.window.remapHotkey)
+        layout.addWidget(table)
+        contents.setLayout(layout)
+        dock.setWidget(contents)
+        dock.hide() # toggled with F8
+        return dock
+
+
+    def showHotkeys(self, rows: list) -> None:
+        """Fills the hotkeys table from rows of (action, key, presses, p50, p99), only the key can be edited"""
+        table: QTableWidget = self.findWidget("HotkeysTable", QTableWidget)
+        if table.state() == QTableWidget.State.EditingState:
+            return # refreshed again once the key is typed in
+        table.blockSignals(True) # filling it is not an edit
+        table.setRowCount(len(rows))
+        for row, (name, key, count, p50, p99) in enumerate(rows):
+            for column, text in enumerate((name, key, str(count), formatNs(p50), formatNs(p99))):
+                item = QTableWidgetItem(text)
+                if column != 1:
+                    item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
+                table.setItem(row, column, item)
+        table.blockSignals(False)
+
+
+    def createScannerDock(self) -> QWidget:
+        dock = QDockWidget("Value Scanner (F9)", self.window)
+        dock.setObjectName("ScannerDock")
+        contents = QWidget(dock)
+        layout = QVBoxLayout(contents)
+        options_layout = QHBoxLayout()
+        type_box = QComboBox(contents)
+        type_box.setObjectName("ScanTypeBox")
+        type_box.addItems(["Int32", "Float", "Double"])
+        options_layout.addWidget(type_box)
+        kind_box = QComboBox(contents)
+        kind_box.setObjectName("ScanKindBox")
+        options_layout.addWidget(kind_box)
+        layout.addLayout(options_layout)
+        values_layout = QHBoxLayout()
+        value_edit = QLineEdit(contents)
+        value_edit.setObjectName("ScanValueField")
+        value_edit.setPlaceholderText("Value")
+        values_layout.addWidget(value_edit)
+        high_edit = QLineEdit(contents)
+        high_edit.setObjectName("ScanHighField")
+        high_edit.setPlaceholderText("Up To (Range)")
+        values_layout.addWidget(high_edit)
+        layout.addLayout(values_layout)
+        buttons_layout = QHBoxLayout()
+        first_button = QPushButton("First Scan", contents)
+        first_button.clicked.connect(lambda: self.window.scanValues(first=True))
+        buttons_layout.addWidget(first_button)
+        next_button = QPushButton("Next Scan", contents)
+        next_button.setObjectName("NextScanButton")
+        next_button.clicked.connect(lambda: self.window.scanValues(first=False))
+        buttons_layout.addWidget(next_button)
+        reset_button = QPushButton("Reset", contents)
+        reset_button.clicked.connect(self.window.resetScan)
+        buttons_layout.addWidget(reset_button)
+        layout.addLayout(buttons_layout)
+        status = QLabel(contents)
+        status.setObjectName("ScanStatus")
+        layout.addWidget(status)
+        table = QTableWidget(0, 2, contents)
+        table.setObjectName("ScanTable")
+        table.setHorizontalHeaderLabels(["Address", "Value"])
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(table)
+        contents.setLayout(layout)
+        dock.setWidget(contents)
+        dock.hide() # toggled with F9
+        self.showScan([], "", first=True)
+        return dock
+
+
+    def showScan(self, results: list, status: str, first: bool) -> None:
+        """Shows up to the first thousand (address, value) candidates, and the scans that can be done next"""
+        kind_box: QComboBox = self.findWidget("ScanKindBox", QComboBox)
+        if first:
+            kinds = ["Exact", "Range", "Unknown"]
+        else:
+            kinds = ["Exact", "Range", "Changed", "Unchanged", "Increased", "Decreased"]
+        if [kind_box.itemText(i) for i in range(kind_box.count())] != kinds:
+            kind_box.clear()
+            kind_box.addItems(kinds)
+        self.findWidget("NextScanButton", QPushButton).setEnabled(not first)
+        self.findWidget("ScanStatus", QLabel).setText(status)
+        table: QTableWidget = self.findWidget("ScanTable", QTableWidget)
+        table.setRowCount(len(results))
+        for row, (address, value) in enumerate(results):
+            table.setItem(row, 0, QTableWidgetItem(f"{address:X}"))
+            table.setItem(row, 1, QTableWidgetItem(str(value)))
+
+
     def findWidget(self, widget_name: str, widget_type) -> QWidget:
         return self.window.findChild(widget_type, widget_name, Qt.FindChildOption.FindChildrenRecursively)
 
@@ -1,7 +1,24 @@
-from PySide6.QtCore import QThread, Signal, QObject
-import ctypes, math, win32ui, win32process, win32api
-from mem_edit import Process
-import time
+from PySide6.QtCore import Qt, QThread, Signal, QObject
+from memory import InstrumentedBackend, MemoryBackend, ProcessBackend
+from recorder import TelemetryRecorder
+from ghost import GhostCompare, GhostRun
+from spatial import ProximityTracker, SpatialIndex
+from speed_graph import SpeedHistory
+from splits import SegmentTimer
+from signature import imageSize, locateStatics
+from pointerscan import PointerIndex, scanPointerPaths
+from valuescan import ValueScanner
+from savestate import SaveState, StateLayout
+from playback import TrajectoryPlayer
+from data import SIGNATURE_CACHE_PATH, TICK_RATES
+from metrics import METRICS, LatencyHistogram
+from collections import deque
+import ctypes, math, sys, threading, time
+
+try:
+    import win32ui, win32process, win32api
+except ImportError:
+    if sys.platform != "linux": raise # pointer resolution can still be used against linux processes
 
 
 class CuriosityManager(QObject):
@@ -13,27 +30,94 @@ class CuriosityManager(QObject):
     POS_SCALE = 100
     VELOCITY_PTR = (0x080ADEB8 + 0x2380, (0xA0, 0x10, 0x0, 0xB0, 0x90, 0x320, 0xC8))
 
+    # save-states copy these parts of the player objects, (pointer, offset from its target, size)
+    # and only restore the fields in them, (name, region index, offset from the pointer target, size)
+    STATE_REGIONS = (("POS_PTR", -0x100, 0x200), ("VELOCITY_PTR", -0x80, 0x100))
+    STATE_FIELDS = (
+        ("position", 0, -0x10, 24),
+        ("position_copy", 0, -0xD8, 24),
+        ("velocity", 1, -0x10, 24)
+    )
 
-    def __init__(self, parent=None) -> None:
+    # signatures of instructions that reference the static bases, used to find them again after a game update
+    # when a signature is not found (or matches more than once) the hardcoded base above is used instead
+    # e.g. "POS_PTR": signature.Signature("48 8B 05 ?? ?? ?? ?? 48 85 C0 74 ?? 48 8B 40 ??")
+    # pointers without one get a signature learned from the build their hardcoded base belongs to
+    SIGNATURES = {}
+    STATIC_POINTERS = ("POS_PTR", "VELOCITY_PTR")
+
+
+    def __init__(self, parent=None, pid: int = None, _base_address: int = None, _backend: MemoryBackend = None) -> None:
         QObject.__init__(self, parent)
-        hwnd = win32ui.FindWindow("UnrealWindow", "Curiosity  ").GetSafeHwnd()
-        self.PID = win32process.GetWindowThreadProcessId(hwnd)[1]
-        process = win32api.OpenProcess(0x1F0FFF, True, self.PID)
-        modules = win32process.EnumProcessModules(process)
-        process.close()
-        self.BASE_ADDRESS = modules[0]
-        self.game = Process(self.PID)
-        self.flyhack_thread = None
-        self.speedwatch_thread = None
+        if pid == None:
+            hwnd = win32ui.FindWindow("UnrealWindow", "Curiosity  ").GetSafeHwnd()
+            pid = win32process.GetWindowThreadProcessId(hwnd)[1]
+        self.PID = pid
+        if _base_address == None:
+            process = win32api.OpenProcess(0x1F0FFF, True, self.PID)
+            modules = win32process.EnumProcessModules(process)
+            process.close()
+            _base_address = modules[0]
+        self.BASE_ADDRESS = _base_address # given directly for targets that are not the game, like the simulator
+        self.game = _backend if _backend != None else ProcessBackend(self.PID)
+        if METRICS.enabled:
+            self.game = InstrumentedBackend(self.game)
+            self.getPTRAddr = METRICS.timed("getPTRAddr", self.getPTRAddr)
+        self.locatePointers()
+        self.pointers = PointerCache(self.game, self.BASE_ADDRESS)
+        self.scheduler = TelemetryScheduler(self)
+        self.flyhack = None
+        self.speedwatch = None
+        self.recorder = None
+        self.ghostwatch = None
+        self.proximitywatch = None
+        self.splitwatch = None
+        self.scanner = None
+        self.playback = None
+        self.teleport_latency = LatencyHistogram("teleport") # from the key press to the write completing
+        METRICS.share(self.teleport_latency)
+        self.state_layout = StateLayout(self.STATE_REGIONS, self.STATE_FIELDS)
+        self.state_latency = LatencyHistogram("state_load")
+        METRICS.share(self.state_latency)
+
+
+    def locatePointers(self) -> None:
+        """Replaces the hardcoded pointer bases with the ones found by signature scanning the game module"""
+        try:
+            known = {name: getattr(self, name)[0] for name in self.STATIC_POINTERS}
+            found = locateStatics(self.game, self.BASE_ADDRESS, self.SIGNATURES, SIGNATURE_CACHE_PATH, known)
+        except (OSError, ValueError):
+            return # unreadable module headers, keep the hardcoded bases
+        for name, base in found.items():
+            setattr(self, name, (base, getattr(self, name)[1]))
+
+
+    def findPointerPaths(self, target: int, depth: int = 7, max_offset: int = 0x1000) -> list:
+        """Pointer scans for chains from the game module to target, in the same (base, offsets) form as POS_PTR
+
+        This snapshots every readable region of the game so it can take a while and use a lot of memory"""
+        header = self.game.read_memory(self.BASE_ADDRESS, (ctypes.c_ubyte * 0x1000)())
+        index = PointerIndex.fromProcess(self.game)
+        return scanPointerPaths(index, target, self.BASE_ADDRESS, imageSize(bytes(header)), depth, max_offset)
+
+
+    def valueScanner(self, value_type: str) -> ValueScanner:
+        """Returns the value scanner for value_type, starting a new one if the type changed"""
+        if self.scanner == None or self.scanner.value_type != value_type:
+            if self.scanner != None:
+                self.scanner.close()
+            self.scanner = ValueScanner(self.game, value_type)
+        return self.scanner
 
 
     def kill(self) -> None:
         """Kills any currently running threads so that the window can close without issue"""
-        if self.flyhack_thread != None:
-            self.flyhack_thread.on = False
-        if self.speedwatch_thread != None:
-            self.speedwatch_thread.on = False
-        time.sleep(0.1)
+        self.scheduler.stop()
+        self.togglePlayback(False)
+        if self.recorder != None:
+            self.recorder.close()
+        if self.scanner != None:
+            self.scanner.close()
         self.game.close()
 
 
@@ -45,42 +129,97 @@ class CuriosityManager(QObject):
 
     def isStillConnected(self) -> bool:
         """Checks if the game is still running by checking if its PID is in the list of running process IDs"""
-        return self.PID in self.game.list_available_pids()
+        return self.game.isAlive()
 
 
     def getPTRAddr(self, pointer: tuple) -> int:
-        """Gets the final address of a pointer"""
-        addr, offsets = pointer
-        offset = self.BASE_ADDRESS + addr
-        for i in range(len(offsets)):
-            offset = self.game.read_memory(offset, ctypes.c_void_p()).value
-            offset += offsets[i]
-        return offset
+        """Gets the final address of a pointer, reusing the previously resolved chain while it is still valid"""
+        return self.pointers.resolve(pointer)
 
 
     def readPosition(self) -> tuple:
         """Returns a tuple of the current player position"""
         addr = self.getPTRAddr(self.POS_PTR)
-        pos = self.game.read_memory(addr - 0x10, Vector3())
+        pos, = self.game.readBatch([(addr - 0x10, Vector3)])
         return (pos.X / self.POS_SCALE, pos.Y / self.POS_SCALE, pos.Z / self.POS_SCALE)
 
 
-    def writePosition(self, _pos: tuple) -> None:
-        """Writes the position to memory to teleport the player"""
-        addr = self.getPTRAddr(self.POS_PTR)
+    def readState(self, pos_addr: int = None, vel_addr: int = None) -> tuple:
+        """Returns the current player position and velocity using a single batched read"""
+        if pos_addr == None or vel_addr == None:
+            pos_addr = self.getPTRAddr(self.POS_PTR)
+            vel_addr = self.getPTRAddr(self.VELOCITY_PTR)
+        pos, vel = self.game.readBatch([(pos_addr - 0x10, Vector3), (vel_addr - 0x10, Vector3)])
+        return (pos.X / self.POS_SCALE, pos.Y / self.POS_SCALE, pos.Z / self.POS_SCALE), (vel.X, vel.Y, vel.Z)
+
+
+    def writePosition(self, _pos: tuple, pos_addr: int = None, vel_addr: int = None, _vel: tuple = (0, 0, 0)) -> None:
+        """Writes the position to memory to teleport the player
+
+        The position, its copy and the velocity (zeroed unless given) go out back-to-back in one batched write"""
+        if pos_addr == None or vel_addr == None:
+            pos_addr = self.getPTRAddr(self.POS_PTR)
+            vel_addr = self.getPTRAddr(self.VELOCITY_PTR)
 
-        # set position
         pos = Vector3(
             _pos[0] * self.POS_SCALE,
             _pos[1] * self.POS_SCALE,
             _pos[2] * self.POS_SCALE
         )
-        self.game.write_memory(addr - 0x10, pos)
-        self.game.write_memory(addr - 0xD8, pos)
+        self.game.writeBatch([
+            (pos_addr - 0x10, pos),
+            (pos_addr - 0xD8, pos),
+            (vel_addr - 0x10, Vector3(*_vel))
+        ])
+
+
+    def teleport(self, _pos: tuple, started_ns: int = None, aligned: bool = False) -> None:
+        """Teleports the player and records the time from started_ns (when the key was pressed) to the write
+
+        While the scheduler is running, the addresses it resolved on its latest tick are used so the teleport does
+        no pointer reads at all. With aligned, the write is handed to the scheduler and done straight after its next
+        read instead, so it never lands between the sampler reading the position and the velocity"""
+        if started_ns == None:
+            started_ns = time.perf_counter_ns()
+        if aligned and self.scheduler.submit(lambda frame: self.finishTeleport(_pos, started_ns, frame)):
+            return
+        self.finishTeleport(_pos, started_ns, self.scheduler.latestFrame())
+
+
+    def finishTeleport(self, _pos: tuple, started_ns: int, frame) -> None:
+        if frame != None:
+            self.writePosition(_pos, frame.pos_addr, frame.vel_addr)
+        else:
+            self.writePosition(_pos)
+        self.teleport_latency.record(time.perf_counter_ns() - started_ns)
+
+
+    def stateTargets(self) -> list:
+        """Returns the resolved target of every save-state region's pointer, from the scheduler's frame if it is fresh"""
+        frame = self.scheduler.latestFrame()
+        resolved = {"POS_PTR": frame.pos_addr, "VELOCITY_PTR": frame.vel_addr} if frame != None else {}
+        return [resolved[name] if name in resolved else self.getPTRAddr(getattr(self, name))
+                for name, offset, size in self.state_layout.regions]
+
+
+    def captureState(self, name: str) -> SaveState:
+        """Copies every save-state region in one batched read"""
+        layout = self.state_layout
+        targets = self.stateTargets()
+        regions = self.game.readBatch([(target + offset, ctypes.c_ubyte * size)
+                                       for target, (pointer, offset, size) in zip(targets, layout.regions)])
+        return SaveState(name, [bytes(region) for region in regions], layout.all_fields, time.time_ns())
 
-        # reset velocity
-        addr = self.getPTRAddr(self.VELOCITY_PTR)
-        self.game.write_memory(addr - 0x10, Vector3(0, 0, 0))
+
+    def restoreState(self, state: SaveState, mask: int = None, started_ns: int = None) -> None:
+        """Writes the fields of a save-state back in one batched write, mask picks fewer fields than it was saved with"""
+        if started_ns == None:
+            started_ns = time.perf_counter_ns()
+        targets = self.stateTargets()
+        writes = self.state_layout.writes(state.regions, state.mask if mask == None else state.mask & mask)
+        self.game.writeBatch([(targets[region] + offset, (ctypes.c_ubyte * len(data)).from_buffer_copy(data))
+                              for region, offset, data in writes])
+        self.state_latency.record(time.perf_counter_ns() - started_ns)
 
 
     # def toggleDoubleJump(self, on: bool) -> None:
@@ -92,58 +231,504 @@ class CuriosityManager(QObject):
     #     self.game.write_memory(effect_addr + 0x2, ctypes.c_bool(on))
 
 
-    def toggleFlyHack(self, on: bool) -> None:
+    def toggleFlyHack(self, on: bool, mode: str = "thrust") -> None:
         if not on:
-            if self.flyhack_thread != None:
-                self.flyhack_thread.on = False
+            if self.flyhack != None:
+                self.scheduler.unregister("flyhack")
+                self.flyhack = None
                 addr = self.getPTRAddr(self.VELOCITY_PTR)
                 self.game.write_memory(addr, ctypes.c_double(0.0)) # only reset z velocity when exiting flyhack
             return
         else:
-            self.flyhack_thread = FlyHack(self.game, self.getPTRAddr(self.VELOCITY_PTR))
-            self.flyhack_thread.start()
+            self.flyhack = FlyHack(self.game, mode) # replaces a running one, so the mode can change mid-flight
+            self.scheduler.register("flyhack", self.flyhack.tick)
+            return
+
+
+    def toggleSpeedMonitor(self, on: bool, history: SpeedHistory = None) -> None:
+        """Adds the player speed to history every tick, the ui reads it on its own frame timer"""
+        if not on:
+            if self.speedwatch != None:
+                self.scheduler.unregister("speedwatch")
+                self.speedwatch = None
+            return
+        else:
+            self.speedwatch = SpeedWatch(history)
+            self.scheduler.register("speedwatch", self.speedwatch.tick)
+
+
+    def toggleRecorder(self, on: bool, path: str = None) -> int:
+        """Starts recording telemetry to path, or stops and returns how many samples were recorded"""
+        if not on:
+            if self.recorder == None:
+                return 0
+            self.scheduler.unregister("recorder")
+            count = self.recorder.close()
+            self.recorder = None
+            return count
+        else:
+            self.recorder = TelemetryRecorder(path)
+            self.scheduler.register("recorder", self.recorder.tick)
+            return 0
+
+
+    def toggleGhost(self, on: bool, ghost: GhostRun = None) -> None:
+        if not on:
+            if self.ghostwatch != None:
+                self.scheduler.unregister("ghost")
+                self.ghostwatch = None
+            return
+        else:
+            ghost.reset()
+            self.ghostwatch = GhostWatch(ghost) # read by the ui at its own frame rate
+            self.scheduler.register("ghost", self.ghostwatch.tick)
+
+
+    def toggleProximity(self, on: bool, index: SpatialIndex = None, radius: float = 3.0) -> None:
+        if not on:
+            if self.proximitywatch != None:
+                self.scheduler.unregister("proximity")
+                self.proximitywatch = None
             return
+        else:
+            self.proximitywatch = ProximityWatch(index, radius)
+            self.proximitywatch.entered_emitter.connect(self.parent().enteredPosition)
+            self.meterSignal("proximity", self.proximitywatch, self.proximitywatch.entered_emitter)
+            self.scheduler.register("proximity", self.proximitywatch.tick)
 
 
-    def toggleSpeedMonitor(self, on: bool) -> None:
+    def toggleSplits(self, on: bool, timer: SegmentTimer = None) -> None:
         if not on:
-            if self.speedwatch_thread != None:
-                self.speedwatch_thread.on = False
+            if self.splitwatch != None:
+                self.scheduler.unregister("splits")
+                self.splitwatch = None
             return
         else:
-            self.speedwatch_thread = SpeedWatch(self.game, self.getPTRAddr(self.VELOCITY_PTR))
-            self.speedwatch_thread.speed_emitter.connect(self.parent().getSpeed)
-            self.speedwatch_thread.start()
+            self.splitwatch = SplitWatch(timer)
+            self.splitwatch.split_emitter.connect(self.parent().splitEvent)
+            self.meterSignal("splits", self.splitwatch, self.splitwatch.split_emitter)
+            self.scheduler.register("splits", self.splitwatch.tick)
+
+
+    def meterSignal(self, name: str, watch: QObject, signal) -> None:
+        """Counts the backlog of a watch's signal to the ui while metrics are enabled"""
+        if METRICS.enabled:
+            SignalMeter(name, signal, watch)
+
+
+    def setTickRate(self, rate: int) -> None:
+        self.scheduler.setRate(rate)
+
+
+    def playbackPlayer(self, recording, speed: float = 1.0) -> TrajectoryPlayer:
+        """Returns a player that writes a recording's positions and velocities through addresses resolved now"""
+        pos_addr = self.getPTRAddr(self.POS_PTR)
+        vel_addr = self.getPTRAddr(self.VELOCITY_PTR)
+        write = lambda pos, vel: self.writePosition(pos, pos_addr, vel_addr, vel)
+        return TrajectoryPlayer.fromRecording(recording, write, _speed=speed)
+
+
+    def togglePlayback(self, on: bool, player: TrajectoryPlayer = None) -> "PlaybackWorker":
+        """Starts playing player back on its own thread, or stops the playback that is running"""
+        if not on:
+            if self.playback != None:
+                self.playback.player.stop()
+                self.playback.wait()
+                self.playback = None
+            return None
+        else:
+            self.togglePlayback(False)
+            METRICS.share(player.errors)
+            self.playback = PlaybackWorker(player)
+            self.playback.start(QThread.Priority.TimeCriticalPriority)
+            return self.playback
 
 
-class FlyHack(QThread):
-    def __init__(self, _game: Process, _addr: int) -> None:
+class PointerCache:
+    """Remembers every hop of the resolved pointer chains so that later lookups only cost a single read
+
+    The value stored at the last hop is used as a sentinel. If it still points to the same object, the cached address
+    is returned as-is. Otherwise the chain is checked from the top down for the first hop that changed and only the
+    part of the chain from it on is walked again, which is what happens after a level load or respawn"""
+
+    def __init__(self, _game: MemoryBackend, _base_address: int) -> None:
+        self.game = _game
+        self.base_address = _base_address
+        self.chains = {} # pointer -> list of (hop address, value read at that hop)
+        self.hits = 0
+        self.misses = 0
+        self.reads = 0
+        self.uncached_reads = 0 # reads a full walk on every lookup would have needed
+        self.lock = threading.Lock() # lookups happen on both the ui thread and the scheduler thread
+
+    def readPointer(self, addr: int) -> int:
+        self.reads += 1
+        value = self.game.read_memory(addr, ctypes.c_void_p()).value
+        return value if value != None else 0
+
+    def walk(self, pointer: tuple, hops: list, start: int) -> int:
+        """Walks the chain from the hop at index start, keeping the hops above it, and only caches the chain once
+        every hop was read, so a read failing partway never leaves a chain that is cut short behind"""
+        addr, offsets = pointer
+        self.chains.pop(pointer, None)
+        walked = hops[:start]
+        hop_addr = self.base_address + addr if start == 0 else walked[start - 1][1] + offsets[start - 1]
+        for i in range(start, len(offsets)):
+            value = self.readPointer(hop_addr)
+            walked.append((hop_addr, value))
+            hop_addr = value + offsets[i]
+        self.chains[pointer] = walked
+        return hop_addr
+
+    def resolve(self, pointer: tuple) -> int:
+        """Returns the final address of a pointer"""
+        with self.lock:
+            return self.lookup(pointer)
+
+    def lookup(self, pointer: tuple) -> int:
+        offsets = pointer[1]
+        self.uncached_reads += len(offsets)
+        hops = self.chains.get(pointer)
+        if hops == None or len(hops) != len(offsets):
+            self.misses += 1
+            return self.walk(pointer, [], 0)
+
+        try:
+            # sentinel check, the last hop still points to the same object
+            last_addr, last_value = hops[-1]
+            if self.readPointer(last_addr) == last_value:
+                self.hits += 1
+                return last_value + offsets[-1]
+
+            # walk again from the first hop that changed, every hop above it still leads to the same objects. A
+            # stale object further down can still hold its old value, so the hops are checked from the top
+            start = len(hops) - 1
+            for i in range(len(hops) - 1):
+                hop_addr, value = hops[i]
+                if self.readPointer(hop_addr) != value:
+                    start = i
+                    break
+        except Exception:
+            start = 0 # an unreadable hop means the chain must be walked again from the start
+
+        self.misses += 1
+        return self.walk(pointer, hops, start)
+
+    def invalidate(self) -> None:
+        """Forgets every resolved chain so the next lookups walk from the base address"""
+        self.chains.clear()
+
+    @property
+    def reads_saved(self) -> int:
+        """How many reads were avoided compared to walking the chain from the base address on every lookup"""
+        return self.uncached_reads - self.reads
+
+
+class TelemetryFrame:
+    """The player state read once per scheduler tick and shared by every registered feature"""
+    __slots__ = ("time_ns", "pos_addr", "vel_addr", "pos", "vel")
+
+    def __init__(self) -> None:
+        self.time_ns = 0
+        self.pos_addr = 0
+        self.vel_addr = 0
+        self.pos = (0.0, 0.0, 0.0)
+        self.vel = (0.0, 0.0, 0.0)
+
+
+class TelemetryScheduler(QThread):
+    """Runs every live feature from one fixed-timestep loop so they all share a single batched read per tick
+
+    Deadlines are kept on an absolute perf_counter_ns timeline so sleep overshoot does not accumulate into drift.
+    If a tick is late by more than a whole period, the missed ticks are counted and skipped instead of replayed"""
+    RATES = TICK_RATES
+
+    def __init__(self, _manager: CuriosityManager, _rate: int = 60) -> None:
         QThread.__init__(self, None)
+        self.manager = _manager
+        self.frame = TelemetryFrame()
+        self.callbacks = {}
+        self.jobs = deque() # one-off writes to do straight after the next read, each taking the TelemetryFrame
+        self.read_ns = 0 # when the frame addresses were last read successfully
+        self.on = False
+        self.lock = threading.Lock() # features are toggled from the ui thread and the hotkey worker
+        self.setRate(_rate)
+        self.resetStats()
+        self.tick = METRICS.timed("scheduler.tick", self.tick)
+
+    def setRate(self, rate: int) -> None:
+        if rate not in self.RATES:
+            raise ValueError(f"Tick rate must be one of {self.RATES}")
+        self.rate = rate
+        self.period_ns = 1_000_000_000 // rate
+
+    def resetStats(self) -> None:
+        self.ticks = 0
+        self.missed = 0
+        self.errors = 0
+        self.callback_errors = 0
+        self.last_jitter_ns = 0
+        self.max_jitter_ns = 0
+        self.total_jitter_ns = 0
+
+    @property
+    def mean_jitter_ns(self) -> float:
+        return self.total_jitter_ns / self.ticks if self.ticks else 0.0
+
+    def register(self, name: str, callback) -> None:
+        """Adds a per-tick callback taking a TelemetryFrame, starting the loop if it is not running yet"""
+        with self.lock:
+            # the dict is replaced instead of mutated so the loop never iterates over a changing dict
+            self.callbacks = {**self.callbacks, name: METRICS.timed(f"tick.{name}", callback)}
+            if not self.on:
+                if QThread.currentThread() != self:
+                    self.wait() # a loop that ended on its own may still be finishing, start() would do nothing
+                self.on = True
+                self.start()
+
+    def unregister(self, name: str) -> None:
+        """Removes a callback, stopping the loop once nothing is left to run"""
+        with self.lock:
+            self.callbacks = {key: value for key, value in self.callbacks.items() if key != name}
+            if len(self.callbacks) == 0:
+                self.stopLocked()
+
+    def stop(self) -> None:
+        with self.lock:
+            self.stopLocked()
+
+    def stopLocked(self) -> None:
+        # callbacks never toggle features, so waiting for the loop while holding the lock can not deadlock
+        self.on = False
+        if QThread.currentThread() != self:
+            self.wait()
+            self.runJobs(None) # jobs submitted as the loop stopped still happen, with addresses resolved again
+
+    def submit(self, job) -> bool:
+        """Queues job to run straight after the next tick's read, returns False if the loop is not running"""
+        if not self.on:
+            return False
+        self.jobs.append(job)
+        return True
+
+    def runJobs(self, frame: TelemetryFrame) -> None:
+        while self.jobs:
+            try:
+                self.jobs.popleft()(frame)
+            except Exception:
+                self.errors += 1
+
+    def latestFrame(self) -> TelemetryFrame:
+        """Returns the latest frame if its addresses were read within the last two ticks, otherwise None"""
+        if not self.on or time.perf_counter_ns() - self.read_ns > 2 * self.period_ns:
+            return None
+        return self.frame
+
+    def readFrame(self) -> None:
+        manager = self.manager
+        frame = self.frame
+        frame.pos_addr = manager.getPTRAddr(manager.POS_PTR)
+        frame.vel_addr = manager.getPTRAddr(manager.VELOCITY_PTR)
+        pos, vel = manager.game.readBatch([(frame.pos_addr - 0x10, Vector3), (frame.vel_addr - 0x10, Vector3)])
+        scale = manager.POS_SCALE
+        frame.pos = (pos.X / scale, pos.Y / scale, pos.Z / scale)
+        frame.vel = (vel.X, vel.Y, vel.Z)
+
+    def tick(self) -> None:
+        try:
+            self.readFrame()
+        except Exception:
+            self.errors += 1 # the game is probably closing, the connection check will clean up after us
+            return
+        self.read_ns = self.frame.time_ns
+        if self.jobs:
+            self.runJobs(self.frame)
+        for name, callback in self.callbacks.items():
+            try:
+                callback(self.frame)
+            except Exception:
+                self.callback_errors += 1 # one broken feature must not stop the others or the loop
+                METRICS.count(f"scheduler.errors.{name}")
+
+    def run(self) -> None:
+        METRICS.nameThread("scheduler")
+        deadline = time.perf_counter_ns()
+        try:
+            while self.on:
+                now = time.perf_counter_ns()
+                late = now - deadline
+                if late >= self.period_ns:
+                    self.missed += late // self.period_ns
+                    METRICS.count("scheduler.missed_ticks", late // self.period_ns)
+                    deadline = now
+                    late = 0
+
+                self.ticks += 1
+                self.last_jitter_ns = late
+                self.total_jitter_ns += late
+                if late > self.max_jitter_ns:
+                    self.max_jitter_ns = late
+
+                self.frame.time_ns = now
+                self.tick()
+
+                deadline += self.period_ns
+                remaining = deadline - time.perf_counter_ns()
+                if remaining > 0:
+                    time.sleep(remaining / 1_000_000_000)
+                else:
+                    METRICS.count("scheduler.overruns") # the tick ran past the start of the next one
+        finally:
+            self.on = False # whatever ended the loop, the next register() starts it again
+
+
+class FlyHack:
+    """Keeps the player's upward velocity up with as few writes as possible
+
+    The Z velocity read with every frame is compared against the target and only written when it has fallen more
+    than the tolerance below it, so writes follow how often the game pulls the value down instead of the tick rate.
+    Thrust climbs at a constant speed, hover steers the climb speed to hold the height it was turned on at. The
+    velocity address comes from the pointer cache every tick, so it follows the player through respawns"""
+    THRUST = "thrust"
+    HOVER = "hover"
+    MODES = (THRUST, HOVER)
+
+    def __init__(self, _game: MemoryBackend, _mode: str = THRUST, _thrust: float = 325*10, # high jump velocity x10
+                 _tolerance: float = 50.0, _hover_gain: float = 4.0) -> None:
+        if _mode not in self.MODES:
+            raise ValueError(f"Fly mode must be one of {self.MODES}")
         self.game = _game
-        self.addr = _addr
-        self.on = True
+        self.mode = _mode
+        self.thrust = _thrust
+        self.tolerance = _tolerance
+        self.hover_gain = _hover_gain # climb speed per cm below the held height, per second
+        self.hold_z = None
+        self.writes = 0
+        self.window_start_ns = None
+        self.window_writes = 0
+        self.writes_per_s = 0.0
+
+    def target(self, frame: TelemetryFrame) -> float:
+        if self.mode == self.THRUST:
+            return self.thrust
+        if self.hold_z == None:
+            self.hold_z = frame.pos[2]
+        climb = (self.hold_z - frame.pos[2]) * CuriosityManager.POS_SCALE * self.hover_gain
+        return max(-self.thrust, min(self.thrust, climb))
+
+    def tick(self, frame: TelemetryFrame) -> None:
+        vz = frame.vel[2]
+        target = self.target(frame)
+        low = vz < target - self.tolerance
+        if low or (self.mode == self.HOVER and vz > target + self.tolerance):
+            self.game.write_memory(frame.vel_addr, ctypes.c_double(target))
+            self.writes += 1
+            self.window_writes += 1
+
+        if self.window_start_ns == None:
+            self.window_start_ns = frame.time_ns
+        elif frame.time_ns - self.window_start_ns >= 1_000_000_000:
+            self.writes_per_s = self.window_writes * 1e9 / (frame.time_ns - self.window_start_ns)
+            self.window_start_ns = frame.time_ns
+            self.window_writes = 0
+
+
+class SpeedWatch:
+    def __init__(self, _history: SpeedHistory) -> None:
+        self.history = _history
+
+    def tick(self, frame: TelemetryFrame) -> None:
+        vel = frame.vel
+        speed = math.sqrt(pow(vel[0], 2) + pow(vel[1], 2)) # we do not care about speed along the Z axis
+        self.history.append(frame.time_ns, speed / 10)
+
+
+class GhostWatch:
+    """Keeps the latest delta against a ghost for the ui to pick up, count changes whenever the delta does"""
+
+    def __init__(self, _ghost: GhostRun) -> None:
+        self.compare = GhostCompare(_ghost)
+        self.delta = 0.0
+        self.count = 0
+
+    def tick(self, frame: TelemetryFrame) -> None:
+        delta = self.compare.update(frame.time_ns, frame.pos)
+        if delta != self.delta:
+            self.delta = delta
+            self.count += 1
+
+
+class ProximityWatch(QObject):
+    entered_emitter = Signal(str)
+
+    def __init__(self, _index: SpatialIndex, _radius: float) -> None:
+        QObject.__init__(self, None)
+        self.tracker = ProximityTracker(_index, _radius)
+
+    def tick(self, frame: TelemetryFrame) -> None:
+        for name in self.tracker.update(frame.pos):
+            self.entered_emitter.emit(name)
+
+
+class SplitWatch(QObject):
+    split_emitter = Signal(str, int, object) # event, position index, splits of the run so far
+
+    def __init__(self, _timer: SegmentTimer) -> None:
+        QObject.__init__(self, None)
+        self.timer = _timer
+
+    def tick(self, frame: TelemetryFrame) -> None:
+        for event, index, splits in self.timer.update(frame.time_ns, frame.pos):
+            self.split_emitter.emit(event, index, splits)
+
+
+class ScanWorker(QThread):
+    """Runs one value scan off the ui thread, scans of a few GB take seconds"""
+    done_emitter = Signal(object, object) # candidates left, or None and the error
+
+    def __init__(self, _scan) -> None:
+        QThread.__init__(self, None)
+        self.scan = _scan
 
     def run(self) -> None:
-        while self.on:
-            self.game.write_memory(self.addr, ctypes.c_double(325*10)) # high jump velocity x10
-            time.sleep(1/60)
+        try:
+            self.done_emitter.emit(self.scan(), None)
+        except Exception as e:
+            self.done_emitter.emit(None, e)
 
 
-class SpeedWatch(QThread):
-    speed_emitter = Signal(float)
+class PlaybackWorker(QThread):
+    """Runs a TrajectoryPlayer apart from the scheduler, recordings can have more samples per second than it ticks"""
+    done_emitter = Signal(object) # the player's report
 
-    def __init__(self, _game: Process, _addr: int) -> None:
+    def __init__(self, _player: TrajectoryPlayer) -> None:
         QThread.__init__(self, None)
-        self.game = _game
-        self.addr = _addr
-        self.on = True
+        self.player = _player
 
     def run(self) -> None:
-        while self.on:
-            vel = self.game.read_memory(self.addr - 0x10, Vector3())
-            speed = math.sqrt(pow(vel.X, 2) + pow(vel.Y, 2)) # we do not care about speed along the Z axis
-            self.speed_emitter.emit(speed / 10)
-            time.sleep(1/60)
+        METRICS.nameThread("playback")
+        try:
+            report = self.player.play()
+        except Exception as e:
+            report = {**self.player.report(), "error": str(e)} # the game closed or the pointers moved mid-playback
+        self.done_emitter.emit(report)
+
+
+class SignalMeter(QObject):
+    """Counts a signal as it is emitted and again as the ui thread handles it, the difference is the backlog"""
+
+    def __init__(self, _name: str, _signal, parent: QObject) -> None:
+        QObject.__init__(self, parent)
+        self.emitted_name = f"signal.{_name}.emitted"
+        self.handled_name = f"signal.{_name}.handled"
+        _signal.connect(self.emitted, Qt.ConnectionType.DirectConnection)
+        _signal.connect(self.handled, Qt.ConnectionType.QueuedConnection)
+
+    def emitted(self, *args) -> None:
+        METRICS.count(self.emitted_name)
+
+    def handled(self, *args) -> None:
+        METRICS.count(self.handled_name)
 
 
 class Vector3(ctypes.Structure):
@@ -0,0 +1,225 @@
+from mem_edit import Process
+from metrics import METRICS
+from abc import ABC, abstractmethod
+import ctypes, os, select, sys
+
+IOV_MAX = 1024 # most iovecs a single process_vm_readv/process_vm_writev call accepts
+SYNCHRONIZE = 0x00100000
+WAIT_OBJECT_0 = 0
+
+
+class IOVec(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t)
+    ]
+
+
+if sys.platform == "linux":
+    _libc = ctypes.CDLL(None, use_errno=True)
+    _vm_readv = _libc.process_vm_readv
+    _vm_writev = _libc.process_vm_writev
+    for func in (_vm_readv, _vm_writev):
+        func.argtypes = (ctypes.c_int, ctypes.POINTER(IOVec), ctypes.c_ulong,
+                         ctypes.POINTER(IOVec), ctypes.c_ulong, ctypes.c_ulong)
+        func.restype = ctypes.c_ssize_t
+else:
+    _vm_readv = _vm_writev = None
+
+if sys.platform == "win32":
+    _kernel32 = ctypes.WinDLL("kernel32")
+    _kernel32.OpenProcess.argtypes = (ctypes.c_ulong, ctypes.c_int, ctypes.c_ulong)
+    _kernel32.OpenProcess.restype = ctypes.c_void_p # a handle does not fit the default int on 64-bit
+    _kernel32.WaitForSingleObject.argtypes = (ctypes.c_void_p, ctypes.c_ulong)
+    _kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+
+
+def vectored(func, pid: int, items: list) -> bool:
+    """Transfers every (address, buffer) pair with as few syscalls as possible. Returns False if it could not be done"""
+
+    for start in range(0, len(items), IOV_MAX):
+        chunk = items[start:start + IOV_MAX]
+        local = (IOVec * len(chunk))()
+        remote = (IOVec * len(chunk))()
+        total = 0
+        for i, (addr, buf) in enumerate(chunk):
+            size = ctypes.sizeof(buf)
+            local[i].iov_base = ctypes.addressof(buf)
+            local[i].iov_len = size
+            remote[i].iov_base = addr
+            remote[i].iov_len = size
+            total += size
+        if func(pid, local, len(chunk), remote, len(chunk), 0) != total:
+            return False # partial transfers are retried one item at a time so errors surface like they used to
+    return True
+
+
+def readBatch(game: Process, requests: list) -> list:
+    """Reads a list of (address, ctypes type) requests in one vectored read and returns the decoded structs"""
+
+    items = [(addr, ctype()) for addr, ctype in requests]
+    pid = getattr(game, "pid", None)
+    if _vm_readv == None or pid == None or not vectored(_vm_readv, pid, items):
+        for addr, buf in items:
+            game.read_memory(addr, buf)
+    return [buf for addr, buf in items]
+
+
+def writeBatch(game: Process, requests: list) -> None:
+    """Writes a list of (address, ctypes value) pairs back-to-back in one vectored write"""
+
+    pid = getattr(game, "pid", None)
+    if _vm_writev == None or pid == None or not vectored(_vm_writev, pid, requests):
+        for addr, buf in requests:
+            game.write_memory(addr, buf)
+
+
+def openExitHandle(pid: int):
+    """Returns a handle that is signalled once the process exits (a pidfd on Linux), or None if it can not be opened"""
+    try:
+        if sys.platform == "win32":
+            handle = _kernel32.OpenProcess(SYNCHRONIZE, False, pid)
+            return handle if handle else None
+        return os.pidfd_open(pid)
+    except OSError:
+        return None # no pidfd support, or the process is already gone
+
+
+def hasExited(handle, timeout_ms: int = 0) -> bool:
+    """Checks a handle from openExitHandle, waiting up to timeout_ms for the process to exit"""
+    if sys.platform == "win32":
+        return _kernel32.WaitForSingleObject(handle, timeout_ms) == WAIT_OBJECT_0
+    poller = select.poll()
+    poller.register(handle, select.POLLIN) # a pidfd becomes readable when the process exits
+    return len(poller.poll(timeout_ms)) > 0
+
+
+def closeExitHandle(handle) -> None:
+    if sys.platform == "win32":
+        _kernel32.CloseHandle(handle)
+    else:
+        os.close(handle)
+
+
+class MemoryBackend(ABC):
+    """How CuriosityManager reaches the memory of its target
+
+    The method names match mem_edit's Process so a backend can be passed to anything that takes one, like the
+    signature and pointer scanners. Subclasses must implement read_memory and write_memory, batches fall back to
+    one call per item. Backends that can not list the mapped regions of their target return none, which the
+    scanners refuse"""
+    pid = None
+
+    @abstractmethod
+    def read_memory(self, base_address: int, read_buffer):
+        ...
+
+    @abstractmethod
+    def write_memory(self, base_address: int, write_buffer) -> None:
+        ...
+
+    def list_mapped_regions(self, writeable_only: bool = True) -> list:
+        return []
+
+    def readBatch(self, requests: list) -> list:
+        """Reads a list of (address, ctypes type) requests and returns the decoded structs"""
+        return [self.read_memory(addr, ctype()) for addr, ctype in requests]
+
+    def writeBatch(self, requests: list) -> None:
+        """Writes a list of (address, ctypes value) pairs"""
+        for addr, buf in requests:
+            self.write_memory(addr, buf)
+
+    def isAlive(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+class ProcessBackend(MemoryBackend):
+    """Another process, through mem_edit. On Linux every access is a process_vm_readv/writev call instead of
+    opening /proc/pid/mem, and batches are a single call"""
+
+    def __init__(self, _pid: int) -> None:
+        self.pid = _pid
+        self.process = Process(_pid)
+        self.exit_handle = openExitHandle(_pid) # so checking on the process does not enumerate every pid
+
+    def read_memory(self, base_address: int, read_buffer):
+        if _vm_readv == None or not vectored(_vm_readv, self.pid, [(base_address, read_buffer)]):
+            self.process.read_memory(base_address, read_buffer)
+        return read_buffer
+
+    def write_memory(self, base_address: int, write_buffer) -> None:
+        if _vm_writev == None or not vectored(_vm_writev, self.pid, [(base_address, write_buffer)]):
+            self.process.write_memory(base_address, write_buffer)
+
+    def list_mapped_regions(self, writeable_only: bool = True) -> list:
+        return self.process.list_mapped_regions(writeable_only)
+
+    def readBatch(self, requests: list) -> list:
+        return readBatch(self, requests)
+
+    def writeBatch(self, requests: list) -> None:
+        writeBatch(self, requests)
+
+    def isAlive(self) -> bool:
+        if self.exit_handle == None:
+            return self.pid in Process.list_available_pids()
+        return not hasExited(self.exit_handle)
+
+    def close(self) -> None:
+        if self.exit_handle != None:
+            closeExitHandle(self.exit_handle)
+            self.exit_handle = None
+        self.process.close()
+
+
+class LocalBackend(MemoryBackend):
+    """This process's own memory, for targets that are simulated in-process. Nothing checks that the addresses are
+    mapped, so a bad address crashes the trainer instead of raising"""
+
+    def read_memory(self, base_address: int, read_buffer):
+        ctypes.memmove(ctypes.addressof(read_buffer), base_address, ctypes.sizeof(read_buffer))
+        return read_buffer
+
+    def write_memory(self, base_address: int, write_buffer) -> None:
+        ctypes.memmove(base_address, ctypes.addressof(write_buffer), ctypes.sizeof(write_buffer))
+
+
+class InstrumentedBackend(MemoryBackend):
+    """Wraps another backend to record every call and the bytes it moved in METRICS"""
+
+    def __init__(self, _backend: MemoryBackend) -> None:
+        self.backend = _backend
+        self.pid = _backend.pid
+        self.read_memory = METRICS.timed("memory.read", self.read_memory)
+        self.write_memory = METRICS.timed("memory.write", self.write_memory)
+        self.readBatch = METRICS.timed("memory.readBatch", self.readBatch)
+        self.writeBatch = METRICS.timed("memory.writeBatch", self.writeBatch)
+
+    def read_memory(self, base_address: int, read_buffer):
+        METRICS.count("memory.bytes_read", ctypes.sizeof(read_buffer))
+        return self.backend.read_memory(base_address, read_buffer)
+
+    def write_memory(self, base_address: int, write_buffer) -> None:
+        METRICS.count("memory.bytes_written", ctypes.sizeof(write_buffer))
+        self.backend.write_memory(base_address, write_buffer)
+
+    def list_mapped_regions(self, writeable_only: bool = True) -> list:
+        return self.backend.list_mapped_regions(writeable_only)
+
+    def readBatch(self, requests: list) -> list:
+        METRICS.count("memory.bytes_read", sum(ctypes.sizeof(ctype) for addr, ctype in requests))
+        return self.backend.readBatch(requests)
+
+    def writeBatch(self, requests: list) -> None:
+        METRICS.count("memory.bytes_written", sum(ctypes.sizeof(buf) for addr, buf in requests))
+        self.backend.writeBatch(requests)
+
+    def isAlive(self) -> bool:
+        return self.backend.isAlive()
+
+    def close(self) -> None:
+        self.backend.close()
@@ -0,0 +1,270 @@
+from collections import deque
+import functools, json, os, threading, time
+
+SUB_BUCKET_BITS = 6 # 32 buckets per power of two, so recorded values are kept to within about 3%
+MAX_EXPONENT = 40 # about 18 minutes in ns, anything longer is counted as that
+TRACE_EVENTS = 100_000 # spans kept per thread for the trace file, older ones are dropped
+
+
+def bucketOf(value: int) -> int:
+    if value < 1 << SUB_BUCKET_BITS:
+        return value
+    shift = min(value.bit_length(), MAX_EXPONENT) - SUB_BUCKET_BITS
+    return (shift << (SUB_BUCKET_BITS - 1)) + min(value >> shift, (1 << SUB_BUCKET_BITS) - 1)
+
+
+def bucketValue(bucket: int) -> int:
+    """Returns the lowest value that falls into a bucket"""
+    if bucket < 1 << SUB_BUCKET_BITS:
+        return bucket
+    shift = (bucket >> (SUB_BUCKET_BITS - 1)) - 1
+    return (bucket - (shift << (SUB_BUCKET_BITS - 1))) << shift
+
+
+BUCKETS = bucketOf((1 << MAX_EXPONENT) - 1) + 1
+
+
+class Histogram:
+    """Counts of ns durations in log-linear buckets, like an HDR histogram
+
+    Recording is an increment in a fixed-size list no matter how many values were recorded, so it is cheap enough
+    to leave on all the time. Percentiles are exact to the bucket width. Only one thread can record into a
+    Histogram, use LatencyHistogram to share one"""
+
+    def __init__(self, _name: str) -> None:
+        self.name = _name
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value: int) -> None:
+        value = max(int(value), 0)
+        self.counts[bucketOf(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min == None or value < self.min:
+            self.min = value
+        if self.max == None or value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        """Adds everything recorded in other, which can still be recording on another thread"""
+        counts = list(other.counts) # copied in one step so a value recorded meanwhile is not half counted
+        count, total, low, high = other.count, other.total, other.min, other.max
+        for bucket, bucket_count in enumerate(counts):
+            self.counts[bucket] += bucket_count
+        self.count += count
+        self.total += total
+        if low != None and (self.min == None or low < self.min):
+            self.min = low
+        if high != None and (self.max == None or high > self.max):
+            self.max = high
+
+    def percentile(self, percent: float) -> int:
+        """Returns the value below which percent of the recorded values fall, or None if nothing was recorded"""
+        if self.count == 0:
+            return None
+        rank = max(1, round(self.count * percent / 100))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(bucketValue(bucket), self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        """Returns the summary and the non-empty buckets as plain values that can be dumped as JSON"""
+        return {
+            "name": self.name,
+            "unit": "ns",
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "buckets": [[bucketValue(bucket), count] for bucket, count in enumerate(self.counts) if count]
+        }
+
+    def exportJson(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write(json.dumps(self.snapshot(), indent=4))
+
+
+class LatencyHistogram(Histogram):
+    """A Histogram any number of threads can record into and read at the same time"""
+
+    def __init__(self, _name: str) -> None:
+        self.lock = threading.RLock()
+        Histogram.__init__(self, _name)
+
+    def reset(self) -> None:
+        with self.lock:
+            Histogram.reset(self)
+
+    def record(self, value: int) -> None:
+        with self.lock:
+            Histogram.record(self, value)
+
+    def percentile(self, percent: float) -> int:
+        with self.lock:
+            return Histogram.percentile(self, percent)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return Histogram.snapshot(self)
+
+
+class ThreadMetrics:
+    """Everything one thread recorded. Only that thread writes to it, so recording takes no lock"""
+
+    def __init__(self) -> None:
+        self.thread_name = threading.current_thread().name
+        self.thread_id = threading.get_native_id()
+        self.counters = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=TRACE_EVENTS) # (name, start ns, duration ns)
+
+
+class Metrics:
+    """Counters, histograms and trace spans for the hot paths, recorded per thread and merged when read
+
+    While disabled nothing is recorded, and the code that instruments the trainer checks enabled once when it sets
+    up (wrapping the memory backend, getPTRAddr and the scheduler callbacks with timed) instead of on every call, so
+    a disabled build runs the same code as one without metrics. Enable it before the manager is created"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.lock = threading.Lock() # only taken the first time a thread records something
+        self.shared = {} # always-on LatencyHistograms owned by something else, shown with the rest
+        self.reset()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def reset(self) -> None:
+        """Starts over, threads that are still recording move to new storage with their next value"""
+        with self.lock:
+            self.local = threading.local()
+            self.threads = []
+            self.started_ns = time.perf_counter_ns()
+            for histogram in self.shared.values():
+                histogram.reset()
+
+    def share(self, histogram: LatencyHistogram) -> None:
+        """Includes a histogram that is recorded whether or not metrics are enabled, replacing any of the same name"""
+        with self.lock:
+            self.shared[histogram.name] = histogram
+
+    def current(self) -> ThreadMetrics:
+        try:
+            return self.local.metrics
+        except AttributeError:
+            metrics = self.local.metrics = ThreadMetrics()
+            with self.lock:
+                self.threads.append(metrics)
+            return metrics
+
+    def nameThread(self, name: str) -> None:
+        """Names the calling thread in the dumps, threads started by qt have no useful name of their own"""
+        if self.enabled:
+            self.current().thread_name = name
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            counters = self.current().counters
+            counters[name] = counters.get(name, 0) + amount
+
+    def record(self, name: str, value: int) -> None:
+        if self.enabled:
+            histograms = self.current().histograms
+            if name not in histograms:
+                histograms[name] = Histogram(name)
+            histograms[name].record(value)
+
+    def span(self, name: str, start_ns: int, end_ns: int = None) -> None:
+        """Records the duration of something that started at start_ns in the histogram name and the trace"""
+        if self.enabled:
+            duration = (end_ns if end_ns != None else time.perf_counter_ns()) - start_ns
+            metrics = self.current()
+            if name not in metrics.histograms:
+                metrics.histograms[name] = Histogram(name)
+            metrics.histograms[name].record(duration)
+            metrics.spans.append((name, start_ns, duration))
+
+    def timed(self, name: str, func):
+        """Returns func wrapped to record every call as a span, or func itself while disabled"""
+        if not self.enabled:
+            return func
+
+        @functools.wraps(func)
+        def timedCall(*args, **kwargs):
+            start_ns = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.span(name, start_ns)
+        return timedCall
+
+    def snapshot(self) -> dict:
+        """Returns the counters and histograms of every thread merged together, as plain values for JSON"""
+        with self.lock:
+            threads = list(self.threads)
+            shared = list(self.shared.values())
+        counters = {}
+        histograms = {}
+        for histogram in shared:
+            with histogram.lock:
+                histograms[histogram.name] = Histogram(histogram.name)
+                histograms[histogram.name].merge(histogram)
+        for metrics in threads:
+            for name, value in list(metrics.counters.items()):
+                counters[name] = counters.get(name, 0) + value
+            for name, histogram in list(metrics.histograms.items()):
+                if name not in histograms:
+                    histograms[name] = Histogram(name)
+                histograms[name].merge(histogram)
+        return {
+            "enabled": self.enabled,
+            "elapsed_ns": time.perf_counter_ns() - self.started_ns,
+            "threads": [metrics.thread_name for metrics in threads],
+            "counters": dict(sorted(counters.items())),
+            "histograms": {name: histograms[name].snapshot() for name in sorted(histograms)}
+        }
+
+    def exportJson(self, path: str) -> None:
+        with open(path, 'w') as f:
+            f.write(json.dumps(self.snapshot(), indent=4))
+
+    def exportTrace(self, path: str) -> None:
+        """Writes the recorded spans as a Chrome trace, which chrome://tracing and Perfetto can open"""
+        with self.lock:
+            threads = list(self.threads)
+        pid = os.getpid()
+        events = []
+        for metrics in threads:
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": metrics.thread_id,
+                           "args": {"name": metrics.thread_name}})
+            for name, start_ns, duration in list(metrics.spans):
+                events.append({"name": name, "ph": "X", "pid": pid, "tid": metrics.thread_id,
+                               "ts": (start_ns - self.started_ns) / 1000, "dur": duration / 1000})
+        with open(path, 'w') as f:
+            f.write(json.dumps({"traceEvents": events, "displayTimeUnit": "ns"}))
+
+
+METRICS = Metrics()
+
+
+def formatNs(value: int) -> str:
+    if value == None:
+        return "-"
+    if value < 1_000_000:
+        return f"{value / 1000:.0f} us"
+    return f"{value / 1_000_000:.2f} ms"
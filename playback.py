@@ -0,0 +1,141 @@
+from metrics import LatencyHistogram
+import numpy as np
+import time
+
+SPIN_NS = 1_000_000 # sleeping stops this long before a deadline and the rest is spun, sleep overshoots by up to ~1 ms
+YIELD_NS = 100_000 # the spin gives other threads the GIL until this close to the deadline, a yield costs ~50 us
+
+
+def waitUntil(deadline_ns: int, spin_ns: int = SPIN_NS) -> int:
+    """Sleeps until shortly before deadline_ns, spins until it and returns how late it woke in ns"""
+    remaining = deadline_ns - time.perf_counter_ns() - spin_ns
+    if remaining > 0:
+        time.sleep(remaining / 1_000_000_000)
+    now = time.perf_counter_ns()
+    while now < deadline_ns - YIELD_NS:
+        time.sleep(0)
+        now = time.perf_counter_ns()
+    while now < deadline_ns:
+        now = time.perf_counter_ns()
+    return now - deadline_ns
+
+
+class TrajectoryPlayer:
+    """Writes a recorded run back into the game sample by sample, at the times it was recorded
+
+    Every sample has a deadline on an absolute perf_counter_ns timeline, deadline = anchor + (sample time - anchor
+    time) / speed, so the time a write takes or a late wake up never shifts the samples after it. Seeking or changing
+    the speed only moves the anchor. When playback falls more than a sample behind, the samples whose deadline has
+    passed are dropped and counted instead of being written in a burst
+
+    The timing is only as good as the OS scheduler, with the game and the trainer sharing a single CPU the p99 error
+    reaches a few ms and some samples are dropped"""
+
+    def __init__(self, times_ns: np.ndarray, positions: np.ndarray, velocities: np.ndarray, _write,
+                 _speed: float = 1.0, _spin_ns: int = SPIN_NS) -> None:
+        if len(times_ns) == 0:
+            raise ValueError("There is nothing to play back")
+        self.times = np.asarray(times_ns, dtype=np.int64) - int(times_ns[0])
+        self.positions = positions
+        self.velocities = velocities
+        self.write = _write # takes (pos, vel) of one sample
+        self.spin_ns = _spin_ns
+        self.speed = self.checkSpeed(_speed)
+        self.index = 0 # next sample to write
+        self.pending = None # (index, speed) to move the timeline to, set from other threads and picked up per sample
+        self.on = False
+        self.errors = LatencyHistogram("playback") # how late each write landed, from its deadline
+        self.written = 0
+        self.dropped = 0
+        self.played_ns = 0
+
+    @classmethod
+    def fromRecording(cls, recording: np.ndarray, write, **kwargs) -> "TrajectoryPlayer":
+        """Plays a run saved by the TelemetryRecorder"""
+        return cls(recording["time_ns"], recording["pos"], recording["vel"], write, **kwargs)
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] / 1_000_000_000
+
+    @property
+    def position(self) -> float:
+        """Seconds into the recording of the next sample"""
+        index = self.pending[0] if self.pending != None else self.index
+        return self.times[min(index, len(self.times) - 1)] / 1_000_000_000
+
+    def checkSpeed(self, speed: float) -> float:
+        speed = float(speed)
+        if not speed > 0:
+            raise ValueError("The playback speed must be above 0")
+        return speed
+
+    def indexOf(self, seconds: float) -> int:
+        """Returns the first sample at or after seconds into the recording"""
+        index = int(np.searchsorted(self.times, int(seconds * 1_000_000_000), side="left"))
+        return min(index, len(self.times) - 1)
+
+    def seek(self, seconds: float) -> None:
+        """Continues from seconds into the recording, while playing the next sample is written straight away"""
+        index = self.indexOf(seconds)
+        if self.on:
+            self.pending = (index, self.pending[1] if self.pending != None else self.speed)
+        else:
+            self.index = index
+
+    def setSpeed(self, speed: float) -> None:
+        speed = self.checkSpeed(speed)
+        if self.on:
+            self.pending = (self.pending[0] if self.pending != None else self.index, speed)
+        else:
+            self.speed = speed
+
+    def stop(self) -> None:
+        self.on = False
+
+    def play(self) -> dict:
+        """Writes every sample from the current index on time until the end or stop, then returns the report"""
+        times, write = self.times, self.write
+        self.on = True
+        started_ns = time.perf_counter_ns()
+        anchor_ns, anchor_time = started_ns, int(times[self.index])
+        try:
+            while self.on and self.index < len(times):
+                if self.pending != None:
+                    (self.index, self.speed), self.pending = self.pending, None
+                    anchor_ns, anchor_time = time.perf_counter_ns(), int(times[self.index])
+                index, speed = self.index, self.speed
+                deadline = anchor_ns + int((times[index] - anchor_time) / speed)
+                now = deadline + waitUntil(deadline, self.spin_ns)
+
+                # anything due before now that is not the newest sample would only be out of date by the time it landed
+                due = int(np.searchsorted(times, anchor_time + int((now - anchor_ns) * speed), side="right")) - 1
+                if due > index:
+                    self.dropped += due - index
+                    index = due
+
+                write(self.positions[index].tolist(), self.velocities[index].tolist())
+                # from when the write landed to the deadline of the sample this iteration was for, so drops show up
+                self.errors.record(time.perf_counter_ns() - deadline)
+                self.written += 1
+                self.index = index + 1
+        finally:
+            self.played_ns += time.perf_counter_ns() - started_ns
+            self.on = False
+        return self.report()
+
+    def report(self) -> dict:
+        """Returns how playback went as plain values, errors are how late samples were written in ns"""
+        return {
+            "samples": len(self.times),
+            "written": self.written,
+            "dropped": self.dropped,
+            "position": self.position,
+            "duration": self.duration,
+            "speed": self.speed,
+            "played_ns": self.played_ns,
+            "error_p50_ns": self.errors.percentile(50),
+            "error_p99_ns": self.errors.percentile(99),
+            "error_max_ns": self.errors.max,
+            "error_mean_ns": self.errors.total / self.errors.count if self.errors.count else None
+        }
@@ -0,0 +1,165 @@
+from concurrent.futures import ProcessPoolExecutor
+from mem_edit import Process
+import numpy as np
+import ctypes, os, tempfile
+
+READ_SIZE = 16 * 1024 * 1024
+POOL_THRESHOLD = 65536 # frontiers smaller than this are expanded in-process
+
+
+class PointerIndex:
+    """A reverse index of every pointer in a memory snapshot, sorted by the address it points to
+
+    Only aligned 8 byte values that point into a mapped region are kept, as two parallel uint64 arrays. Finding
+    every pointer to [target - max_offset, target] is then two binary searches. The index can be saved as .npy
+    files so pool workers memory-map it instead of each getting their own copy"""
+
+    def __init__(self, pointees: np.ndarray, addresses: np.ndarray) -> None:
+        self.pointees = pointees
+        self.addresses = addresses
+
+    @classmethod
+    def fromRegions(cls, regions: list) -> "PointerIndex":
+        """Builds the index from a list of (start address, uint8 array) snapshots"""
+        return cls.build([(start, start + len(data)) for start, data in regions], regions)
+
+    @classmethod
+    def build(cls, bounds: list, regions) -> "PointerIndex":
+        """Indexes (start address, uint8 array) snapshots as they come, each one can be dropped once it is indexed"""
+        bounds = sorted(bounds)
+        starts = np.array([start for start, stop in bounds], dtype=np.uint64)
+        ends = np.array([stop for start, stop in bounds], dtype=np.uint64)
+        pointees = []
+        addresses = []
+        for start, data in regions:
+            for offset in range(0, len(data) - len(data) % 8, READ_SIZE):
+                values = np.frombuffer(data[offset:offset + READ_SIZE], dtype=np.uint64, count=-1)
+                region = np.searchsorted(starts, values, side="right") - 1
+                valid = (region >= 0) & (values < ends[np.maximum(region, 0)])
+                hits = np.flatnonzero(valid)
+                pointees.append(values[hits])
+                addresses.append(np.uint64(start + offset) + hits.astype(np.uint64) * np.uint64(8))
+        pointees = np.concatenate(pointees) if pointees else np.empty(0, dtype=np.uint64)
+        addresses = np.concatenate(addresses) if addresses else np.empty(0, dtype=np.uint64)
+        order = np.argsort(pointees, kind="stable")
+        return cls(pointees[order], addresses[order])
+
+    @classmethod
+    def fromProcess(cls, game: Process) -> "PointerIndex":
+        """Snapshots every readable region of the process and indexes the pointers in it"""
+        bounds = game.list_mapped_regions(writeable_only=False)
+        if len(bounds) == 0:
+            raise ValueError("The memory of the game can not be listed, so it can not be pointer scanned")
+
+        def snapshots():
+            for start, stop in bounds:
+                start += (-start) % 8 # pointers are only looked for at aligned addresses
+                data = np.empty(stop - start, dtype=np.uint8)
+                try:
+                    for offset in range(0, len(data), READ_SIZE):
+                        chunk = data[offset:offset + READ_SIZE]
+                        game.read_memory(start + offset, (ctypes.c_ubyte * len(chunk)).from_buffer(chunk))
+                except Exception:
+                    continue # guard pages and regions that went away while snapshotting
+                yield start, data
+
+        return cls.build(bounds, snapshots())
+
+    def save(self, folder: str) -> None:
+        np.save(os.path.join(folder, "pointees.npy"), self.pointees)
+        np.save(os.path.join(folder, "addresses.npy"), self.addresses)
+
+    @classmethod
+    def load(cls, folder: str) -> "PointerIndex":
+        return cls(np.load(os.path.join(folder, "pointees.npy"), mmap_mode="r"),
+                   np.load(os.path.join(folder, "addresses.npy"), mmap_mode="r"))
+
+    def pointersTo(self, targets: np.ndarray, max_offset: int) -> tuple:
+        """Returns (pointer addresses, offsets, target indices) for every pointer within max_offset below a target"""
+        targets = targets.astype(np.uint64)
+        lows = np.where(targets > max_offset, targets - np.uint64(max_offset), np.uint64(0))
+        lo = np.searchsorted(self.pointees, lows, side="left")
+        hi = np.searchsorted(self.pointees, targets, side="right")
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.uint64)
+            return empty, empty, np.empty(0, dtype=np.int64)
+        parents = np.repeat(np.arange(len(targets)), counts)
+        # index of every match, lo[parent] + position within that parent's range
+        positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        offsets = targets[parents] - self.pointees[positions]
+        return np.asarray(self.addresses[positions]), offsets, parents
+
+
+_worker_index = None
+
+
+def initWorker(folder: str) -> None:
+    global _worker_index
+    _worker_index = PointerIndex.load(folder)
+
+
+def expandChunk(args: tuple) -> tuple:
+    targets, max_offset = args
+    return _worker_index.pointersTo(targets, max_offset)
+
+
+def scanPointerPaths(index: PointerIndex, target: int, module_base: int, module_size: int, depth: int = 7,
+                     max_offset: int = 0x1000, max_results: int = 1000, max_frontier: int = 5_000_000,
+                     workers: int = None) -> list:
+    """Searches backwards from a dynamic address for pointer chains that start in the module image
+
+    Returns (base, offsets) tuples in the same form as CuriosityManager.POS_PTR, shortest chains first"""
+    results = []
+    seen = np.array([target], dtype=np.uint64)
+    # every level keeps the pointer addresses it reached, the offset each one adds and the index of its child
+    levels = [(seen, None, None)]
+    module_end = module_base + module_size
+    tmp = None
+    pool = None
+    try:
+        for level in range(depth):
+            frontier = levels[-1][0]
+            if len(frontier) == 0:
+                break
+            if len(frontier) < POOL_THRESHOLD:
+                addresses, offsets, parents = index.pointersTo(frontier, max_offset)
+            else:
+                if pool == None:
+                    tmp = tempfile.TemporaryDirectory()
+                    index.save(tmp.name)
+                    pool = ProcessPoolExecutor(workers, initializer=initWorker, initargs=(tmp.name,))
+                chunks = np.array_split(frontier, (workers or os.cpu_count() or 1) * 4)
+                parts = list(pool.map(expandChunk, ((chunk, max_offset) for chunk in chunks)))
+                firsts = np.cumsum([0] + [len(chunk) for chunk in chunks[:-1]])
+                addresses = np.concatenate([part[0] for part in parts])
+                offsets = np.concatenate([part[1] for part in parts])
+                parents = np.concatenate([part[2] + first for part, first in zip(parts, firsts)])
+
+            # static pointers end a chain, everything else is searched again one level up
+            static = (addresses >= module_base) & (addresses < module_end)
+            for node in np.flatnonzero(static):
+                base = int(addresses[node]) - module_base
+                results.append(buildChain(levels, base, int(offsets[node]), int(parents[node])))
+                if len(results) >= max_results:
+                    return results
+
+            keep = np.flatnonzero(~static & ~np.isin(addresses, seen))[:max_frontier]
+            levels.append((addresses[keep], offsets[keep], parents[keep]))
+            seen = np.union1d(seen, addresses[keep])
+    finally:
+        if pool != None:
+            pool.shutdown()
+        if tmp != None:
+            tmp.cleanup()
+    return results
+
+
+def buildChain(levels: list, base: int, offset: int, child: int) -> tuple:
+    """Follows the child links from a static pointer back down to the target to get its offsets in order"""
+    chain = [offset]
+    for addresses, offsets, parents in reversed(levels[1:]):
+        chain.append(int(offsets[child]))
+        child = int(parents[child])
+    return (base, tuple(chain))
@@ -0,0 +1,165 @@
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from collections.abc import Mapping
+from bisect import bisect_right
+
+FETCH_SIZE = 500 # rows handed to the view at a time
+INDEX_THRESHOLD = 5000 # smaller lists are filtered with a plain scan
+
+
+class NameIndex:
+    """Substring search over position names by searching all of them joined into one lowercase string
+
+    str.find runs over the whole library at C speed and each match is mapped back to its name with a binary search
+    over the name offsets, so a query costs about as much as the number of names it matches. That makes it much
+    faster than a plain scan for selective queries and slower for broad ones, so searches can give up early"""
+
+    def __init__(self, names: list) -> None:
+        self.names = list(names)
+        lowered = [name.lower() for name in self.names]
+        self.text = "\n".join(lowered)
+        self.starts = []
+        offset = 0
+        for name in lowered:
+            self.starts.append(offset)
+            offset += len(name) + 1
+
+    def search(self, text: str, limit: int = None) -> list:
+        """Returns every name containing text (lowercase) in the order the index was built with, or None if there
+        are more than limit of them"""
+        found = []
+        starts = self.starts
+        pos = self.text.find(text)
+        while pos != -1:
+            if limit != None and len(found) > limit:
+                return None
+            i = bisect_right(starts, pos) - 1
+            if i + 1 == len(starts):
+                if pos + len(text) <= len(self.text):
+                    found.append(self.names[i])
+                break
+            if pos + len(text) < starts[i + 1]: # the match must not run into the next name
+                found.append(self.names[i])
+                pos = self.text.find(text, starts[i + 1])
+            else:
+                pos = self.text.find(text, pos + 1)
+        return found
+
+
+def renumber(rows: dict, names: list, start: int) -> None:
+    """Points rows back at the names from start on, after a name before them was deleted"""
+    for i in range(start, len(names)):
+        rows[names[i]] = i
+
+
+class PositionListModel(QAbstractListModel):
+    """A list model over the saved position names with O(1) name to row lookups and fast filtering
+
+    Rows are handed to the view in batches as it scrolls, so showing a large route library costs the same as a
+    small one. Typing into the filter only rescans the names that matched the previous keystroke, and the search
+    index is only built when a long list has to be searched from scratch"""
+
+    def __init__(self, positions: Mapping, parent=None) -> None:
+        QAbstractListModel.__init__(self, parent)
+        self.names = list(positions.keys()) # every name in the order it was saved
+        self.order = {name: i for i, name in enumerate(self.names)}
+        self.name_index = None # rebuilt on demand whenever the names change
+        self.filter = ""
+        self.visible = self.names # the names that pass the filter, in saved order
+        self.visible_rows = self.order # visible name -> row, built on demand while filtering
+        self.fetched = min(len(self.visible), FETCH_SIZE)
+
+    @property
+    def rows(self) -> dict:
+        if self.visible_rows == None:
+            self.visible_rows = {name: i for i, name in enumerate(self.visible)}
+        return self.visible_rows
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.fetched
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid() and index.row() < self.fetched:
+            return self.visible[index.row()]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self.fetched < len(self.visible)
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        count = min(FETCH_SIZE, len(self.visible) - self.fetched)
+        self.beginInsertRows(QModelIndex(), self.fetched, self.fetched + count - 1)
+        self.fetched += count
+        self.endInsertRows()
+
+    def nameAt(self, row: int) -> str:
+        return self.visible[row] if 0 <= row < self.fetched else None
+
+    def rowOf(self, name: str) -> int:
+        """Returns the row of a visible name or None, fetching rows up to it so the view can select it"""
+        row = self.rows.get(name)
+        if row != None and row >= self.fetched:
+            self.beginInsertRows(QModelIndex(), self.fetched, row)
+            self.fetched = row + 1
+            self.endInsertRows()
+        return row
+
+    def setFilter(self, text: str) -> None:
+        lowered = text.lower()
+        names = self.names
+        if self.filter and lowered.startswith(self.filter.lower()):
+            names = self.visible # a longer query can only match names that already matched
+        elif len(lowered) >= 3 and len(names) >= INDEX_THRESHOLD:
+            if self.name_index == None:
+                self.name_index = NameIndex(self.names)
+            matches = self.name_index.search(lowered, len(names) // 32)
+            if matches != None: # broad queries are faster to do with a scan of every name
+                names = matches
+
+        self.beginResetModel()
+        self.filter = text
+        if text:
+            self.visible = [name for name in names if lowered in name.lower()]
+            self.visible_rows = None
+        else:
+            self.visible = self.names
+            self.visible_rows = self.order
+        self.fetched = min(len(self.visible), FETCH_SIZE)
+        self.endResetModel()
+
+    def addName(self, name: str) -> int:
+        """Appends a new name and returns its row, or None if the filter hides it"""
+        if name in self.order:
+            return self.rowOf(name)
+        self.order[name] = len(self.names)
+        self.names.append(name) # also appends to visible when there is no filter
+        self.name_index = None
+        if self.filter:
+            if self.filter.lower() not in name.lower():
+                return None
+            self.rows[name] = len(self.visible)
+            self.visible.append(name)
+        if self.fetched == len(self.visible) - 1:
+            self.beginInsertRows(QModelIndex(), self.fetched, self.fetched)
+            self.fetched += 1
+            self.endInsertRows()
+        return self.rowOf(name)
+
+    def removeName(self, name: str) -> None:
+        """Removes a name, only the rows after it are renumbered so removing near the end of a long list is cheap"""
+        if name not in self.order:
+            return
+        row = self.rows.get(name)
+        shown = row != None and row < self.fetched
+        if shown:
+            self.beginRemoveRows(QModelIndex(), row, row)
+        index = self.order.pop(name)
+        del self.names[index] # also removes from visible when there is no filter
+        renumber(self.order, self.names, index)
+        self.name_index = None
+        if self.filter and row != None:
+            del self.visible[row]
+            del self.visible_rows[name]
+            renumber(self.visible_rows, self.visible, row)
+        if shown:
+            self.fetched -= 1
+            self.endRemoveRows()
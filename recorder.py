@@ -0,0 +1,116 @@
+import numpy as np
+import os, threading
+
+SAMPLE_DTYPE = np.dtype([
+    ("time_ns", np.int64),
+    ("pos", np.float64, (3,)),
+    ("vel", np.float64, (3,))
+])
+
+# the .npy header is given a fixed size so it can be rewritten in place with the sample count after every flush
+# the dict alone is ~140 bytes with the largest int64 count, and numpy wants the data 64-byte aligned
+NPY_HEADER_SIZE = 256
+
+
+def npyHeader(count: int) -> bytes:
+    """Builds a version 1.0 .npy header for count samples, padded to NPY_HEADER_SIZE bytes"""
+    header = repr({"descr": np.lib.format.dtype_to_descr(SAMPLE_DTYPE), "fortran_order": False, "shape": (count,)})
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + "\n"
+    header = b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header.encode("latin1")
+    assert len(header) == NPY_HEADER_SIZE, "the sample count no longer fits the reserved .npy header"
+    return header
+
+
+class TelemetryRecorder:
+    """Records telemetry frames into a preallocated ring buffer that is flushed in chunks to a memory-mapped .npy file
+
+    Sampling only copies numbers into the ring, so no Python objects are kept per sample. Every time a chunk fills up
+    it is copied into the file mapping, which grows in large steps so a long run never grows the heap. The header
+    counts the flushed samples, so the file of a run that crashed still loads up to its last flush"""
+
+    def __init__(self, path: str, chunk_size: int = 1024, reserve: int = 240 * 60 * 30) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.ring = np.zeros(chunk_size * 2, dtype=SAMPLE_DTYPE)
+        self.times = self.ring["time_ns"]
+        self.positions = self.ring["pos"]
+        self.velocities = self.ring["vel"]
+        self.head = 0 # next ring slot to write
+        self.flushed = 0 # samples already copied to the file
+        self.count = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "wb+")
+        self.file.write(npyHeader(0))
+        self.capacity = 0
+        self.mapping = None
+        self.reserve(reserve)
+
+    def reserve(self, capacity: int) -> None:
+        """Grows the file so it can hold capacity samples and maps it again"""
+        if self.mapping is not None:
+            self.mapping.flush()
+            del self.mapping
+        self.file.truncate(NPY_HEADER_SIZE + capacity * SAMPLE_DTYPE.itemsize)
+        self.capacity = capacity
+        self.mapping = np.memmap(self.file, dtype=SAMPLE_DTYPE, mode="r+", offset=NPY_HEADER_SIZE, shape=(capacity,))
+
+    def tick(self, frame) -> None:
+        with self.lock:
+            if self.file is None:
+                return
+            i = self.head
+            self.times[i] = frame.time_ns
+            self.positions[i] = frame.pos
+            self.velocities[i] = frame.vel
+            self.count += 1
+            self.head = (i + 1) % len(self.ring)
+            if self.count - self.flushed >= self.chunk_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """Copies every sample not yet in the file from the ring into the file mapping and counts them in the header"""
+        pending = self.count - self.flushed
+        if pending == 0:
+            return
+        if self.count > self.capacity:
+            self.reserve(max(self.count, self.capacity * 2))
+
+        start = (self.head - pending) % len(self.ring)
+        first = min(pending, len(self.ring) - start)
+        self.mapping[self.flushed:self.flushed + first] = self.ring[start:start + first]
+        if first < pending:
+            self.mapping[self.flushed + first:self.count] = self.ring[:pending - first]
+        self.flushed = self.count
+        self.file.seek(0)
+        self.file.write(npyHeader(self.count))
+        self.file.flush()
+
+    def latest(self, n: int) -> np.ndarray:
+        """Returns a copy of up to the last n samples still held in the ring"""
+        with self.lock:
+            n = min(n, self.count, len(self.ring))
+            index = (np.arange(self.head - n, self.head)) % len(self.ring)
+            return self.ring[index]
+
+    def close(self) -> int:
+        """Flushes the remaining samples, trims the file to the recorded length and returns the sample count"""
+        with self.lock:
+            if self.file is None:
+                return self.count
+            self.flush()
+            self.mapping.flush()
+            del self.mapping
+            self.mapping = None
+            self.file.seek(0)
+            self.file.write(npyHeader(self.count))
+            self.file.truncate(NPY_HEADER_SIZE + self.count * SAMPLE_DTYPE.itemsize)
+            self.file.close()
+            self.file = None
+            return self.count
+
+
+def loadRecording(path: str) -> np.ndarray:
+    """Opens a recorded run without reading it into memory"""
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,195 @@
+import numpy as np
+import os, struct
+
+STATES_MAGIC = b"CTSS"
+STATES_VERSION = 1
+MERGE_GAP = 8 # changed bytes closer together than this are stored as one run, a run header costs 8 bytes
+
+
+class StateLayout:
+    """Which memory a save-state copies and which parts of it are restored
+
+    Regions are (pointer name, offset from the pointer's target, size) and are read whole, fields are (name, region
+    index, offset from the region's pointer target, size) and are the only ranges ever written back, since the rest
+    of a region holds pointers and engine state that would crash the game if restored"""
+
+    def __init__(self, _regions: tuple, _fields: tuple) -> None:
+        self.regions = tuple((str(name), int(offset), int(size)) for name, offset, size in _regions)
+        self.fields = tuple((str(name), int(region), int(offset), int(size)) for name, region, offset, size in _fields)
+        if len(self.fields) > 64:
+            raise ValueError("A layout can have at most 64 fields, the mask is a u64")
+        for name, region, offset, size in self.fields:
+            region_name, region_offset, region_size = self.regions[region]
+            if offset < region_offset or offset + size > region_offset + region_size:
+                raise ValueError(f"The {name} field is outside of the {region_name} region")
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, StateLayout) and self.regions == other.regions and self.fields == other.fields
+
+    @property
+    def all_fields(self) -> int:
+        return (1 << len(self.fields)) - 1
+
+    def mask(self, names: list) -> int:
+        """Returns the field mask of a list of field names"""
+        field_names = [field[0] for field in self.fields]
+        mask = 0
+        for name in names:
+            if name not in field_names:
+                raise ValueError(f"There is no {name} field, only {field_names}")
+            mask |= 1 << field_names.index(name)
+        return mask
+
+    def writes(self, regions: list, mask: int) -> list:
+        """Returns (region index, offset from the pointer target, bytes) of every field in mask"""
+        writes = []
+        for i, (name, region, offset, size) in enumerate(self.fields):
+            if mask & (1 << i):
+                start = offset - self.regions[region][1]
+                writes.append((region, offset, regions[region][start:start + size]))
+        return writes
+
+
+class SaveState:
+    """The copied regions of one save-state, and the mask of the fields that it restores"""
+
+    def __init__(self, _name: str, _regions: list, _mask: int, _created_ns: int) -> None:
+        self.name = _name
+        self.regions = [bytes(region) for region in _regions]
+        self.mask = _mask
+        self.created_ns = _created_ns # time.time_ns() when it was saved
+
+
+def diffRuns(data: bytes, base: bytes) -> list:
+    """Returns the (offset, bytes) runs where data differs from base"""
+    changed = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) != np.frombuffer(base, dtype=np.uint8))
+    if len(changed) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(changed) > MERGE_GAP)
+    starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+    ends = np.concatenate((changed[breaks], [changed[-1]])) + 1
+    return [(int(start), data[start:end]) for start, end in zip(starts, ends)]
+
+
+def applyRuns(base: bytes, runs: list) -> bytes:
+    data = bytearray(base)
+    for offset, run in runs:
+        data[offset:offset + len(run)] = run
+    return bytes(data)
+
+
+class SaveStates:
+    """Every save-state in one small binary file
+
+    The file is a header of magic, version and state count, then the layout (regions and fields, so a file made for
+    another game version is refused instead of restored), then the states. The first state is stored whole and every
+    other one only as the runs of bytes where it differs from the first, which is most of a region when states are
+    saved around the same area. Strings are a u16 length and utf-8 bytes, numbers are little endian"""
+
+    def __init__(self, path: str, layout: StateLayout) -> None:
+        self.path = path
+        self.layout = layout
+        self.states = {}
+        if os.path.exists(path):
+            self.load()
+
+    def add(self, state: SaveState) -> None:
+        self.states[state.name] = state # replaces a state of the same name
+
+    def remove(self, name: str) -> None:
+        self.states.pop(name, None)
+
+    def load(self) -> None:
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        try:
+            self.unpack(data)
+        except (struct.error, UnicodeDecodeError, IndexError) as e:
+            raise ValueError(f"{self.path} is damaged: {e}")
+
+    def unpack(self, data: bytes) -> None:
+        magic, version, count = struct.unpack_from("<4sHI", data, 0)
+        if magic != STATES_MAGIC or version != STATES_VERSION:
+            raise ValueError(f"{self.path} is not a save-state file this version can read")
+        offset = struct.calcsize("<4sHI")
+
+        def readString() -> str:
+            nonlocal offset
+            (length,) = struct.unpack_from("<H", data, offset)
+            text = data[offset + 2:offset + 2 + length].decode("utf-8")
+            offset += 2 + length
+            return text
+
+        regions = []
+        (region_count,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        for i in range(region_count):
+            name = readString()
+            regions.append((name, *struct.unpack_from("<iI", data, offset)))
+            offset += 8
+        fields = []
+        (field_count,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        for i in range(field_count):
+            name = readString()
+            fields.append((name, *struct.unpack_from("<HiI", data, offset)))
+            offset += 10
+        if StateLayout(regions, fields) != self.layout:
+            raise ValueError(f"{self.path} was saved for a different game version")
+
+        base = None
+        for i in range(count):
+            name = readString()
+            mask, created_ns = struct.unpack_from("<QQ", data, offset)
+            offset += 16
+            state_regions = []
+            for j, (region_name, region_offset, size) in enumerate(regions):
+                if base == None:
+                    region = data[offset:offset + size]
+                    offset += size
+                else:
+                    (run_count,) = struct.unpack_from("<I", data, offset)
+                    offset += 4
+                    runs = []
+                    for k in range(run_count):
+                        run_offset, length = struct.unpack_from("<II", data, offset)
+                        runs.append((run_offset, data[offset + 8:offset + 8 + length]))
+                        offset += 8 + length
+                    region = applyRuns(base.regions[j], runs)
+                if len(region) != size:
+                    raise ValueError(f"{self.path} is damaged: a region was cut short")
+                state_regions.append(region)
+            self.states[name] = SaveState(name, state_regions, mask, created_ns)
+            if base == None:
+                base = self.states[name]
+
+    def save(self) -> None:
+        def string(text: str) -> bytes:
+            encoded = text.encode("utf-8")
+            return struct.pack("<H", len(encoded)) + encoded
+
+        parts = [struct.pack("<4sHI", STATES_MAGIC, STATES_VERSION, len(self.states))]
+        parts.append(struct.pack("<H", len(self.layout.regions)))
+        for name, offset, size in self.layout.regions:
+            parts.append(string(name) + struct.pack("<iI", offset, size))
+        parts.append(struct.pack("<H", len(self.layout.fields)))
+        for name, region, offset, size in self.layout.fields:
+            parts.append(string(name) + struct.pack("<HiI", region, offset, size))
+
+        base = None
+        for state in self.states.values():
+            parts.append(string(state.name) + struct.pack("<QQ", state.mask, state.created_ns))
+            if base == None:
+                parts.extend(state.regions)
+                base = state
+                continue
+            for region, base_region in zip(state.regions, base.regions):
+                runs = diffRuns(region, base_region)
+                parts.append(struct.pack("<I", len(runs)))
+                for offset, run in runs:
+                    parts.append(struct.pack("<II", offset, len(run)) + run)
+        # written next to the old file and swapped in, so a crash can not leave half a file behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(parts))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,218 @@
+from concurrent.futures import ProcessPoolExecutor
+from mem_edit import Process
+import ctypes, hashlib, json, os, re
+
+CHUNK_SIZE = 16 * 1024 * 1024
+POOL_THRESHOLD = 64 * 1024 * 1024 # images smaller than this are scanned in-process
+HEADER_SIZE = 0x1000
+LEARNED_KEY = "learned" # cache entry with the signatures learned from a build whose static bases were known
+# mov or lea of a 64-bit register from a rip-relative address, REX.W (+R) opcode modrm disp32
+RIP_RELATIVE = re.compile(rb"[\x48\x4C][\x8B\x8D][\x05\x0D\x15\x1D\x25\x2D\x35\x3D]", re.DOTALL)
+
+
+class Signature:
+    """A byte pattern for an instruction that references a static address, e.g. "48 8B 05 ?? ?? ?? ??"
+
+    The static address is read from the rip-relative displacement at disp_offset in the match, which is relative to
+    the end of the instruction (instr_len bytes from the start of the match). The result is relative to the module"""
+
+    def __init__(self, pattern: str, disp_offset: int = 3, instr_len: int = 7, adjust: int = 0) -> None:
+        self.pattern = pattern
+        self.disp_offset = disp_offset
+        self.instr_len = instr_len
+        self.adjust = adjust # added to the resolved address, for fields inside the referenced object
+        self.data, self.mask = parsePattern(pattern)
+
+
+def parsePattern(pattern: str) -> tuple:
+    """Turns a pattern string into its bytes and a mask where wildcard (??) bytes are False"""
+    data = bytearray()
+    mask = []
+    for token in pattern.split():
+        if token.strip("?") == "":
+            data.append(0)
+            mask.append(False)
+        else:
+            data.append(int(token, 16))
+            mask.append(True)
+    if not any(mask):
+        raise ValueError("A signature needs at least one non-wildcard byte")
+    return bytes(data), tuple(mask)
+
+
+def longestRun(mask: tuple) -> tuple:
+    """Returns (start, end) of the longest run of non-wildcard bytes, used as the anchor for bytes.find"""
+    best = (0, 0)
+    start = None
+    for i, solid in enumerate(mask + (False,)):
+        if solid and start == None:
+            start = i
+        elif not solid and start != None:
+            if i - start > best[1] - best[0]:
+                best = (start, i)
+            start = None
+    return best
+
+
+def scanBuffer(data: bytes, patterns: dict, base: int = 0) -> dict:
+    """Returns {name: [offsets]} for every match of every (bytes, mask) pattern in data, offset by base"""
+    found = {}
+    view = memoryview(data)
+    for name, (pattern, mask) in patterns.items():
+        anchor_start, anchor_end = longestRun(mask)
+        anchor = pattern[anchor_start:anchor_end]
+        checks = [(i, pattern[i]) for i, solid in enumerate(mask) if solid and not anchor_start <= i < anchor_end]
+        matches = []
+        pos = data.find(anchor)
+        while pos != -1:
+            start = pos - anchor_start
+            if start >= 0 and start + len(pattern) <= len(data):
+                if all(view[start + i] == byte for i, byte in checks):
+                    matches.append(base + start)
+            pos = data.find(anchor, pos + 1)
+        found[name] = matches
+    return found
+
+
+def scanChunk(args: tuple) -> dict:
+    return scanBuffer(*args)
+
+
+def readChunks(game: Process, base_address: int, size: int, overlap: int):
+    """Yields (offset, bytes) for the module image in large reads, overlapping so no match is split in two"""
+    for offset in range(0, size, CHUNK_SIZE):
+        length = min(CHUNK_SIZE + overlap, size - offset)
+        buf = game.read_memory(base_address + offset, (ctypes.c_ubyte * length)())
+        yield offset, bytes(buf)
+
+
+def imageSize(header: bytes) -> int:
+    """Reads SizeOfImage from the PE headers at the start of a module"""
+    pe = int.from_bytes(header[0x3C:0x40], "little")
+    if header[:2] != b"MZ" or header[pe:pe + 4] != b"PE\0\0":
+        raise ValueError("Module does not start with PE headers")
+    return int.from_bytes(header[pe + 0x50:pe + 0x54], "little") # optional header + 56
+
+
+def moduleKey(header: bytes, size: int) -> str:
+    """Identifies a build of the game by its image size and a hash of its headers, which include the link timestamp"""
+    return f"{size:x}-{hashlib.sha1(header).hexdigest()}"
+
+
+def scanModule(game: Process, base_address: int, size: int, signatures: dict, workers: int = None) -> dict:
+    """Scans a module image for every signature and returns {name: [module-relative match offsets]}"""
+    patterns = {name: (sig.data, sig.mask) for name, sig in signatures.items()}
+    overlap = max(len(sig.data) for sig in signatures.values()) - 1
+    found = {name: [] for name in signatures}
+    chunks = readChunks(game, base_address, size, overlap)
+
+    seen = {name: set() for name in signatures} # chunks overlap, so a match near the end of one is found twice
+
+    def merge(result: dict) -> None:
+        for name, matches in result.items():
+            for match in matches:
+                if match not in seen[name]:
+                    seen[name].add(match)
+                    found[name].append(match)
+
+    if size < POOL_THRESHOLD:
+        for offset, data in chunks:
+            merge(scanBuffer(data, patterns, offset))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for result in pool.map(scanChunk, ((data, patterns, offset) for offset, data in chunks)):
+                merge(result)
+    return found
+
+
+def resolveMatch(game: Process, base_address: int, match: int, sig: Signature) -> int:
+    """Follows the rip-relative displacement of a match and returns the module-relative static address"""
+    disp = game.read_memory(base_address + match + sig.disp_offset, ctypes.c_int32()).value
+    return match + sig.instr_len + disp + sig.adjust
+
+
+def findReferences(data: bytes, target: int) -> list:
+    """Returns the offsets of every rip-relative mov or lea in data that loads from the offset target"""
+    found = []
+    for match in RIP_RELATIVE.finditer(data):
+        start = match.start()
+        disp = int.from_bytes(data[start + 3:start + 7], "little", signed=True)
+        if start + 7 <= len(data) and start + 7 + disp == target:
+            found.append(start)
+    return found
+
+
+def deriveSignature(data: bytes, target: int, lengths: tuple = (16, 24, 32)) -> Signature:
+    """Returns a signature that matches exactly one instruction referencing target in the image data, or None
+
+    The pattern is the instruction with its displacement wildcarded, followed by the bytes after it, and is made
+    longer until it only matches once"""
+    for start in findReferences(data, target)[:8]:
+        for length in lengths:
+            tokens = [f"{byte:02X}" for byte in data[start:start + length]]
+            if len(tokens) < length:
+                break
+            tokens[3:7] = ["??"] * 4
+            sig = Signature(" ".join(tokens))
+            if len(scanBuffer(data, {"sig": (sig.data, sig.mask)})["sig"]) == 1:
+                return sig
+    return None
+
+
+def readImage(game: Process, base_address: int, size: int) -> bytes:
+    return b"".join(data[:CHUNK_SIZE] for offset, data in readChunks(game, base_address, size, 0))
+
+
+def loadCache(cache_path: str) -> dict:
+    if cache_path == None or not os.path.exists(cache_path):
+        return {}
+    with open(cache_path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+
+def locateStatics(game: Process, base_address: int, signatures: dict, cache_path: str = None,
+                  known: dict = None) -> dict:
+    """Returns {name: module-relative static address} for every signature that has exactly one match
+
+    known gives {name: module-relative static address} believed to be right for this build, for names without a
+    signature. A signature is learned for them from the instructions that reference that address and kept in the
+    cache, so after a game update it finds the moved static. Results are cached on disk per build, so attaching to a
+    build that was already scanned only reads the headers"""
+    cache = loadCache(cache_path)
+    learned = cache.get(LEARNED_KEY, {})
+    signatures = {**{name: Signature(*args) for name, args in learned.items()}, **signatures}
+    unknown = {name: rva for name, rva in (known or {}).items() if name not in signatures}
+    if len(signatures) == 0 and len(unknown) == 0:
+        return {}
+    header = bytes(game.read_memory(base_address, (ctypes.c_ubyte * HEADER_SIZE)()))
+    size = imageSize(header)
+    key = moduleKey(header, size)
+
+    cached = cache.get(key, {})
+    missing = {name: sig for name, sig in signatures.items() if name not in cached}
+    unknown = {name: rva for name, rva in unknown.items() if name not in cached}
+    if len(missing) == 0 and len(unknown) == 0:
+        return {name: cached[name] for name in signatures if cached[name] != None}
+
+    if len(missing) > 0:
+        for name, matches in scanModule(game, base_address, size, missing).items():
+            # ambiguous or missing signatures are cached as None so they are not scanned for again on this build
+            cached[name] = resolveMatch(game, base_address, matches[0], missing[name]) if len(matches) == 1 else None
+    if len(unknown) > 0:
+        image = readImage(game, base_address, size)
+        for name, rva in unknown.items():
+            sig = deriveSignature(image, rva)
+            if sig != None:
+                learned[name] = (sig.pattern, sig.disp_offset, sig.instr_len, sig.adjust)
+            cached[name] = None # learning does not locate anything, the known address is used on this build
+        del image
+
+    if cache_path != None:
+        cache[key] = cached
+        cache[LEARNED_KEY] = learned
+        with open(cache_path, 'w') as f:
+            f.write(json.dumps(cache, indent=4))
+    return {name: cached[name] for name in signatures if cached.get(name) != None}
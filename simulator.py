@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+"""A stand-in for the game that lays out the player pointer chains in its own memory and moves the player around.
+
+Usage: python simulator.py [--rate 60] [--terrain]
+Prints {"pid": ..., "base_address": ...} as one line of JSON once the chains are set up, then runs until stdin closes"""
+
+from manager import CuriosityManager
+from data import DEFAULT_POSITIONS
+import argparse, ctypes, json, math, mmap, os, subprocess, sys, threading, time
+
+NODE_SIZE = 0x1000 # every hop of a chain gets its own block, big enough for the largest offset
+GRAVITY = 980.0 # cm/s^2, the game stores positions in cm
+RUN_SPEED = 700.0 # cm/s
+RUN_RADIUS = 2000.0 # cm, the player runs in circles
+
+
+class ToyTerrain:
+    """Solid blocks for teleport sweeps to land on, fall off and clip into, in the game's cm
+
+    Each block is (min x, min y, max x, max y, top) and is solid from far below up to its top, so a player placed
+    inside one is pushed out on top. Outside every block there is no floor at all"""
+
+    def __init__(self, _blocks: list) -> None:
+        self.blocks = _blocks
+
+    @classmethod
+    def around(cls, center: tuple) -> "ToyTerrain":
+        """Ground 12 m below center, 40 m across, with a 6 m wide statue on it whose top is at center"""
+        x, y, z = (value * CuriosityManager.POS_SCALE for value in center)
+        return cls([(x - 2000, y - 2000, x + 2000, y + 2000, z - 1200), (x - 300, y - 300, x + 300, y + 300, z)])
+
+    def floorAt(self, x: float, y: float) -> float:
+        """Returns the highest top under x, y, or None over the void"""
+        tops = [top for x0, y0, x1, y1, top in self.blocks if x0 <= x <= x1 and y0 <= y <= y1]
+        return max(tops) if tops else None
+
+
+class SimulatedGame:
+    """Player state reachable through the same pointer chains as the game
+
+    The module image is an untouched anonymous mapping as big as the highest static base, so it costs no memory,
+    and every hop of POS_PTR and VELOCITY_PTR points into its own block of a second mapping. With a ToyTerrain
+    the player stands still and only falls onto or is pushed out of its blocks, instead of running in circles"""
+
+    def __init__(self, _terrain: ToyTerrain = None) -> None:
+        pointers = (CuriosityManager.POS_PTR, CuriosityManager.VELOCITY_PTR)
+        self.image = mmap.mmap(-1, max(base for base, offsets in pointers) + 0x1000)
+        self.base_address = addressOf(self.image)
+        self.nodes = mmap.mmap(-1, NODE_SIZE * sum(len(offsets) for base, offsets in pointers))
+        self.nodes_address = addressOf(self.nodes)
+        self.used = 0
+        self.pos_addr = self.layoutChain(CuriosityManager.POS_PTR)
+        self.vel_addr = self.layoutChain(CuriosityManager.VELOCITY_PTR)
+        self.pos = (ctypes.c_double * 3).from_address(self.pos_addr - 0x10)
+        self.pos_copy = (ctypes.c_double * 3).from_address(self.pos_addr - 0xD8)
+        self.vel = (ctypes.c_double * 3).from_address(self.vel_addr - 0x10)
+        self.heading = 0.0
+        self.floor = 0.0
+        self.last_pos = (0.0, 0.0, 0.0)
+        self.terrain = _terrain
+
+    def newNode(self) -> int:
+        addr = self.nodes_address + self.used
+        self.used += NODE_SIZE
+        return addr
+
+    def layoutChain(self, pointer: tuple) -> int:
+        """Writes every hop of a (base, offsets) chain and returns the address the chain resolves to"""
+        base, offsets = pointer
+        hop_addr = self.base_address + base
+        for offset in offsets:
+            node = self.newNode()
+            ctypes.c_uint64.from_address(hop_addr).value = node
+            hop_addr = node + offset
+        return hop_addr
+
+    def step(self, dt: float) -> None:
+        """Moves the player one tick, anything the trainer wrote since the last tick is taken as the new state"""
+        pos, vel = self.pos, self.vel
+        if self.terrain != None:
+            self.fall(dt)
+            return
+        if (pos[0], pos[1], pos[2]) != self.last_pos:
+            self.floor = pos[2] # teleported, so land on whatever is there
+        self.heading += RUN_SPEED / RUN_RADIUS * dt
+        vel[0] = -math.sin(self.heading) * RUN_SPEED
+        vel[1] = math.cos(self.heading) * RUN_SPEED
+        vel[2] -= GRAVITY * dt
+        pos[0] += vel[0] * dt
+        pos[1] += vel[1] * dt
+        pos[2] += vel[2] * dt
+        if pos[2] <= self.floor:
+            pos[2] = self.floor
+            vel[2] = 0.0
+        self.pos_copy[0], self.pos_copy[1], self.pos_copy[2] = pos[0], pos[1], pos[2]
+        self.last_pos = (pos[0], pos[1], pos[2])
+
+    def fall(self, dt: float) -> None:
+        pos, vel = self.pos, self.vel
+        vel[0], vel[1] = 0.0, 0.0
+        vel[2] -= GRAVITY * dt
+        pos[2] += vel[2] * dt
+        floor = self.terrain.floorAt(pos[0], pos[1])
+        if floor != None and pos[2] <= floor:
+            pos[2] = floor
+            vel[2] = 0.0
+        self.pos_copy[0], self.pos_copy[1], self.pos_copy[2] = pos[0], pos[1], pos[2]
+
+    def run(self, rate: int, stop: threading.Event) -> None:
+        period_ns = 1_000_000_000 // rate
+        deadline = time.perf_counter_ns()
+        while not stop.is_set():
+            self.step(1 / rate)
+            deadline += period_ns
+            remaining = deadline - time.perf_counter_ns()
+            if remaining > 0:
+                time.sleep(remaining / 1_000_000_000)
+            else:
+                deadline = time.perf_counter_ns() # fell behind, do not try to catch up
+
+
+def addressOf(buffer: mmap.mmap) -> int:
+    return ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+
+
+def spawnSimulator(rate: int = 60, terrain: bool = False) -> tuple:
+    """Starts a simulator process and returns (process, pid, base address), close its stdin to stop it"""
+    process = subprocess.Popen([sys.executable, __file__, "--rate", str(rate)] + (["--terrain"] if terrain else []),
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    info = json.loads(process.stdout.readline())
+    return process, info["pid"], info["base_address"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=int, default=60, help="physics ticks per second")
+    parser.add_argument("--terrain", action="store_true", help="stand on toy terrain around Statue Climb instead")
+    args = parser.parse_args()
+
+    game = SimulatedGame(ToyTerrain.around(DEFAULT_POSITIONS["Statue Climb"]) if args.terrain else None)
+    stop = threading.Event()
+    physics = threading.Thread(target=game.run, args=(args.rate, stop), daemon=True)
+    physics.start()
+    print(json.dumps({"pid": os.getpid(), "base_address": game.base_address}), flush=True)
+    sys.stdin.read() # runs until the parent closes stdin or exits
+    stop.set()
+    physics.join()
@@ -0,0 +1,124 @@
+import math, threading
+
+
+class SpatialIndex:
+    """A uniform grid over named points with incremental updates
+
+    Points are bucketed into cubic cells, so a radius query only looks at the cells overlapping the sphere and a
+    nearest point query searches outwards one ring of cells at a time. Adding or removing a point only touches its
+    own cell, so the index can follow saves and deletes as they happen"""
+
+    def __init__(self, cell_size: float = 10.0, points: dict = None) -> None:
+        self.cell_size = cell_size
+        self.cells = {} # cell -> {name: pos}
+        self.points = {} # name -> (cell, pos)
+        self.lock = threading.Lock() # updated from the ui thread, queried from the scheduler thread
+        for name, pos in (points or {}).items():
+            self.add(name, pos)
+
+    def cellOf(self, pos: tuple) -> tuple:
+        size = self.cell_size
+        return (math.floor(pos[0] / size), math.floor(pos[1] / size), math.floor(pos[2] / size))
+
+    def add(self, name: str, pos: tuple) -> None:
+        """Adds a point, or moves it if the name is already indexed"""
+        with self.lock:
+            self.discard(name)
+            cell = self.cellOf(pos)
+            self.cells.setdefault(cell, {})[name] = tuple(pos)
+            self.points[name] = (cell, tuple(pos))
+
+    def remove(self, name: str) -> None:
+        with self.lock:
+            self.discard(name)
+
+    def discard(self, name: str) -> None:
+        entry = self.points.pop(name, None)
+        if entry == None:
+            return
+        bucket = self.cells[entry[0]]
+        del bucket[name]
+        if len(bucket) == 0:
+            del self.cells[entry[0]]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def within(self, pos: tuple, radius: float) -> list:
+        """Returns the names of every point within radius of pos"""
+        x, y, z = pos
+        reach = radius * radius
+        found = []
+        with self.lock:
+            lo = self.cellOf((x - radius, y - radius, z - radius))
+            hi = self.cellOf((x + radius, y + radius, z + radius))
+            for cx in range(lo[0], hi[0] + 1):
+                for cy in range(lo[1], hi[1] + 1):
+                    for cz in range(lo[2], hi[2] + 1):
+                        bucket = self.cells.get((cx, cy, cz))
+                        if bucket == None:
+                            continue
+                        for name, (px, py, pz) in bucket.items():
+                            if (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2 <= reach:
+                                found.append(name)
+        return found
+
+    def nearest(self, pos: tuple, exclude: str = None) -> tuple:
+        """Returns (name, distance) of the point closest to pos, or (None, inf) if there are no points"""
+        x, y, z = pos
+        best, best_sq = None, math.inf
+        with self.lock:
+            cx, cy, cz = self.cellOf(pos)
+            ring = 0
+            # once a search would look at more cells than there are points, checking every point is cheaper
+            while (2 * ring + 1) ** 3 <= len(self.points):
+                for cell in ringCells(cx, cy, cz, ring):
+                    bucket = self.cells.get(cell)
+                    if bucket == None:
+                        continue
+                    for name, (px, py, pz) in bucket.items():
+                        dist_sq = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                        if dist_sq < best_sq and name != exclude:
+                            best, best_sq = name, dist_sq
+                # every cell further out is at least ring * cell_size away
+                if best != None and best_sq <= (ring * self.cell_size) ** 2:
+                    return best, math.sqrt(best_sq)
+                ring += 1
+
+            # far from every point, so check all of them
+            for name, (cell, (px, py, pz)) in self.points.items():
+                dist_sq = (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2
+                if dist_sq < best_sq and name != exclude:
+                    best, best_sq = name, dist_sq
+        return best, math.sqrt(best_sq)
+
+
+def ringCells(cx: int, cy: int, cz: int, ring: int):
+    """Yields the cells on the surface of the cube of cells ring steps away from (cx, cy, cz)"""
+    if ring == 0:
+        yield (cx, cy, cz)
+        return
+    for dx in range(-ring, ring + 1):
+        for dy in range(-ring, ring + 1):
+            if abs(dx) == ring or abs(dy) == ring:
+                for dz in range(-ring, ring + 1):
+                    yield (cx + dx, cy + dy, cz + dz)
+            else:
+                yield (cx + dx, cy + dy, cz - ring)
+                yield (cx + dx, cy + dy, cz + ring)
+
+
+class ProximityTracker:
+    """Reports when a moving position enters the radius around an indexed point"""
+
+    def __init__(self, _index: SpatialIndex, _radius: float) -> None:
+        self.index = _index
+        self.radius = _radius
+        self.inside = set()
+
+    def update(self, pos: tuple) -> list:
+        """Returns the names of the points that pos entered since the last update"""
+        inside = set(self.index.within(pos, self.radius))
+        entered = [name for name in inside if name not in self.inside]
+        self.inside = inside
+        return entered
@@ -0,0 +1,139 @@
+from PySide6.QtCore import Qt, QLineF
+from PySide6.QtGui import QPainter, QPen
+from PySide6.QtWidgets import QWidget
+from collections import deque
+import math, threading
+
+BUCKETS = 1024 # the history is kept at this resolution no matter the sample rate
+
+
+class SpeedHistory:
+    """Speed samples from the telemetry thread, reduced as they arrive to what the ui needs to show
+
+    Each sample only updates the min/max of its time bucket and the running stats, so reading the history costs the
+    same at 240 Hz as at 60 Hz. Peak and time above the target are kept since the last reset, the average is over
+    the last average_seconds"""
+
+    def __init__(self, seconds: float = 30.0, average_seconds: float = 1.0, target: float = 0.0) -> None:
+        self.bucket_ns = int(seconds * 1_000_000_000) // BUCKETS
+        self.average_ns = int(average_seconds * 1_000_000_000)
+        self.target = target
+        self.lock = threading.Lock() # written from the scheduler thread, read from the ui thread
+        self.reset()
+
+    def reset(self) -> None:
+        self.mins = [math.nan] * BUCKETS
+        self.maxs = [math.nan] * BUCKETS
+        self.bucket_ids = [-1] * BUCKETS
+        self.count = 0 # changes whenever there is something new to show
+        self.latest = 0.0
+        self.latest_ns = 0
+        self.peak = 0.0
+        self.above_ns = 0
+        self.window = deque() # (time_ns, speed) of the samples in the average
+        self.window_sum = 0.0
+
+    def append(self, time_ns: int, speed: float) -> None:
+        with self.lock:
+            bucket = time_ns // self.bucket_ns
+            slot = bucket % BUCKETS
+            if self.bucket_ids[slot] != bucket:
+                self.bucket_ids[slot] = bucket
+                self.mins[slot] = self.maxs[slot] = speed
+            elif speed < self.mins[slot]:
+                self.mins[slot] = speed
+            elif speed > self.maxs[slot]:
+                self.maxs[slot] = speed
+
+            if self.count > 0 and self.latest >= self.target:
+                self.above_ns += time_ns - self.latest_ns # the previous speed held until this sample
+            if speed > self.peak:
+                self.peak = speed
+            self.window.append((time_ns, speed))
+            self.window_sum += speed
+            while self.window[0][0] <= time_ns - self.average_ns:
+                self.window_sum -= self.window.popleft()[1]
+            if len(self.window) == 1:
+                self.window_sum = speed # stops rounding errors from building up
+
+            self.latest = speed
+            self.latest_ns = time_ns
+            self.count += 1
+
+    @property
+    def average(self) -> float:
+        with self.lock:
+            return self.window_sum / len(self.window) if self.window else 0.0
+
+    def setTarget(self, target: float) -> None:
+        with self.lock:
+            self.target = target
+            self.above_ns = 0
+
+    def buckets(self) -> tuple:
+        """Returns (mins, maxs) of every bucket from oldest to newest, nan where there were no samples"""
+        import numpy as np # only once there is something to draw, so it is not loaded before the window first paints
+        with self.lock:
+            mins = np.array(self.mins)
+            maxs = np.array(self.maxs)
+            ids = np.array(self.bucket_ids)
+            oldest = self.latest_ns // self.bucket_ns - BUCKETS + 1
+        # buckets are placed by their time, so gaps in the samples stay gaps in the graph
+        fresh = ids >= oldest
+        ordered_mins = np.full(BUCKETS, np.nan)
+        ordered_maxs = np.full(BUCKETS, np.nan)
+        ordered_mins[ids[fresh] - oldest] = mins[fresh]
+        ordered_maxs[ids[fresh] - oldest] = maxs[fresh]
+        return ordered_mins, ordered_maxs
+
+
+def decimate(mins: "np.ndarray", maxs: "np.ndarray", columns: int) -> tuple:
+    """Reduces min/max series to at most one (min, max) pair per column, so drawing costs the same as the width"""
+    import numpy as np
+    if columns >= len(mins):
+        return mins, maxs
+    edges = np.linspace(0, len(mins), columns + 1).astype(np.int64)[:-1]
+    edges = np.unique(edges)
+    with np.errstate(invalid="ignore"):
+        return np.fmin.reduceat(mins, edges), np.fmax.reduceat(maxs, edges)
+
+
+class SpeedGraph(QWidget):
+    """A scrolling speed graph drawn as one min to max line per pixel column"""
+
+    def __init__(self, parent=None) -> None:
+        QWidget.__init__(self, parent)
+        self.history = None
+        self.target = 0.0
+        self.setMinimumHeight(60)
+
+    def setHistory(self, history: SpeedHistory) -> None:
+        self.history = history
+        self.update()
+
+    def paintEvent(self, event) -> None:
+        painter = QPainter(self)
+        width, height = self.width(), self.height()
+        painter.fillRect(0, 0, width, height, self.palette().base())
+        if self.history == None or self.history.count == 0:
+            return
+
+        import numpy as np
+        mins, maxs = decimate(*self.history.buckets(), max(width, 1))
+        # each column also reaches the range of the one before it so the line stays connected
+        lows = np.fmin(mins, np.concatenate(([np.nan], maxs[:-1])))
+        highs = np.fmax(maxs, np.concatenate(([np.nan], mins[:-1])))
+        top = max(float(np.nanmax(highs)), self.target, 1.0) * 1.1
+        scale = (height - 1) / top
+        step = width / len(mins)
+        lines = []
+        for i in np.flatnonzero(~np.isnan(mins)):
+            x = (i + 0.5) * step
+            lines.append(QLineF(x, height - 1 - lows[i] * scale, x, height - 1 - highs[i] * scale))
+        painter.setPen(QPen(self.palette().highlight(), 1))
+        painter.drawLines(lines)
+
+        if self.target > 0:
+            y = height - 1 - self.target * scale
+            painter.setPen(QPen(self.palette().text(), 1, Qt.PenStyle.DashLine))
+            painter.drawLine(QLineF(0, y, width, y))
@@ -0,0 +1,210 @@
+import math, os, struct
+
+SPLITS_MAGIC = b"CTSP"
+SPLITS_VERSION = 1
+NO_TIME = -1 # stored in place of a missing split or segment
+
+
+def entryFraction(p0: tuple, p1: tuple, center: tuple, radius: float) -> float:
+    """Returns how far along the step from p0 to p1 it first enters the sphere, or None if it does not"""
+    d = (p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2])
+    f = (p0[0] - center[0], p0[1] - center[1], p0[2] - center[2])
+    c = f[0] * f[0] + f[1] * f[1] + f[2] * f[2] - radius * radius
+    if c <= 0:
+        return None # already inside
+    a = d[0] * d[0] + d[1] * d[1] + d[2] * d[2]
+    b = 2 * (f[0] * d[0] + f[1] * d[1] + f[2] * d[2])
+    disc = b * b - 4 * a * c
+    if a == 0 or disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / (2 * a)
+    return t if 0 <= t <= 1 else None
+
+
+def exitFraction(p0: tuple, p1: tuple, center: tuple, radius: float) -> float:
+    """Returns how far along the step from p0 to p1 it leaves the sphere, or None if it does not"""
+    d = (p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2])
+    f = (p0[0] - center[0], p0[1] - center[1], p0[2] - center[2])
+    c = f[0] * f[0] + f[1] * f[1] + f[2] * f[2] - radius * radius
+    if c > 0:
+        return None # starts outside
+    a = d[0] * d[0] + d[1] * d[1] + d[2] * d[2]
+    if a == 0:
+        return None
+    b = 2 * (f[0] * d[0] + f[1] * d[1] + f[2] * d[2])
+    t = (-b + math.sqrt(max(b * b - 4 * a * c, 0.0))) / (2 * a)
+    return t if t <= 1 else None
+
+
+def isInside(pos: tuple, center: tuple, radius: float) -> bool:
+    return (pos[0] - center[0]) ** 2 + (pos[1] - center[1]) ** 2 + (pos[2] - center[2]) ** 2 <= radius * radius
+
+
+class SegmentTimer:
+    """Times a route of saved positions from the live player position
+
+    The run starts when the player leaves the sphere around the first position, splits when they enter the sphere
+    around each following position in order and finishes at the last one. Going back into the start sphere resets
+    the run. Crossing times are interpolated between the two samples on either side of the sphere's surface, so
+    splits are as precise at 60 Hz as at 240 Hz as long as the player moves in a straight line between samples"""
+
+    def __init__(self, _names: list, _positions: list, _radius: float = 3.0) -> None:
+        if len(_names) < 2:
+            raise ValueError("A route needs at least two positions")
+        self.names = list(_names)
+        self.positions = [tuple(pos) for pos in _positions]
+        self.radius = _radius
+        self.reset()
+
+    def reset(self) -> None:
+        self.state = "waiting" # waiting -> ready -> running -> finished
+        self.previous = None
+        self.start_ns = None
+        self.index = 0 # the position that splits next
+        self.splits = [] # ns since the start of every split so far
+
+    def crossingTime(self, t0: int, t1: int, fraction: float) -> int:
+        return t0 + round((t1 - t0) * fraction)
+
+    def update(self, time_ns: int, pos: tuple) -> list:
+        """Returns a list of (event, position index, splits) for the start, splits, finish and resets that happened
+        since the last sample, where splits are the ns since the start of every split of the run so far"""
+        previous = self.previous
+        self.previous = (time_ns, pos)
+        start = self.positions[0]
+        if previous == None:
+            if isInside(pos, start, self.radius):
+                self.state = "ready"
+            return []
+        t0, p0 = previous
+        events = []
+
+        if self.state != "ready" and isInside(pos, start, self.radius) and not isInside(p0, start, self.radius):
+            if self.state == "running":
+                events.append(("reset", self.index, tuple(self.splits)))
+            self.state = "ready"
+            self.start_ns = None
+            self.splits = []
+            return events
+
+        if self.state == "ready":
+            fraction = exitFraction(p0, pos, start, self.radius)
+            if fraction == None:
+                return events
+            self.start_ns = self.crossingTime(t0, time_ns, fraction)
+            self.state = "running"
+            self.index = 1
+            self.splits = []
+            events.append(("start", 0, ()))
+
+        while self.state == "running":
+            fraction = entryFraction(p0, pos, self.positions[self.index], self.radius)
+            if fraction == None:
+                break
+            elapsed = self.crossingTime(t0, time_ns, fraction) - self.start_ns
+            self.splits.append(elapsed)
+            if self.index == len(self.positions) - 1:
+                self.state = "finished"
+                events.append(("finish", self.index, tuple(self.splits)))
+            else:
+                events.append(("split", self.index, tuple(self.splits)))
+                self.index += 1
+        return events
+
+
+class RouteRecord:
+    """Personal best splits and best segments of one route, all in ns"""
+
+    def __init__(self, _names: tuple, _pb: list = None, _best: list = None) -> None:
+        self.names = tuple(_names)
+        segments = len(self.names) - 1
+        self.pb = list(_pb) if _pb != None else [None] * segments # time since the start at every split
+        self.best = list(_best) if _best != None else [None] * segments # fastest time for each segment
+
+    @property
+    def sum_of_best(self) -> int:
+        """The best possible time from the best segments, or None until every segment has been done"""
+        return None if None in self.best else sum(self.best)
+
+    def addSplits(self, splits: list) -> list:
+        """Records the splits of a run, finished or not, and returns the indices of the segments that were golds"""
+        golds = []
+        for i, split in enumerate(splits):
+            segment = split - (splits[i - 1] if i > 0 else 0)
+            if self.best[i] == None or segment < self.best[i]:
+                self.best[i] = segment
+                golds.append(i)
+        finished = len(splits) == len(self.pb)
+        if finished and (self.pb[-1] == None or splits[-1] < self.pb[-1]):
+            self.pb = list(splits)
+        return golds
+
+
+class SplitRecords:
+    """Every route's personal best and best segments in one small binary file
+
+    The file is a header of magic, version and route count, then for every route its position names (each a u16
+    length and utf-8 bytes) followed by the personal best and best segment times as little endian int64s"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.routes = {}
+        if os.path.exists(path):
+            self.load()
+
+    def route(self, names: list) -> RouteRecord:
+        names = tuple(names)
+        if names not in self.routes:
+            self.routes[names] = RouteRecord(names)
+        return self.routes[names]
+
+    def load(self) -> None:
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        try:
+            self.unpack(data)
+        except (struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"{self.path} is damaged: {e}")
+
+    def unpack(self, data: bytes) -> None:
+        magic, version, count = struct.unpack_from("<4sHI", data, 0)
+        if magic != SPLITS_MAGIC or version != SPLITS_VERSION:
+            raise ValueError(f"{self.path} is not a splits file this version can read")
+        offset = struct.calcsize("<4sHI")
+        for i in range(count):
+            (name_count,) = struct.unpack_from("<H", data, offset)
+            offset += 2
+            names = []
+            for j in range(name_count):
+                (length,) = struct.unpack_from("<H", data, offset)
+                names.append(data[offset + 2:offset + 2 + length].decode("utf-8"))
+                offset += 2 + length
+            segments = name_count - 1
+            times = struct.unpack_from(f"<{segments * 2}q", data, offset)
+            offset += segments * 16
+            times = [None if t == NO_TIME else t for t in times]
+            self.routes[tuple(names)] = RouteRecord(names, times[:segments], times[segments:])
+
+    def save(self) -> None:
+        parts = [struct.pack("<4sHI", SPLITS_MAGIC, SPLITS_VERSION, len(self.routes))]
+        for route in self.routes.values():
+            parts.append(struct.pack("<H", len(route.names)))
+            for name in route.names:
+                encoded = name.encode("utf-8")
+                parts.append(struct.pack("<H", len(encoded)) + encoded)
+            times = [NO_TIME if t == None else t for t in route.pb + route.best]
+            parts.append(struct.pack(f"<{len(times)}q", *times))
+        # written next to the old file and swapped in, so a crash can not leave half a file behind
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(parts))
+        os.replace(tmp_path, self.path)
+
+
+def formatTime(ns: int, signed: bool = False) -> str:
+    if ns == None:
+        return "-"
+    sign = ("+" if ns >= 0 else "-") if signed else ("-" if ns < 0 else "")
+    seconds = abs(ns) / 1_000_000_000
+    minutes, seconds = divmod(seconds, 60)
+    return f"{sign}{int(minutes)}:{seconds:06.3f}" if minutes else f"{sign}{seconds:.3f}"
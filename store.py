@@ -0,0 +1,154 @@
+from collections.abc import MutableMapping
+import json, os, sqlite3, threading
+
+DEFAULT_COLLECTION = "default"
+
+
+class PositionStore:
+    """Saved positions kept in a SQLite database, grouped into named collections (e.g. per-category route packs)
+
+    Every save and delete is its own small transaction, so nothing is lost if the trainer crashes. The database is
+    only opened when a collection is first used, and an existing pos.json is imported into the default collection
+    the first time the database is created. Remapped hotkeys are kept in the same database"""
+
+    def __init__(self, path: str, legacy_json_path: str = None) -> None:
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        self.db = None
+        self.collections_cache = {}
+        self.lock = threading.RLock()
+
+    def connect(self) -> sqlite3.Connection:
+        with self.lock:
+            if self.db != None:
+                return self.db
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL") # appends to a log instead of rewriting pages in place
+            self.db.execute("PRAGMA synchronous=NORMAL") # durable across crashes of the trainer itself
+            exists = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'positions'").fetchone() != None
+            self.db.execute("""CREATE TABLE IF NOT EXISTS positions (
+                collection TEXT NOT NULL,
+                name TEXT NOT NULL,
+                x REAL NOT NULL,
+                y REAL NOT NULL,
+                z REAL NOT NULL,
+                PRIMARY KEY (collection, name)
+            )""")
+            self.db.execute("""CREATE TABLE IF NOT EXISTS hotkeys (
+                action TEXT PRIMARY KEY,
+                key TEXT NOT NULL
+            )""")
+            if not exists and self.legacy_json_path != None and os.path.exists(self.legacy_json_path):
+                self.importJson(self.legacy_json_path)
+            return self.db
+
+    def collection(self, name: str = DEFAULT_COLLECTION) -> "PositionCollection":
+        with self.lock:
+            if name not in self.collections_cache:
+                self.collections_cache[name] = PositionCollection(self, name)
+            return self.collections_cache[name]
+
+    def collectionNames(self) -> list:
+        rows = self.connect().execute("SELECT DISTINCT collection FROM positions ORDER BY collection").fetchall()
+        return [row[0] for row in rows]
+
+    def hotkeys(self, defaults: dict) -> dict:
+        """Returns the key of every action in defaults, the default one unless it was remapped"""
+        with self.lock:
+            rows = self.connect().execute("SELECT action, key FROM hotkeys").fetchall()
+        saved = dict(rows)
+        return {action: saved.get(action, key) for action, key in defaults.items()}
+
+    def saveHotkey(self, action: str, key: str) -> None:
+        with self.lock:
+            self.connect().execute("INSERT INTO hotkeys (action, key) VALUES (?, ?) "
+                                   "ON CONFLICT (action) DO UPDATE SET key = excluded.key", (action, key))
+
+    def importJson(self, path: str, collection: str = DEFAULT_COLLECTION) -> int:
+        """Imports a {name: [x, y, z]} json file into a collection and returns how many positions were imported"""
+        with open(path, 'r') as f:
+            try:
+                positions = json.load(f)
+            except json.JSONDecodeError:
+                return 0
+        rows = [(collection, name, *pos) for name, pos in positions.items()]
+        with self.lock:
+            db = self.connect()
+            db.execute("BEGIN")
+            db.executemany(UPSERT, rows)
+            db.execute("COMMIT")
+            self.collections_cache.pop(collection, None)
+        return len(rows)
+
+    def exportJson(self, path: str, collection: str = DEFAULT_COLLECTION) -> None:
+        with open(path, 'w') as f:
+            f.write(json.dumps(dict(self.collection(collection)), indent=4))
+
+    def close(self) -> None:
+        with self.lock:
+            if self.db != None:
+                self.db.close()
+                self.db = None
+            self.collections_cache.clear()
+
+
+UPSERT = """INSERT INTO positions (collection, name, x, y, z) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (collection, name) DO UPDATE SET x = excluded.x, y = excluded.y, z = excluded.z"""
+
+
+class PositionCollection(MutableMapping):
+    """A dict of {name: (x, y, z)} backed by one collection of a PositionStore, in the order positions were saved"""
+
+    def __init__(self, _store: PositionStore, _name: str) -> None:
+        self.store = _store
+        self.name = _name
+        self.positions = None
+
+    def load(self) -> dict:
+        if self.positions == None:
+            with self.store.lock:
+                rows = self.store.connect().execute(
+                    "SELECT name, x, y, z FROM positions WHERE collection = ? ORDER BY rowid", (self.name,))
+                self.positions = {name: (x, y, z) for name, x, y, z in rows}
+        return self.positions
+
+    def __getitem__(self, name: str) -> tuple:
+        with self.store.lock:
+            return self.load()[name]
+
+    def __setitem__(self, name: str, pos: tuple) -> None:
+        with self.store.lock:
+            self.store.connect().execute(UPSERT, (self.name, name, *pos))
+            self.load()[name] = tuple(pos)
+
+    def __delitem__(self, name: str) -> None:
+        with self.store.lock:
+            positions = self.load()
+            if name not in positions:
+                raise KeyError(name)
+            # the cache only changes once the row is gone, like in __setitem__
+            self.store.connect().execute("DELETE FROM positions WHERE collection = ? AND name = ?", (self.name, name))
+            del positions[name]
+
+    def __iter__(self):
+        with self.store.lock:
+            return iter(list(self.load())) # a copy, so saving from another thread can not break the iteration
+
+    def __len__(self) -> int:
+        with self.store.lock:
+            return len(self.load())
+
+    def __contains__(self, name) -> bool:
+        with self.store.lock:
+            return name in self.load()
+
+    def update(self, other=(), **kwargs) -> None:
+        """Saves many positions in one transaction"""
+        positions = dict(other, **kwargs)
+        with self.store.lock:
+            db = self.store.connect()
+            db.execute("BEGIN")
+            db.executemany(UPSERT, [(self.name, name, *pos) for name, pos in positions.items()])
+            db.execute("COMMIT")
+            self.load().update((name, tuple(pos)) for name, pos in positions.items())
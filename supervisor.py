@@ -0,0 +1,112 @@
+from PySide6.QtCore import QThread, Signal
+from memory import closeExitHandle, hasExited, openExitHandle
+from metrics import METRICS
+import ctypes, sys, threading, time
+
+try:
+    import win32ui, win32process, win32event, win32gui
+except ImportError:
+    if sys.platform != "linux": raise # the supervisor can still watch linux processes
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WAIT_SLICE_MS = 250 # how long a wait can block before checking if the supervisor was stopped
+
+
+def findGamePid() -> int:
+    """Returns the PID of the running game or None"""
+    if sys.platform == "linux":
+        return None # the game only runs on windows
+    try:
+        hwnd = win32ui.FindWindow("UnrealWindow", "Curiosity  ").GetSafeHwnd()
+    except win32ui.error:
+        return None
+    return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+
+class ConnectionSupervisor(QThread):
+    """Watches the game process so the trainer reacts to it starting and exiting instead of checking before every action
+
+    While connected, the thread blocks on a handle to the game process (a pidfd on Linux, the process handle on Windows)
+    which is signalled when the game exits. On Windows it also pumps foreground window change events, so focus is
+    known without a lookup on every hotkey. While disconnected, it looks for the game every retry interval"""
+    found = Signal(int, object) # pid, perf_counter_ns when it was found (too big for a qt int)
+    lost = Signal(int) # pid
+
+    def __init__(self, _find_pid=findGamePid, _retry_interval: float = 1.0) -> None:
+        QThread.__init__(self, None)
+        self.find_pid = _find_pid
+        self.retry_interval = _retry_interval
+        self.pid = None
+        self.lost_pid = None
+        self.focused = sys.platform == "linux" # focus changes are only tracked on windows
+        self.on = True
+        self.wake = threading.Event()
+        self.hook = None
+        self.hook_proc = None
+
+    def stop(self) -> None:
+        self.on = False
+        self.wake.set()
+        self.wait()
+
+    def run(self) -> None:
+        METRICS.nameThread("supervisor")
+        if sys.platform == "win32":
+            self.hookForeground()
+        while self.on:
+            pid = self.find_pid()
+            if pid == None or pid == self.lost_pid: # the window of a closing game can outlive its process
+                self.wake.wait(self.retry_interval)
+                continue
+
+            found_ns = time.perf_counter_ns()
+            handle = openExitHandle(pid)
+            if handle == None: # exited before it could be watched
+                self.wake.wait(self.retry_interval)
+                continue
+            self.pid = pid
+            if sys.platform == "win32":
+                self.focused = self.isForeground(win32gui.GetForegroundWindow())
+            self.found.emit(pid, found_ns)
+
+            exited = self.waitForExit(handle)
+            closeExitHandle(handle)
+            self.pid = None
+            if exited:
+                self.lost_pid = pid
+                self.lost.emit(pid)
+        if self.hook != None:
+            ctypes.windll.user32.UnhookWinEvent(self.hook)
+
+    def waitForExit(self, handle) -> bool:
+        """Blocks until the process exits (True) or the supervisor is stopped (False)"""
+        if sys.platform == "win32":
+            while self.on:
+                result = win32event.MsgWaitForMultipleObjects([handle], False, WAIT_SLICE_MS, win32event.QS_ALLINPUT)
+                if result == win32event.WAIT_OBJECT_0:
+                    return True
+                if result == win32event.WAIT_OBJECT_0 + 1:
+                    win32gui.PumpWaitingMessages() # runs the foreground hook
+            return False
+
+        while self.on:
+            if hasExited(handle, WAIT_SLICE_MS):
+                return True
+        return False
+
+    def hookForeground(self) -> None:
+        """Listens for foreground window changes, the events are delivered while messages are pumped in waitForExit"""
+        proc_type = ctypes.WINFUNCTYPE(None, ctypes.c_void_p, ctypes.c_uint, ctypes.c_void_p, ctypes.c_long,
+                                       ctypes.c_long, ctypes.c_uint, ctypes.c_uint)
+        self.hook_proc = proc_type(self.foregroundChanged) # kept so it is not garbage collected
+        self.hook = ctypes.windll.user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, None,
+                                                          self.hook_proc, 0, 0, WINEVENT_OUTOFCONTEXT)
+
+    def foregroundChanged(self, hook, event, hwnd, object_id, child_id, thread_id, time_ms) -> None:
+        self.focused = self.isForeground(hwnd)
+
+    def isForeground(self, hwnd) -> bool:
+        if not hwnd or self.pid == None:
+            return False
+        return win32process.GetWindowThreadProcessId(hwnd)[1] == self.pid
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+
+"""Teleports the player to every point of a grid or list in turn and records where physics takes them.
+
+Usage: python sweep.py results.npz [--around "Statue Climb"] [--spacing 0.5] [--counts 9 9 3] [--points points.csv]
+                       [--ticks 60] [--bounds X0 Y0 Z0 X1 Y1 Z1] [--export results.csv] [--simulator]
+Progress is checkpointed to the results file, so running the same sweep again carries on where it stopped"""
+
+from playback import waitUntil
+import numpy as np
+import argparse, os, sys, time
+
+PENDING, LANDED, FELL, CLIPPED, OUT_OF_BOUNDS = range(5)
+OUTCOMES = ("pending", "landed", "fell", "clipped", "out_of_bounds")
+FALL_DISTANCE = 3.0 # m below the start that counts as a fall instead of landing on something
+FALL_SPEED = 100.0 # downward velocity in the game's cm/s that means the player was still falling when the point ended
+CLIP_HEIGHT = 0.5 # m above the start, the game only moves the player up like that when pushing them out of geometry
+REST_TICKS = 3 # reads in a row without the player moving that end a point early, 0 turns early ends off
+CHECKPOINT_EVERY = 64 # points between checkpoints
+
+
+def gridPoints(center: tuple, spacing: float, counts: tuple) -> np.ndarray:
+    """Returns the (n, 3) points of a grid with counts points along each axis, spacing apart around center"""
+    axes = [center[i] + (np.arange(counts[i]) - (counts[i] - 1) / 2) * spacing for i in range(3)]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+
+def classify(points: np.ndarray, end_pos: np.ndarray, end_vel: np.ndarray, bounds: tuple = None) -> np.ndarray:
+    """Returns the outcome of every point from where it started and ended, bounds is (low xyz, high xyz) if known"""
+    drop = points[:, 2] - end_pos[:, 2]
+    outcome = np.full(len(points), LANDED, dtype=np.uint8)
+    outcome[drop < -CLIP_HEIGHT] = CLIPPED
+    outcome[(drop > FALL_DISTANCE) | (end_vel[:, 2] < -FALL_SPEED)] = FELL
+    outside = ~np.all(np.isfinite(end_pos), axis=1)
+    if bounds != None:
+        outside |= np.any((end_pos < np.asarray(bounds[0])) | (end_pos > np.asarray(bounds[1])), axis=1)
+    outcome[outside] = OUT_OF_BOUNDS
+    return outcome
+
+
+class SweepResults:
+    """One row per point of a sweep, kept as columns: the start, the end position and velocity, the ticks it took
+    and the outcome, which stays PENDING until the point has been run"""
+
+    def __init__(self, _points: np.ndarray, _settle_ticks: int, _tick_rate: int) -> None:
+        self.points = np.ascontiguousarray(_points, dtype=np.float64).reshape(-1, 3)
+        self.settle_ticks = int(_settle_ticks)
+        self.tick_rate = int(_tick_rate)
+        count = len(self.points)
+        self.end_pos = np.full((count, 3), np.nan)
+        self.end_vel = np.full((count, 3), np.nan)
+        self.ticks = np.zeros(count, dtype=np.int32)
+        self.outcome = np.zeros(count, dtype=np.uint8)
+
+    @property
+    def done(self) -> int:
+        return int(np.count_nonzero(self.outcome != PENDING))
+
+    def counts(self) -> dict:
+        found = np.bincount(self.outcome, minlength=len(OUTCOMES))
+        return {name: int(count) for name, count in zip(OUTCOMES, found)}
+
+    def matches(self, other: "SweepResults") -> bool:
+        """Returns if other is the same sweep, so its results can be carried on with"""
+        return (self.settle_ticks == other.settle_ticks and self.tick_rate == other.tick_rate and
+                np.array_equal(self.points, other.points))
+
+    def save(self, path: str) -> None:
+        # written next to the old file and swapped in, so a crash can not leave half a checkpoint behind
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, points=self.points, end_pos=self.end_pos, end_vel=self.end_vel, ticks=self.ticks,
+                     outcome=self.outcome, settings=np.array([self.settle_ticks, self.tick_rate]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SweepResults":
+        try:
+            with np.load(path) as data:
+                settle_ticks, tick_rate = data["settings"]
+                results = cls(data["points"], settle_ticks, tick_rate)
+                for name in ("end_pos", "end_vel", "ticks", "outcome"):
+                    getattr(results, name)[:] = data[name]
+        except (KeyError, ValueError, OSError) as e:
+            raise ValueError(f"{path} is not a sweep checkpoint: {e}")
+        return results
+
+    def exportCsv(self, path: str) -> None:
+        """Writes the points that were run as CSV rows for plotting, positions in m and velocities in cm/s"""
+        with open(path, 'w') as f:
+            f.write("x,y,z,end_x,end_y,end_z,vel_x,vel_y,vel_z,ticks,outcome\n")
+            for i in np.flatnonzero(self.outcome != PENDING):
+                values = ",".join(f"{value:.3f}" for value in (*self.points[i], *self.end_pos[i], *self.end_vel[i]))
+                f.write(f"{values},{self.ticks[i]},{OUTCOMES[self.outcome[i]]}\n")
+
+
+class SweepRunner:
+    """Runs the points of a sweep one after another through a CuriosityManager, as fast as physics allows
+
+    The pointers are resolved once, so a point is one batched write and then one batched read per tick waited. A
+    point ends after the settle ticks, or sooner once the player has not moved for rest_ticks reads in a row or has
+    already fallen FALL_DISTANCE, so only points still in the air run for every tick. Results are saved to
+    path every checkpoint_every points and whenever the run ends, errors included, and a runner for the same points
+    with an existing checkpoint only runs the points that have no result yet"""
+
+    def __init__(self, _manager, _points: np.ndarray, _path: str, _settle_ticks: int = 60, _tick_rate: int = 60,
+                 _bounds: tuple = None, _rest_ticks: int = REST_TICKS, _checkpoint_every: int = CHECKPOINT_EVERY
+                 ) -> None:
+        if _settle_ticks < 1 or _tick_rate < 1:
+            raise ValueError("A sweep needs at least one settle tick and a tick rate of at least 1")
+        self.manager = _manager
+        self.path = _path
+        self.bounds = _bounds
+        self.rest_ticks = _rest_ticks # 0 always waits for every settle tick
+        self.checkpoint_every = _checkpoint_every
+        self.results = SweepResults(_points, _settle_ticks, _tick_rate)
+        if os.path.exists(_path):
+            saved = SweepResults.load(_path)
+            if not saved.matches(self.results):
+                raise ValueError(f"{_path} is the checkpoint of a different sweep")
+            self.results = saved
+        self.on = False
+
+    def stop(self) -> None:
+        self.on = False
+
+    def run(self, progress=None) -> SweepResults:
+        """Runs every point without a result until done or stopped, progress gets (done, total) at every checkpoint"""
+        manager, results = self.manager, self.results
+        period_ns = 1_000_000_000 // results.tick_rate
+        step = 1 if self.rest_ticks else results.settle_ticks # without early ends, only the last tick is read
+        pos_addr = manager.getPTRAddr(manager.POS_PTR)
+        vel_addr = manager.getPTRAddr(manager.VELOCITY_PTR)
+        unsaved = 0
+        self.on = True
+        try:
+            for i in np.flatnonzero(results.outcome == PENDING):
+                if not self.on:
+                    break
+                manager.writePosition(results.points[i].tolist(), pos_addr, vel_addr)
+                deadline = time.perf_counter_ns()
+                last_pos, rest, ticks = None, 0, 0
+                start_z = results.points[i][2]
+                while ticks < results.settle_ticks:
+                    ticks += step
+                    deadline += period_ns * step
+                    waitUntil(deadline)
+                    pos, vel = manager.readState(pos_addr, vel_addr)
+                    rest = rest + 1 if pos == last_pos else 0
+                    last_pos = pos
+                    if self.rest_ticks and (rest >= self.rest_ticks or start_z - pos[2] > FALL_DISTANCE):
+                        break # already still, or already fallen far enough for the outcome to be decided
+                results.end_pos[i] = pos
+                results.end_vel[i] = vel
+                results.ticks[i] = ticks
+                results.outcome[i:i + 1] = classify(results.points[i:i + 1], results.end_pos[i:i + 1],
+                                                    results.end_vel[i:i + 1], self.bounds)
+                unsaved += 1
+                if unsaved >= self.checkpoint_every:
+                    results.save(self.path)
+                    unsaved = 0
+                    if progress != None:
+                        progress(results.done, len(results.points))
+        finally:
+            self.on = False
+            results.save(self.path) # also when the game closed mid-point, that point is run again on resume
+        return results
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="results and checkpoint file (.npz)")
+    parser.add_argument("--around", default="Statue Climb", help="saved position to centre the grid on")
+    parser.add_argument("--spacing", type=float, default=0.5, help="grid spacing in m")
+    parser.add_argument("--counts", type=int, nargs=3, default=(9, 9, 3), help="grid points along x, y and z")
+    parser.add_argument("--points", help="CSV of x,y,z points to use instead of a grid")
+    parser.add_argument("--ticks", type=int, default=60, help="physics ticks to let each point run for at most")
+    parser.add_argument("--tick-rate", type=int, default=60, help="physics ticks per second of the game")
+    parser.add_argument("--rest-ticks", type=int, default=REST_TICKS, help="end a point once still for this many "
+                        "ticks, 0 always runs every tick")
+    parser.add_argument("--bounds", type=float, nargs=6, help="x0 y0 z0 x1 y1 z1 of the playable area in m")
+    parser.add_argument("--export", help="also write the results as CSV to this path")
+    parser.add_argument("--pid", type=int, help="attach to this process instead of looking for the game")
+    parser.add_argument("--base-address", type=lambda text: int(text, 0), help="module base address of --pid")
+    parser.add_argument("--simulator", action="store_true", help="sweep a simulated game on toy terrain instead")
+    args = parser.parse_args()
+
+    from data import DEFAULT_POSITIONS, SAVED_POSITIONS
+    from manager import CuriosityManager
+    if args.points != None:
+        points = np.loadtxt(args.points, delimiter=",", ndmin=2)[:, :3]
+    else:
+        positions = {**DEFAULT_POSITIONS, **SAVED_POSITIONS}
+        if args.around not in positions:
+            sys.exit(f"There is no saved position named {args.around}")
+        points = gridPoints(positions[args.around], args.spacing, args.counts)
+    bounds = (args.bounds[:3], args.bounds[3:]) if args.bounds != None else None
+
+    simulator = None
+    if args.simulator:
+        from simulator import spawnSimulator
+        simulator, args.pid, args.base_address = spawnSimulator(args.tick_rate, terrain=True)
+    manager = CuriosityManager(None, args.pid, args.base_address)
+    started = time.perf_counter()
+    try:
+        runner = SweepRunner(manager, points, args.path, args.ticks, args.tick_rate, bounds, args.rest_ticks)
+        done = runner.results.done
+        runner.run(lambda done, total: print(f"{done}/{total} points", flush=True))
+        seconds = time.perf_counter() - started
+        print(f"Ran {runner.results.done - done} points in {seconds:.1f} s")
+    except KeyboardInterrupt:
+        pass
+    except ValueError as e:
+        sys.exit(str(e))
+    except Exception as e:
+        print(f"Stopped: {e}") # most likely the game closed
+    finally:
+        manager.kill()
+        if simulator != None:
+            simulator.stdin.close()
+            simulator.wait()
+
+    results = SweepResults.load(args.path)
+    print(", ".join(f"{count} {name}" for name, count in results.counts().items()))
+    if args.export != None:
+        results.exportCsv(args.export)
+    if results.done < len(results.points):
+        print(f"{results.done}/{len(results.points)} points done, run the same command again to carry on")
+        sys.exit(1)
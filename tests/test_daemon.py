@@ -0,0 +1,59 @@
+from daemon import TrainerDaemon, GAME_ERROR, INVALID_PARAMS
+import asyncio, json, threading
+
+
+class FakePlayer:
+    on = True
+
+    def report(self) -> dict:
+        return {"written": 0}
+
+
+class FakeManager:
+    """Only what stopPlayback and setTickRate use, stopping playback waits until released like joining its thread"""
+
+    def __init__(self) -> None:
+        self.playback = type("PlaybackWorker", (), {"player": FakePlayer()})()
+        self.released = threading.Event()
+        self.stopped_on = None
+
+    def togglePlayback(self, on: bool, player=None) -> None:
+        self.stopped_on = threading.current_thread()
+        self.released.wait(2.0)
+
+    def setTickRate(self, rate: int) -> None:
+        len(rate) # a bug in the manager that happens to raise TypeError
+
+
+def request(daemon: TrainerDaemon, method: str, params=()) -> dict:
+    line = json.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params}).encode()
+    return daemon.handleLine(line, None)
+
+
+def test_params_are_checked_before_the_call():
+    async def run() -> None:
+        daemon = TrainerDaemon(FakeManager, "unused")
+        daemon.loop = asyncio.get_running_loop()
+        daemon.manager = FakeManager()
+        assert json.loads(await request(daemon, "setTickRate", {"speed": 60}))["error"]["code"] == INVALID_PARAMS
+        assert json.loads(await request(daemon, "ping", [1]))["error"]["code"] == INVALID_PARAMS
+        error = json.loads(await request(daemon, "setTickRate", [60]))["error"]
+        assert error["code"] == GAME_ERROR and error["message"].startswith("TypeError")
+        daemon.executor.shutdown()
+    asyncio.run(run())
+
+
+def test_blocking_calls_leave_the_loop_serving():
+    async def run() -> None:
+        daemon = TrainerDaemon(FakeManager, "unused")
+        daemon.loop = asyncio.get_running_loop()
+        daemon.manager = manager = FakeManager()
+        stopping = asyncio.ensure_future(request(daemon, "stopPlayback"))
+        await asyncio.sleep(0.05)
+        assert not stopping.done()
+        assert json.loads(await request(daemon, "ping"))["result"] == "pong" # answered while playback is stopping
+        manager.released.set()
+        assert json.loads(await stopping)["result"] == {"written": 0}
+        assert manager.stopped_on != threading.main_thread()
+        daemon.executor.shutdown()
+    asyncio.run(run())
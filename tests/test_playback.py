@@ -0,0 +1,63 @@
+from playback import TrajectoryPlayer
+import numpy as np
+import time
+
+PERIOD_NS = 10_000_000
+COUNT = 50
+
+
+class RecordingWrite:
+    """Stands in for the game, remembers which sample was written when and can stall on one of them"""
+
+    def __init__(self, stall_on: int = None, stall_s: float = 0) -> None:
+        self.stall_on = stall_on
+        self.stall_s = stall_s
+        self.writes = [] # (sample, perf_counter_ns)
+
+    def __call__(self, pos: list, vel: list) -> None:
+        self.writes.append((int(pos[0]), time.perf_counter_ns()))
+        if pos[0] == self.stall_on:
+            time.sleep(self.stall_s)
+
+
+def player(write: RecordingWrite) -> TrajectoryPlayer:
+    positions = np.zeros((COUNT, 3))
+    positions[:, 0] = np.arange(COUNT) # each sample says which one it is
+    return TrajectoryPlayer(np.arange(COUNT) * PERIOD_NS + 12345, positions, np.zeros((COUNT, 3)), write)
+
+
+def test_seek_and_speed_move_the_timeline():
+    write = RecordingWrite()
+    playing = player(write)
+    playing.seek(0.2)
+    playing.setSpeed(2.0)
+    report = playing.play()
+
+    samples = [sample for sample, written_ns in write.writes]
+    assert samples[0] == 20
+    assert samples == sorted(samples) and samples[-1] == COUNT - 1
+    assert report["written"] + report["dropped"] == COUNT - 20
+    first_ns = write.writes[0][1]
+    for sample, written_ns in write.writes:
+        expected_ns = (sample - 20) * PERIOD_NS / 2
+        assert abs(written_ns - first_ns - expected_ns) < 5_000_000 # written at half the recorded spacing
+    assert 0.14 < report["played_ns"] / 1_000_000_000 < 0.3
+
+
+def test_samples_behind_a_stall_are_dropped():
+    write = RecordingWrite(stall_on=5, stall_s=0.055)
+    playing = player(write)
+    errors = []
+    record = playing.errors.record
+    playing.errors.record = lambda late: (errors.append(late), record(late))
+    report = playing.play()
+
+    samples = [sample for sample, written_ns in write.writes]
+    after = samples[samples.index(5) + 1]
+    assert after >= 10 # the samples whose deadline passed during the stall were skipped, not written in a burst
+    assert report["dropped"] >= after - 6
+    assert report["written"] + report["dropped"] == COUNT
+    assert report["written"] == len(samples)
+    assert errors[samples.index(5)] >= 55_000_000 # measured once the write returned
+    # the sample after the stall counts as late from the deadline of the first sample it stood in for
+    assert errors[samples.index(after)] >= 40_000_000
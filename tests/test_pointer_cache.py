@@ -0,0 +1,93 @@
+from manager import PointerCache
+import pytest
+
+POINTER = (0x10, (0x0, 0x8, 0x30))
+
+
+class FakeMemory:
+    """Pointer-sized values at fake addresses, reading any address in failing raises like a closing game would"""
+
+    def __init__(self, values: dict) -> None:
+        self.values = values
+        self.failing = set()
+
+    def read_memory(self, base_address: int, read_buffer):
+        if base_address in self.failing or base_address not in self.values:
+            raise OSError(f"could not read {base_address:#x}")
+        read_buffer.value = self.values[base_address]
+        return read_buffer
+
+
+def chain() -> FakeMemory:
+    # base 0x1000 + 0x10 -> 0x2000, 0x2000 + 0x0 -> 0x3000, 0x3000 + 0x8 -> 0x4000, final 0x4000 + 0x30
+    return FakeMemory({0x1010: 0x2000, 0x2000: 0x3000, 0x3008: 0x4000})
+
+
+def test_lookup_hits_after_walk():
+    cache = PointerCache(chain(), 0x1000)
+    assert cache.resolve(POINTER) == 0x4030
+    assert cache.resolve(POINTER) == 0x4030
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_failed_walk_is_not_cached():
+    memory = chain()
+    cache = PointerCache(memory, 0x1000)
+    memory.failing.add(0x3008)
+    with pytest.raises(OSError):
+        cache.resolve(POINTER)
+    assert POINTER not in cache.chains
+
+    memory.failing.clear()
+    assert cache.resolve(POINTER) == 0x4030
+    assert cache.hits == 0
+    assert len(cache.chains[POINTER]) == len(POINTER[1])
+
+
+def test_failed_rewalk_drops_the_chain():
+    memory = chain()
+    cache = PointerCache(memory, 0x1000)
+    assert cache.resolve(POINTER) == 0x4030
+
+    # a respawn moves the last object, and the game closes while the chain is walked again
+    memory.values[0x3008] = 0x5000
+    memory.values[0x5000] = 0
+    memory.failing.add(0x3008)
+    with pytest.raises(OSError):
+        cache.resolve(POINTER)
+    memory.failing.clear()
+    assert cache.resolve(POINTER) == 0x5030
+
+
+def test_short_chain_is_not_trusted():
+    memory = chain()
+    cache = PointerCache(memory, 0x1000)
+    cache.chains[POINTER] = [(0x1010, 0x2000), (0x2000, 0x3000)] # cut short, its last hop still reads the same
+    assert cache.resolve(POINTER) == 0x4030
+    assert cache.hits == 0
+
+
+def test_rewalk_starts_at_the_first_changed_hop():
+    memory = chain()
+    cache = PointerCache(memory, 0x1000)
+    assert cache.resolve(POINTER) == 0x4030
+
+    # a respawn only replaces the last object, the hops above it are still read but not walked again
+    memory.values[0x3008] = 0x5000
+    reads = cache.reads
+    assert cache.resolve(POINTER) == 0x5030
+    assert cache.reads - reads == 4 # the sentinel, the two unchanged hops above it and the last hop walked again
+    assert cache.chains[POINTER][:2] == [(0x1010, 0x2000), (0x2000, 0x3000)]
+
+
+def test_rewalk_ignores_stale_objects_below_a_changed_hop():
+    memory = chain()
+    cache = PointerCache(memory, 0x1000)
+    assert cache.resolve(POINTER) == 0x4030
+
+    # a level load re-points the root, the old object at 0x2000 is left behind still holding its value
+    memory.values.update({0x1010: 0x6000, 0x6000: 0x7000, 0x7008: 0x8000})
+    memory.values[0x3008] = 0x9999 # and the old last hop now holds garbage
+    assert cache.resolve(POINTER) == 0x8030
+    assert cache.chains[POINTER] == [(0x1010, 0x6000), (0x6000, 0x7000), (0x7008, 0x8000)]
+    assert cache.resolve(POINTER) == 0x8030
@@ -0,0 +1,25 @@
+from recorder import TelemetryRecorder, loadRecording
+import numpy as np
+
+
+class Frame:
+    def __init__(self, i: int) -> None:
+        self.time_ns = i * 1000
+        self.pos = (i, 0.0, 0.0)
+        self.vel = (0.0, i, 0.0)
+
+
+def test_unclosed_recording_loads_up_to_the_last_flush(tmp_path):
+    path = str(tmp_path / "run.npy")
+    recorder = TelemetryRecorder(path, chunk_size=16, reserve=20)
+    for i in range(40): # grows the file once, and the last 8 samples are still only in the ring
+        recorder.tick(Frame(i))
+
+    crashed = np.load(path) # as a run that crashed here would be found
+    assert len(crashed) == 32
+    assert list(crashed["time_ns"]) == [i * 1000 for i in range(32)]
+
+    assert recorder.close() == 40
+    recording = loadRecording(path)
+    assert len(recording) == 40
+    assert list(recording["pos"][:, 0]) == list(range(40))
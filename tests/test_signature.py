@@ -0,0 +1,101 @@
+from memory import LocalBackend
+import signature
+from signature import Signature, deriveSignature, locateStatics, scanBuffer, scanModule
+import ctypes, json, pytest
+
+IMAGE_SIZE = 0x40000
+PE_OFFSET = 0x80
+TAIL = bytes.fromhex("48 85 C0 74 0C 48 8B 40 10")
+
+
+def image(instruction_at: int, target: int, stamp: int = 1) -> bytearray:
+    """A module image with PE headers and one mov rax, [rip+disp] that loads from target"""
+    data = bytearray(IMAGE_SIZE)
+    data[:2] = b"MZ"
+    data[0x3C:0x40] = PE_OFFSET.to_bytes(4, "little")
+    data[PE_OFFSET:PE_OFFSET + 4] = b"PE\0\0"
+    data[PE_OFFSET + 8:PE_OFFSET + 12] = stamp.to_bytes(4, "little") # the link timestamp, differs per build
+    data[PE_OFFSET + 0x50:PE_OFFSET + 0x54] = IMAGE_SIZE.to_bytes(4, "little")
+    disp = target - (instruction_at + 7)
+    data[instruction_at:instruction_at + 7] = bytes.fromhex("48 8B 05") + disp.to_bytes(4, "little", signed=True)
+    data[instruction_at + 7:instruction_at + 7 + len(TAIL)] = TAIL
+    # the same instruction loading something else, only the displacement and what follows tell them apart
+    data[0x9000:0x9007] = bytes.fromhex("48 8B 05 10 00 00 00")
+    data[0x9007:0x900A] = bytes.fromhex("48 85 C0")
+    return data
+
+
+class Module(LocalBackend):
+    """An image held in this process, counting the reads made from it"""
+
+    def __init__(self, data: bytearray) -> None:
+        self.buffer = (ctypes.c_ubyte * len(data)).from_buffer(data)
+        self.base_address = ctypes.addressof(self.buffer)
+        self.reads = 0
+
+    def read_memory(self, base_address: int, read_buffer):
+        self.reads += 1
+        return LocalBackend.read_memory(self, base_address, read_buffer)
+
+
+SIG = Signature("48 8B 05 ?? ?? ?? ?? 48 85 C0 74 ?? 48 8B 40 10")
+
+
+def test_wildcards_match_any_byte():
+    data = bytes(image(0x5000, 0x30000))
+    assert scanBuffer(data, {"POS": (SIG.data, SIG.mask)}) == {"POS": [0x5000]}
+    other = bytes(image(0x5000, 0x30000)).replace(bytes.fromhex("74 0C"), bytes.fromhex("74 7F"))
+    assert scanBuffer(other, {"POS": (SIG.data, SIG.mask)}) == {"POS": [0x5000]}
+    assert scanBuffer(data, {"POS": (SIG.data, SIG.mask)}, base=0x100) == {"POS": [0x5100]}
+
+
+def test_locates_the_static_through_the_displacement():
+    module = Module(image(0x5000, 0x30000))
+    assert locateStatics(module, module.base_address, {"POS": SIG}) == {"POS": 0x30000}
+
+
+def test_ambiguous_signatures_are_not_used():
+    data = image(0x5000, 0x30000)
+    data[0x7000:0x7000 + 16] = data[0x5000:0x5000 + 16]
+    module = Module(data)
+    assert locateStatics(module, module.base_address, {"POS": SIG}) == {}
+
+
+def test_process_pool_finds_matches_across_chunks(monkeypatch):
+    monkeypatch.setattr(signature, "POOL_THRESHOLD", 0)
+    monkeypatch.setattr(signature, "CHUNK_SIZE", 0x4000)
+    at = 0x8000 - 5 # the match straddles the boundary between two chunks
+    module = Module(image(at, 0x30000))
+    assert scanModule(module, module.base_address, IMAGE_SIZE, {"POS": SIG}, workers=2) == {"POS": [at]}
+
+
+def test_cache_hit_only_reads_the_headers(tmp_path):
+    cache_path = str(tmp_path / "signatures.json")
+    module = Module(image(0x5000, 0x30000))
+    assert locateStatics(module, module.base_address, {"POS": SIG}, cache_path) == {"POS": 0x30000}
+    module.reads = 0
+    assert locateStatics(module, module.base_address, {"POS": SIG}, cache_path) == {"POS": 0x30000}
+    assert module.reads == 1
+
+    rebuilt = Module(image(0x6000, 0x31000, stamp=2)) # another build is scanned again
+    assert locateStatics(rebuilt, rebuilt.base_address, {"POS": SIG}, cache_path) == {"POS": 0x31000}
+    assert len(json.load(open(cache_path))) == 3 # both builds and the learned signatures
+
+
+def test_derived_signature_only_matches_once():
+    data = bytes(image(0x5000, 0x30000))
+    sig = deriveSignature(data, 0x30000)
+    assert sig != None and sig.pattern.startswith("48 8B 05 ?? ?? ?? ??")
+    assert scanBuffer(data, {"POS": (sig.data, sig.mask)}) == {"POS": [0x5000]}
+    assert deriveSignature(data, 0x31000) == None # nothing references it
+
+
+def test_learned_signature_follows_an_update(tmp_path):
+    cache_path = str(tmp_path / "signatures.json")
+    module = Module(image(0x5000, 0x30000))
+    # nothing is located on the build the known address belongs to, a signature is only learned from it
+    assert locateStatics(module, module.base_address, {}, cache_path, {"POS": 0x30000}) == {}
+    assert "POS" in json.load(open(cache_path))[signature.LEARNED_KEY]
+
+    updated = Module(image(0x6200, 0x32000, stamp=2))
+    assert locateStatics(updated, updated.base_address, {}, cache_path, {"POS": 0x30000}) == {"POS": 0x32000}
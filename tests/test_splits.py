@@ -0,0 +1,105 @@
+from splits import SegmentTimer, SplitRecords
+import math, pytest
+
+RADIUS = 3.0
+ROUTE = ["Start", "Ledge", "Statue Climb"]
+POSITIONS = [(0.0, 0.0, 0.0), (40.0, 0.0, 0.0), (100.0, 0.0, 0.0)]
+
+
+def replay(timer: SegmentTimer, rate: int, path, seconds: float, offset_ns: int = 0) -> list:
+    """Feeds timer the position path(t) sampled at rate Hz and returns every event it reported"""
+    events = []
+    period = 1_000_000_000 // rate
+    for i in range(int(seconds * rate) + 1):
+        time_ns = offset_ns + i * period
+        events += timer.update(time_ns, path(i * period / 1_000_000_000))
+    return events
+
+
+def straight(speed: float):
+    return lambda t: (speed * t, 0.0, 0.0)
+
+
+@pytest.mark.parametrize("rate", [60, 144, 240])
+@pytest.mark.parametrize("offset_ns", [0, 7_777_777]) # sampling that does not line up with the crossings
+def test_straight_run_splits_at_the_crossings(rate, offset_ns):
+    speed = 10.0 # m/s
+    timer = SegmentTimer(ROUTE, POSITIONS, RADIUS)
+    events = replay(timer, rate, lambda t: straight(speed)(t + offset_ns / 1e9), 12.0, offset_ns)
+
+    assert [event for event, index, splits in events] == ["start", "split", "finish"]
+    start = (RADIUS / speed) * 1e9 # leaves the start sphere
+    expected = [((x - RADIUS) / speed) * 1e9 - start for x, y, z in POSITIONS[1:]] # enters the next spheres
+    # moving in a straight line, interpolation is exact apart from rounding to whole ns
+    assert all(abs(split - want) <= 2 for split, want in zip(events[-1][2], expected))
+
+
+@pytest.mark.parametrize("rate", [60, 240])
+def test_curved_run_is_within_a_fraction_of_a_sample(rate):
+    # an arc bulging up to 2 m off the straight line, so interpolating between samples is only approximate
+    speed = 10.0
+    path = lambda t: (speed * t, 2.0 * math.sin(math.pi * speed * t / 100.0), 0.0)
+    timer = SegmentTimer(ROUTE, POSITIONS, RADIUS)
+    events = replay(timer, rate, path, 12.0)
+
+    # the exact crossings, found by bisecting the continuous path
+    def crossing(center, inside_after: bool, low: float, high: float) -> float:
+        for i in range(100):
+            mid = (low + high) / 2
+            inside = math.dist(path(mid), center) <= RADIUS
+            low, high = (low, mid) if inside == inside_after else (mid, high)
+        return high * 1e9
+    start = crossing(POSITIONS[0], False, 0.0, 1.0)
+    expected = [crossing(POSITIONS[1], True, 1.0, 5.0) - start, crossing(POSITIONS[2], True, 5.0, 11.0) - start]
+    tolerance = 0.05 * 1_000_000_000 / rate # a twentieth of a sample
+    assert all(abs(split - want) <= tolerance for split, want in zip(events[-1][2], expected))
+
+
+def test_going_back_to_the_start_resets():
+    timer = SegmentTimer(ROUTE, POSITIONS, RADIUS)
+    out_and_back = lambda t: (10.0 * t if t < 2 else 20.0 - 10.0 * (t - 2), 0.0, 0.0)
+    events = replay(timer, 60, out_and_back, 4.0)
+    assert [event for event, index, splits in events] == ["start", "reset"]
+    assert timer.state == "ready"
+
+    events = replay(timer, 60, straight(10.0), 12.0, offset_ns=4_000_000_000)
+    assert [event for event, index, splits in events] == ["start", "split", "finish"]
+
+
+def test_skipping_a_split_never_finishes():
+    timer = SegmentTimer(ROUTE, POSITIONS, RADIUS)
+    around_the_ledge = lambda t: (10.0 * t, 10.0 if 2 < t < 6 else 0.0, 0.0)
+    events = replay(timer, 60, around_the_ledge, 12.0)
+    assert [event for event, index, splits in events] == ["start"]
+    assert timer.state == "running" and timer.index == 1
+
+
+def test_records_round_trip(tmp_path):
+    path = str(tmp_path / "splits.bin")
+    records = SplitRecords(path)
+    route = records.route(ROUTE)
+    assert route.addSplits([4_000_000_000, 9_500_000_000]) == [0, 1]
+    assert route.addSplits([3_900_000_000]) == [0] # an unfinished run can still be a gold
+    other = records.route(["Spawn", "Tower Top ✓"])
+    records.save()
+
+    loaded = SplitRecords(path)
+    assert set(loaded.routes) == {tuple(ROUTE), other.names}
+    saved = loaded.route(ROUTE)
+    assert saved.pb == [4_000_000_000, 9_500_000_000]
+    assert saved.best == [3_900_000_000, 5_500_000_000]
+    assert saved.sum_of_best == 9_400_000_000
+    assert loaded.route(other.names).pb == [None] and loaded.route(other.names).sum_of_best == None
+
+
+def test_damaged_records_raise(tmp_path):
+    path = tmp_path / "splits.bin"
+    records = SplitRecords(str(path))
+    records.route(ROUTE).addSplits([1, 2])
+    records.save()
+    path.write_bytes(path.read_bytes()[:-5])
+    with pytest.raises(ValueError):
+        SplitRecords(str(path))
+    path.write_bytes(b"nope" + bytes(10))
+    with pytest.raises(ValueError):
+        SplitRecords(str(path))
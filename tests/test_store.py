@@ -0,0 +1,55 @@
+from store import PositionStore
+import sqlite3, threading, pytest
+
+
+class FailingConnection:
+    """Wraps a connection so that deletes fail, like a locked or read-only database"""
+
+    def __init__(self, db: sqlite3.Connection) -> None:
+        self.db = db
+
+    def execute(self, sql: str, params=()):
+        if sql.startswith("DELETE"):
+            raise sqlite3.OperationalError("database is locked")
+        return self.db.execute(sql, params)
+
+
+def test_failed_delete_keeps_the_position(tmp_path):
+    store = PositionStore(str(tmp_path / "positions.db"))
+    positions = store.collection()
+    positions["Statue"] = (1.0, 2.0, 3.0)
+    store.db = FailingConnection(store.db)
+    with pytest.raises(sqlite3.OperationalError):
+        del positions["Statue"]
+    assert positions["Statue"] == (1.0, 2.0, 3.0)
+    store.db = store.db.db
+
+    del positions["Statue"]
+    with pytest.raises(KeyError):
+        del positions["Statue"]
+    store.collections_cache.clear()
+    assert "Statue" not in store.collection()
+
+
+def test_iterating_while_another_thread_saves(tmp_path):
+    store = PositionStore(str(tmp_path / "positions.db"))
+    positions = store.collection()
+    positions.update({f"pos {i}": (i, i, i) for i in range(100)})
+    stop = threading.Event()
+
+    def save() -> None:
+        i = 100
+        while not stop.is_set():
+            positions[f"pos {i}"] = (i, i, i)
+            del positions[f"pos {i}"]
+            i += 1
+
+    saver = threading.Thread(target=save)
+    saver.start()
+    try:
+        for _ in range(200):
+            assert len(list(positions)) >= 100 # a dict changing size mid-iteration would raise RuntimeError
+    finally:
+        stop.set()
+        saver.join()
+    store.close()
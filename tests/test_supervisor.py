@@ -0,0 +1,56 @@
+from PySide6.QtCore import QCoreApplication, Qt
+from supervisor import ConnectionSupervisor
+from simulator import spawnSimulator
+import os, threading, time, pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "pidfd_open"), reason="needs pidfd support")
+APP = QCoreApplication.instance() or QCoreApplication([])
+DIRECT = Qt.ConnectionType.DirectConnection # there is no event loop in the tests to deliver queued signals
+
+
+def test_detaches_when_the_process_exits():
+    process, pid, base_address = spawnSimulator()
+    supervisor = ConnectionSupervisor(lambda: pid if process.poll() == None else None, 0.05)
+    found = threading.Event()
+    lost = []
+    supervisor.found.connect(lambda found_pid, found_ns: found.set(), DIRECT)
+    supervisor.lost.connect(lambda lost_pid: lost.append((lost_pid, time.perf_counter_ns())), DIRECT)
+    supervisor.start()
+    try:
+        assert found.wait(2.0)
+        assert supervisor.pid == pid
+
+        killed_ns = time.perf_counter_ns()
+        process.kill()
+        process.wait()
+        deadline = time.perf_counter() + 1.0
+        while not lost and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        assert lost and lost[0][0] == pid
+        # the pidfd wakes the supervisor straight away, well before its wait slice would have run out
+        assert (lost[0][1] - killed_ns) / 1_000_000 < 200
+        assert supervisor.pid == None
+    finally:
+        if process.poll() == None:
+            process.kill()
+            process.wait()
+        supervisor.stop()
+
+
+def test_stop_while_attached():
+    process, pid, base_address = spawnSimulator()
+    supervisor = ConnectionSupervisor(lambda: pid, 0.05)
+    found = threading.Event()
+    lost = []
+    supervisor.found.connect(lambda found_pid, found_ns: found.set(), DIRECT)
+    supervisor.lost.connect(lost.append, DIRECT)
+    supervisor.start()
+    try:
+        assert found.wait(2.0)
+        started = time.perf_counter()
+        supervisor.stop()
+        assert time.perf_counter() - started < 1.0
+        assert lost == [] # stopping is not the game exiting
+    finally:
+        process.stdin.close()
+        process.wait()
@@ -0,0 +1,54 @@
+from data import DEFAULT_POSITIONS
+from manager import CuriosityManager
+from simulator import spawnSimulator
+from sweep import SweepResults, SweepRunner, LANDED, FELL, CLIPPED, OUT_OF_BOUNDS, PENDING
+import numpy as np
+import pytest
+
+X, Y, Z = DEFAULT_POSITIONS["Statue Climb"] # the top of the simulator's statue, with ground 12 m below it
+POINTS = np.array([
+    (X, Y, Z + 0.2), # drops onto the statue
+    (X, Y, Z - 2.0), # inside the statue, pushed out on top
+    (X - 23, Y, Z), # over the void past the ground
+    (X + 17, Y, Z - 11.8), # drops onto the ground outside the bounds
+])
+OUTCOMES = [LANDED, CLIPPED, FELL, OUT_OF_BOUNDS]
+BOUNDS = ((X - 25, Y - 15, Z - 20), (X + 15, Y + 15, Z + 20))
+
+
+@pytest.fixture
+def manager():
+    process, pid, base_address = spawnSimulator(terrain=True)
+    manager = CuriosityManager(None, pid, base_address)
+    yield manager
+    manager.kill()
+    process.stdin.close()
+    process.wait()
+
+
+def test_settle_ticks_are_validated(tmp_path):
+    with pytest.raises(ValueError):
+        SweepRunner(None, POINTS, str(tmp_path / "sweep.npz"), 0)
+
+
+def test_stopped_sweep_resumes_from_the_checkpoint(manager, tmp_path):
+    path = str(tmp_path / "sweep.npz")
+    runner = SweepRunner(manager, POINTS, path, _bounds=BOUNDS, _checkpoint_every=1)
+    runner.run(lambda done, total: runner.stop() if done == 2 else None)
+    saved = SweepResults.load(path)
+    assert saved.done == 2
+    assert list(saved.outcome) == OUTCOMES[:2] + [PENDING, PENDING]
+
+    resumed = SweepRunner(manager, POINTS, path, _bounds=BOUNDS, _checkpoint_every=1)
+    assert resumed.results.done == 2
+    done = []
+    results = resumed.run(lambda done_count, total: done.append(done_count))
+    assert done == [3, 4] # only the points without a result were run
+    assert list(results.outcome) == OUTCOMES
+    assert list(SweepResults.load(path).outcome) == OUTCOMES
+    assert results.end_pos[1][2] == pytest.approx(Z) # pushed out onto the top of the statue
+
+    with pytest.raises(ValueError):
+        SweepRunner(manager, POINTS[:3], path, _bounds=BOUNDS)
+    with pytest.raises(ValueError):
+        SweepRunner(manager, POINTS, path, 30, _bounds=BOUNDS)
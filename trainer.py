@@ -4,34 +4,60 @@ from PySide6.QtCore import QTimer
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QApplication
 from data import *
-import main_window as window
+import argparse, multiprocessing
 
 # allow keyboard interrupts
 def interruptHandler(sig, frame):
     sys.exit(0)
-import signal
-signal.signal(signal.SIGINT, interruptHandler)
-
-# set app id so the custom taskbar icon will show while running from source
-if IS_RUNNING_FROM_SOURCE:
-    try:
-        from ctypes import windll
-        windll.shell32.SetCurrentProcessExplicitAppUserModelID("Curiosity_Trainer")
-    except AttributeError:
-        pass # ignore for versions of windows before 7
-    except ImportError:
-        if sys.platform != "linux": raise
-
-app = QApplication([])
-app.setStyle("fusion")
-app.setWindowIcon(QIcon(os.path.join(ROOT_PATH, "assets", "icon.ico")))
-app.setStyleSheet(THEME)
-
-m = window.MainWindow()
-
-# for keyboard interrupts
-timer = QTimer()
-timer.start(100)
-timer.timeout.connect(lambda: None)
-
-sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    # signature and pointer scanning use process pools, when frozen their workers start as this executable with
+    # --multiprocessing-fork and must be taken over here before anything else runs
+    multiprocessing.freeze_support()
+
+    parser = argparse.ArgumentParser(description="A speedrun trainer for Curiosity")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window, serving the trainer over local IPC")
+    parser.add_argument("--address", default=DAEMON_ADDRESS, help="unix socket path or named pipe to serve on")
+    parser.add_argument("--pid", type=int, help="attach to this process instead of looking for the game")
+    parser.add_argument("--base-address", type=lambda text: int(text, 0), help="module base address of --pid")
+    parser.add_argument("--metrics", action="store_true", help="record hot path metrics for the debug panel (F12)")
+    args = parser.parse_args()
+
+    if args.metrics:
+        from metrics import METRICS
+        METRICS.enable() # before anything is instrumented, otherwise it costs nothing
+
+    if args.headless:
+        from daemon import runDaemon
+        sys.exit(runDaemon(args.address, args.pid, args.base_address))
+
+    import main_window as window
+
+    import signal
+    signal.signal(signal.SIGINT, interruptHandler)
+
+    # set app id so the custom taskbar icon will show while running from source
+    if IS_RUNNING_FROM_SOURCE:
+        try:
+            from ctypes import windll
+            windll.shell32.SetCurrentProcessExplicitAppUserModelID("Curiosity_Trainer")
+        except AttributeError:
+            pass # ignore for versions of windows before 7
+        except ImportError:
+            if sys.platform != "linux": raise
+
+    app = QApplication([])
+    app.setStyle("fusion")
+    app.setWindowIcon(QIcon(os.path.join(ROOT_PATH, "assets", "icon.ico")))
+    app.setStyleSheet(loadTheme())
+
+    m = window.MainWindow()
+
+    # for keyboard interrupts
+    timer = QTimer()
+    timer.start(100)
+    timer.timeout.connect(lambda: None)
+
+    sys.exit(app.exec())
@@ -1,5 +1,12 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+# pyinstaller trainer.spec -- --onedir
+# builds a folder instead of a single exe, which starts faster since nothing has to be unpacked on every launch
+import argparse
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true")
+options = parser.parse_args()
+
 a = Analysis(
     ['trainer.py'],
     pathex=[],
@@ -19,16 +26,37 @@ a = Analysis(
 )
 pyz = PYZ(a.pure, a.zipped_data, cipher=None)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    name='Curiosity Trainer',
-    debug=False,
-    strip=False,
-    upx=True,
-    runtime_tmpdir=None,
-    console=False,
-    icon="assets/icon.ico"
-)
\ No newline at end of file
+if options.onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        exclude_binaries=True,
+        name='Curiosity Trainer',
+        debug=False,
+        strip=False,
+        upx=False, # compressed dlls have to be decompressed on every launch
+        console=False,
+        icon="assets/icon.ico"
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        name='Curiosity Trainer',
+        strip=False,
+        upx=False
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        name='Curiosity Trainer',
+        debug=False,
+        strip=False,
+        upx=True,
+        runtime_tmpdir=None,
+        console=False,
+        icon="assets/icon.ico"
+    )
\ No newline at end of file
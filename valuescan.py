@@ -0,0 +1,265 @@
+from mem_edit import Process
+import numpy as np
+import ctypes, mmap, os, tempfile, time
+
+READ_SIZE = 16 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024 * 1024 # bytes compared at a time, so a full scan never needs a second copy of a snapshot
+VALUE_TYPES = {"int32": np.int32, "float": np.float32, "double": np.float64}
+FIRST_SCANS = ("exact", "range", "unknown")
+NEXT_SCANS = ("exact", "range", "changed", "unchanged", "increased", "decreased")
+
+
+class Snapshot:
+    """The writable regions of a process copied end to end into one memory-mapped file
+
+    Regions are kept in address order and every one starts at a page (or 8 byte) aligned file offset, so an aligned
+    value never spans two regions and the whole file can be viewed as one typed array"""
+
+    def __init__(self, _path: str, _starts: list, _offsets: list, _sizes: list) -> None:
+        self.path = _path
+        self.starts = np.array(_starts, dtype=np.uint64)
+        self.offsets = np.array(_offsets, dtype=np.uint64)
+        self.sizes = np.array(_sizes, dtype=np.uint64)
+        self.file = open(_path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.data = np.frombuffer(self.map, dtype=np.uint8) if size else np.empty(0, dtype=np.uint8)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    @classmethod
+    def capture(cls, game: Process, path: str) -> "Snapshot":
+        """Copies every writable region of the game to path, regions that can not be read are left out"""
+        regions = game.list_mapped_regions(writeable_only=True)
+        if len(regions) == 0:
+            raise ValueError("The memory of the game can not be listed, so it can not be scanned")
+        return cls.fromRegions(path, regions, game)
+
+    @classmethod
+    def fromRegions(cls, path: str, regions: list, game: Process = None) -> "Snapshot":
+        """Writes (start, stop) regions read from game, or (start, uint8 array) regions as they are, to path"""
+        starts, offsets, sizes = [], [], []
+        buffer = np.empty(READ_SIZE, dtype=np.uint8)
+        with open(path, 'wb') as f:
+            for start, data in regions:
+                offset = f.tell()
+                try:
+                    if game != None:
+                        stop = data
+                        for address in range(start, stop, READ_SIZE):
+                            chunk = buffer[:min(READ_SIZE, stop - address)]
+                            game.read_memory(address, (ctypes.c_ubyte * len(chunk)).from_buffer(chunk))
+                            f.write(chunk)
+                        size = stop - start
+                    else:
+                        f.write(memoryview(data))
+                        size = len(data)
+                except Exception:
+                    f.seek(offset)
+                    f.truncate() # guard pages and regions that went away while snapshotting
+                    continue
+                f.write(bytes(-size % 8)) # keeps the next region aligned
+                starts.append(start)
+                offsets.append(offset)
+                sizes.append(size)
+        return cls(path, starts, offsets, sizes)
+
+    def view(self, value_type: str) -> np.ndarray:
+        return self.data[:len(self.data) - len(self.data) % 8].view(VALUE_TYPES[value_type])
+
+    def addressesOf(self, offsets: np.ndarray) -> np.ndarray:
+        """Returns the address of every file offset"""
+        region = np.searchsorted(self.offsets, offsets, side="right") - 1
+        return self.starts[region] + (offsets - self.offsets[region])
+
+    def offsetsOf(self, addresses: np.ndarray, itemsize: int) -> tuple:
+        """Returns (file offsets, mask) of the sorted addresses whose whole value is in the snapshot
+
+        Each region's addresses are a slice found with two binary searches, so mapping costs one subtraction per
+        address however many there are"""
+        firsts = np.searchsorted(addresses, self.starts, side="left")
+        lasts = np.searchsorted(addresses, self.starts + self.sizes - np.uint64(itemsize), side="right")
+        inside = np.zeros(len(addresses), dtype=bool)
+        parts = [np.empty(0, dtype=np.uint64)]
+        for first, last, start, offset in zip(firsts, lasts, self.starts, self.offsets):
+            if last > first:
+                inside[first:last] = True
+                parts.append(addresses[first:last] - start + offset)
+        return np.concatenate(parts), inside
+
+    def shared(self, other: "Snapshot") -> list:
+        """Returns (offset here, offset in other, size) of every address range both snapshots have"""
+        others = {int(start): (int(offset), int(size)) for start, offset, size in
+                  zip(other.starts, other.offsets, other.sizes)}
+        ranges = []
+        for start, offset, size in zip(self.starts, self.offsets, self.sizes):
+            if int(start) in others:
+                other_offset, other_size = others[int(start)]
+                ranges.append((int(offset), other_offset, min(int(size), other_size)))
+        return ranges
+
+    def close(self) -> None:
+        self.data = np.empty(0, dtype=np.uint8)
+        if self.map != None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass # a results array still points into it, it is closed when that is dropped
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass # still mapped on windows, the scanner's temporary folder cleans it up later
+
+
+def elementsOf(offsets: np.ndarray, itemsize: int) -> np.ndarray:
+    """Returns the typed view indices of file offsets, as intp since numpy gathers with those many times faster"""
+    return (offsets // np.uint64(itemsize)).astype(np.intp)
+
+
+def matches(scan: str, new: np.ndarray, old: np.ndarray, value, high) -> np.ndarray:
+    """Returns the mask of the values that pass a scan, old is only used by the comparison scans"""
+    if scan in ("changed", "unchanged") and new.dtype.kind == "f":
+        # compared as bits, so a NaN that stays NaN is unchanged and 0.0 becoming -0.0 is a change
+        bits = np.dtype(f"u{new.dtype.itemsize}")
+        new, old = new.view(bits), old.view(bits)
+    if scan == "exact":
+        return new == value
+    if scan == "range":
+        return (new >= value) & (new <= high)
+    if scan == "changed":
+        return new != old
+    if scan == "unchanged":
+        return new == old
+    if scan == "increased":
+        return new > old
+    if scan == "decreased":
+        return new < old
+    raise ValueError(f"Scan must be one of {NEXT_SCANS}")
+
+
+class ValueScanner:
+    """Finds the addresses of a value by scanning snapshots of the game's writable memory again and again
+
+    The first scan either looks for a value or remembers everything as unknown. Every next scan takes a new snapshot
+    and keeps only the candidates that pass it, compared against the value or the previous snapshot. Candidates are
+    a sorted array of addresses, so after the first pass a scan only gathers and compares the survivors"""
+
+    def __init__(self, _game: Process, _value_type: str = "int32", _folder: str = None) -> None:
+        if _value_type not in VALUE_TYPES:
+            raise ValueError(f"Value type must be one of {tuple(VALUE_TYPES)}")
+        self.game = _game
+        self.value_type = _value_type
+        self.dtype = np.dtype(VALUE_TYPES[_value_type])
+        self.tmp = tempfile.TemporaryDirectory(dir=_folder, ignore_cleanup_errors=True)
+        self.snapshots = 0
+        self.snapshot = None
+        self.candidates = None # None while every address is still a candidate after an unknown first scan
+        self.scanned_bytes = 0 # of the last scan, with scan_seconds for the throughput
+        self.scan_seconds = 0.0
+
+    @property
+    def count(self) -> int:
+        if self.candidates is not None: # an array, so != would compare every address
+            return len(self.candidates)
+        return len(self.snapshot.view(self.value_type)) if self.snapshot != None else 0
+
+    def capture(self) -> Snapshot:
+        self.snapshots += 1
+        return Snapshot.capture(self.game, os.path.join(self.tmp.name, f"snapshot_{self.snapshots}.bin"))
+
+    def firstScan(self, scan: str = "exact", value=None, high=None) -> int:
+        """Starts over from a new snapshot and returns how many candidates there are"""
+        if scan not in FIRST_SCANS:
+            raise ValueError(f"The first scan must be one of {FIRST_SCANS}")
+        self.reset()
+        self.snapshot = self.capture()
+        if scan != "unknown":
+            self.candidates = self.scanAll(scan, self.snapshot, None, value, high)
+        return self.count
+
+    def nextScan(self, scan: str, value=None, high=None) -> int:
+        """Narrows the candidates down with a new snapshot and returns how many are left"""
+        if self.snapshot == None:
+            raise ValueError("Do a first scan before the next one")
+        if scan not in NEXT_SCANS:
+            raise ValueError(f"Scan must be one of {NEXT_SCANS}")
+        snapshot = self.capture()
+        if self.candidates is None:
+            self.candidates = self.scanAll(scan, snapshot, self.snapshot, value, high)
+        else:
+            self.candidates = self.scanCandidates(scan, snapshot, self.snapshot, value, high)
+        self.snapshot.close()
+        self.snapshot = snapshot
+        return self.count
+
+    def scanAll(self, scan: str, snapshot: Snapshot, previous: Snapshot, value, high) -> np.ndarray:
+        """Compares every aligned value of the snapshot a chunk at a time and returns the addresses that passed"""
+        started = time.perf_counter()
+        value, high = self.cast(value), self.cast(high)
+        new_values = snapshot.view(self.value_type)
+        itemsize = self.dtype.itemsize
+        if previous == None:
+            ranges = [(0, 0, len(new_values) * itemsize)]
+        else:
+            old_values = previous.view(self.value_type)
+            ranges = previous.shared(snapshot) # only addresses in both snapshots can be compared
+        step = CHUNK_SIZE // itemsize
+        found = []
+        for old_offset, new_offset, size in ranges:
+            first, last = new_offset // itemsize, (new_offset + size) // itemsize
+            shift = old_offset // itemsize - first
+            for start in range(first, last, step):
+                stop = min(start + step, last)
+                old = old_values[start + shift:stop + shift] if previous != None else None
+                hits = np.flatnonzero(matches(scan, new_values[start:stop], old, value, high))
+                if len(hits):
+                    found.append(snapshot.addressesOf((hits.astype(np.uint64) + np.uint64(start)) * np.uint64(itemsize)))
+        self.scanned_bytes = sum(size for old_offset, new_offset, size in ranges) * (2 if previous != None else 1)
+        self.scan_seconds = time.perf_counter() - started
+        return np.concatenate(found) if found else np.empty(0, dtype=np.uint64)
+
+    def scanCandidates(self, scan: str, snapshot: Snapshot, previous: Snapshot, value, high) -> np.ndarray:
+        """Compares only the candidates and returns the ones that passed, dropping any that are no longer mapped"""
+        started = time.perf_counter()
+        itemsize = self.dtype.itemsize
+        offsets, inside = snapshot.offsetsOf(self.candidates, itemsize)
+        candidates = self.candidates[inside]
+        new = snapshot.view(self.value_type)[elementsOf(offsets, itemsize)]
+        old = None
+        if scan in ("changed", "unchanged", "increased", "decreased"):
+            old_offsets, kept = previous.offsetsOf(candidates, itemsize)
+            candidates, new = candidates[kept], new[kept]
+            old = previous.view(self.value_type)[elementsOf(old_offsets, itemsize)]
+        passed = matches(scan, new, old, self.cast(value), self.cast(high))
+        self.scanned_bytes = len(new) * itemsize * (2 if old is not None else 1)
+        self.scan_seconds = time.perf_counter() - started
+        return candidates[passed]
+
+    def cast(self, value):
+        return self.dtype.type(value) if value != None else None
+
+    def results(self, limit: int = 1000) -> list:
+        """Returns (address, value in the latest snapshot) of the first limit candidates"""
+        if self.snapshot == None:
+            return []
+        if self.candidates is not None:
+            addresses = self.candidates[:limit]
+        else:
+            offsets = np.arange(min(limit, self.count), dtype=np.uint64) * np.uint64(self.dtype.itemsize)
+            addresses = self.snapshot.addressesOf(offsets)
+        offsets, inside = self.snapshot.offsetsOf(addresses, self.dtype.itemsize)
+        values = self.snapshot.view(self.value_type)[elementsOf(offsets, self.dtype.itemsize)]
+        return [(int(address), value.item()) for address, value in zip(addresses[inside], values)]
+
+    def reset(self) -> None:
+        if self.snapshot != None:
+            self.snapshot.close()
+        self.snapshot = None
+        self.candidates = None
+
+    def close(self) -> None:
+        self.reset()
+        self.tmp.cleanup()